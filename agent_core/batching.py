@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from agent_core import fixtures
+from agent_core.bedrock_client import ClaudeClient
+from agent_core.metrics import Collected
+from agent_core.output_parsing import extract_json
+from agent_core.prompts import BATCH_PROMPT
+
+# Stages whose concurrent prompts may share one model call (off unless listed).
+BATCH_STAGES = os.environ.get("BATCH_STAGES", "")
+# How long the first prompt of a batch waits for others, and the most prompts per call.
+BATCH_WINDOW_MS = float(os.environ.get("BATCH_WINDOW_MS", "5"))
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "8"))
+
+
+def batch_prompt(prompts: list[str]) -> str:
+    requests = "\n\n".join(f"### Request {idx}\n{prompt.strip()}" for idx, prompt in enumerate(prompts, 1))
+    return BATCH_PROMPT.format(count=len(prompts), requests=requests)
+
+
+def split_replies(text: str, count: int) -> list[Optional[str]]:
+    """Each request's reply (as JSON text) from a batched completion; None where it is missing or unusable."""
+    replies: list[Optional[str]] = [None] * count
+    data = extract_json(text, "[")
+    if not isinstance(data, list):
+        return replies
+    for position, item in enumerate(data):
+        if not isinstance(item, dict):
+            continue
+        index = item.get("request", position + 1)
+        reply = item.get("reply")
+        if isinstance(index, int) and 1 <= index <= count and isinstance(reply, dict) and replies[index - 1] is None:
+            replies[index - 1] = json.dumps(reply, ensure_ascii=False)
+    return replies
+
+
+class _Batch:
+    def __init__(self) -> None:
+        self.prompts: list[str] = []
+        self.waiters: list[asyncio.Future] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class PromptBatcher:
+    """Coalesces same-stage prompts that arrive within ``window_ms`` of each other into one model call.
+
+    Runs reach cheap stages like InputAgent at the same moment under load;
+    instead of one Bedrock round trip each, their prompts are numbered into a
+    single request and the JSON array reply is split back per run. Replies
+    that are missing or malformed fall back to an individual call for just
+    those prompts. A prompt alone in its window is sent as is.
+    """
+
+    def __init__(self, stages: set[str], window_ms: float = BATCH_WINDOW_MS, max_size: int = BATCH_MAX_SIZE) -> None:
+        self.stages = stages
+        self.window = window_ms / 1000
+        self.max_size = max_size
+        self._open: Dict[tuple[str, ClaudeClient], _Batch] = {}
+        self._sending: set[asyncio.Task] = set()
+        self.counts: Counter[tuple[str, str]] = Counter()
+
+    def enabled_for(self, stage: str, client: ClaudeClient) -> bool:
+        # demo text and recorded fixtures are per prompt; a batched prompt would never match them
+        return stage in self.stages and self.max_size > 1 and not client.demo_mode and fixtures.FIXTURES is None
+
+    async def complete(self, client: ClaudeClient, stage: str, prompt: str) -> str:
+        loop = asyncio.get_running_loop()
+        key = (stage, client)
+        batch = self._open.get(key)
+        if batch is None:
+            batch = self._open[key] = _Batch()
+            batch.timer = loop.call_later(self.window, self._flush, key, batch)
+        waiter = loop.create_future()
+        batch.prompts.append(prompt)
+        batch.waiters.append(waiter)
+        if len(batch.prompts) >= self.max_size:
+            self._flush(key, batch)
+        return await waiter
+
+    def _flush(self, key: tuple[str, ClaudeClient], batch: _Batch) -> None:
+        if self._open.get(key) is batch:
+            del self._open[key]
+        if batch.timer is not None:
+            batch.timer.cancel()
+            batch.timer = None
+        if batch.prompts:
+            task = asyncio.get_running_loop().create_task(self._send(key[1], key[0], batch.prompts, batch.waiters))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+            batch.prompts, batch.waiters = [], []
+
+    async def _send(self, client: ClaudeClient, stage: str, prompts: list[str], waiters: list[asyncio.Future]) -> None:
+        if len(prompts) == 1:
+            self.counts[(stage, "single")] += 1
+            await self._deliver(waiters[0], client.acomplete(prompts[0]))
+            return
+        try:
+            text = await client.acomplete(batch_prompt(prompts))
+        except Exception as exc:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(exc)
+            return
+        self.counts[(stage, "batch")] += 1
+        self.counts[(stage, "batched_prompts")] += len(prompts)
+        fallbacks = []
+        for prompt, waiter, reply in zip(prompts, waiters, split_replies(text, len(prompts))):
+            if reply is not None:
+                if not waiter.done():
+                    waiter.set_result(reply)
+            else:
+                self.counts[(stage, "fallback")] += 1
+                fallbacks.append(self._deliver(waiter, client.acomplete(prompt)))
+        await asyncio.gather(*fallbacks)
+
+    @staticmethod
+    async def _deliver(waiter: asyncio.Future, call) -> None:
+        try:
+            result = await call
+        except Exception as exc:
+            if not waiter.done():
+                waiter.set_exception(exc)
+        else:
+            if not waiter.done():
+                waiter.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        by_stage: Dict[str, Dict[str, int]] = {}
+        for (stage, kind), count in self.counts.items():
+            by_stage.setdefault(stage, {})[kind] = count
+        return {"stages": sorted(self.stages), "window_ms": self.window * 1000, "max_size": self.max_size, "by_stage": by_stage}
+
+
+PROMPT_BATCHER = PromptBatcher({stage.strip() for stage in BATCH_STAGES.split(",") if stage.strip()})
+
+Collected(
+    "greatagent_prompt_batches_total",
+    "Batched stage prompts (BATCH_STAGES): model calls (batch, single), prompts they carried, and per-prompt fallbacks.",
+    ("stage", "kind"),
+    lambda: dict(PROMPT_BATCHER.counts),
+    kind="counter",
+)
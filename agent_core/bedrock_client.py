@@ -1,14 +1,41 @@
 from __future__ import annotations
 
+import asyncio
 import os
+import re
+import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, AsyncIterator, Optional
 
 from langchain_aws import ChatBedrock
 from langchain_core.language_models import BaseLanguageModel
 from langchain_core.messages import HumanMessage
 
+from agent_core import fixtures
+from agent_core.fixtures import fixture_key
+from agent_core.governor import governor_for
+from agent_core.metrics import MODEL_TOKENS
+
+BEDROCK_MAX_WORKERS = int(os.environ.get("BEDROCK_MAX_WORKERS", "16"))
+
+# boto3 has no async transport, so blocking Bedrock calls share one bounded pool
+# instead of running on the event loop (or on asyncio's unbounded default executor).
+_EXECUTOR = ThreadPoolExecutor(max_workers=BEDROCK_MAX_WORKERS, thread_name_prefix="bedrock")
+
+
+_STREAM_END = object()
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+    return str(content)
+
 
 @dataclass
 class BedrockConfig:
@@ -16,28 +43,128 @@ class BedrockConfig:
     region: Optional[str] = os.environ.get("AWS_REGION")
     aws_access_key_id: Optional[str] = os.environ.get("AWS_ACCESS_KEY_ID")
     aws_secret_access_key: Optional[str] = os.environ.get("AWS_SECRET_ACCESS_KEY")
+    endpoint_url: Optional[str] = None
+    api_key: Optional[str] = None
 
 
 class ClaudeClient:
-    """Wrapper that uses Bedrock when credentials exist, otherwise emits demo text."""
+    """Wrapper that uses Bedrock when credentials exist, otherwise emits demo text.
+
+    With ``FIXTURE_MODE=replay`` it answers from recorded fixtures instead,
+    credentials or not; ``FIXTURE_MODE=record`` stores every real completion.
+    """
 
     def __init__(self, config: BedrockConfig | None = None) -> None:
         self.config = config or BedrockConfig()
-        self.demo_mode = not (
-            self.config.region and self.config.aws_access_key_id and self.config.aws_secret_access_key
+        has_credentials = bool(
+            self.config.region
+            and ((self.config.aws_access_key_id and self.config.aws_secret_access_key) or self.config.api_key)
         )
+        self.replaying = fixtures.replaying()
+        self.demo_mode = not has_credentials and not self.replaying
         self._llm: BaseLanguageModel | None = None
-        if not self.demo_mode:
+        if has_credentials and not self.replaying:
+            extra = {}
+            if self.config.endpoint_url:
+                extra["endpoint_url"] = self.config.endpoint_url
+            if self.config.api_key:
+                extra["api_key"] = self.config.api_key
             self._llm = ChatBedrock(
                 model_id=self.config.model,
                 region_name=self.config.region,
                 aws_access_key_id=self.config.aws_access_key_id,
                 aws_secret_access_key=self.config.aws_secret_access_key,
+                **extra,
             )
 
+    def _fixture_key(self, prompt: str) -> str:
+        return fixture_key(self.config.model, prompt)
+
     def complete(self, prompt: str) -> str:
+        if self.replaying:
+            return fixtures.FIXTURES.replay("bedrock", self._fixture_key(prompt), prompt)
         if self.demo_mode or not self._llm:
             demo_id = uuid.uuid4().hex[:6]
             return f"[Claude Demo {demo_id}] {prompt[:260]}"
+        started = time.perf_counter()
         response = self._llm.invoke([HumanMessage(content=prompt)])
-        return response.content if isinstance(response.content, str) else str(response.content)
+        text = response.content if isinstance(response.content, str) else str(response.content)
+        if fixtures.recording():
+            fixtures.FIXTURES.record("bedrock", self._fixture_key(prompt), text, time.perf_counter() - started, request=prompt)
+        self._count_tokens(prompt, text, getattr(response, "usage_metadata", None))
+        return text
+
+    def _count_tokens(self, prompt: str, text: str, usage: Optional[dict] = None) -> None:
+        usage = usage or {}
+        model = self.config.model
+        MODEL_TOKENS.inc(usage.get("input_tokens") or len(prompt) // 4, model=model, kind="prompt")
+        MODEL_TOKENS.inc(usage.get("output_tokens") or len(text) // 4, model=model, kind="completion")
+
+    async def acomplete(self, prompt: str) -> str:
+        """Same as complete(), but never blocks the calling event loop; throttling and 5xx are retried."""
+        if self.demo_mode:
+            return self.complete(prompt)
+        loop = asyncio.get_running_loop()
+        return await governor_for("bedrock", self.config.model).call(
+            lambda: loop.run_in_executor(_EXECUTOR, self.complete, prompt)
+        )
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the completion in chunks as Bedrock produces them."""
+        if self.demo_mode:
+            for piece in re.findall(r"\S+\s*", self.complete(prompt)):
+                yield piece
+            return
+        parts: list[str] = []
+        async for piece in governor_for("bedrock", self.config.model).stream(lambda: self._stream_once(prompt)):
+            parts.append(piece)
+            yield piece
+        if not self.replaying:
+            self._count_tokens(prompt, "".join(parts))
+
+    async def _stream_once(self, prompt: str) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        # set when the consumer goes away (e.g. a cancelled speculative guess): the thread stops at the next chunk
+        abandoned = threading.Event()
+
+        def pump() -> None:
+            key = self._fixture_key(prompt)
+            started = time.perf_counter()
+            first_chunk = None
+            parts: list[str] = []
+            try:
+                if self.replaying:
+                    source = fixtures.FIXTURES.replay_stream("bedrock", key, prompt)
+                else:
+                    source = (_text(chunk.content) for chunk in self._llm.stream([HumanMessage(content=prompt)]))
+                for text in source:
+                    if abandoned.is_set():
+                        source.close()  # drops the response stream, so Bedrock stops generating
+                        if not self.replaying:
+                            self._count_tokens(prompt, "".join(parts))  # what was generated is still billed
+                        return
+                    if text:
+                        if first_chunk is None:
+                            first_chunk = time.perf_counter() - started
+                        parts.append(text)
+                        loop.call_soon_threadsafe(chunks.put_nowait, text)
+            except Exception as exc:
+                loop.call_soon_threadsafe(chunks.put_nowait, exc)
+                return
+            if fixtures.recording():
+                fixtures.FIXTURES.record("bedrock", key, "".join(parts), time.perf_counter() - started, first_chunk, prompt)
+            loop.call_soon_threadsafe(chunks.put_nowait, _STREAM_END)
+
+        producer = loop.run_in_executor(_EXECUTOR, pump)
+        try:
+            while True:
+                item = await chunks.get()
+                if item is _STREAM_END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            abandoned.set()
+        await producer
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import astuple, replace
+from typing import Any, Callable, Dict
+
+from agent_core.bedrock_client import BedrockConfig, ClaudeClient
+
+# Off by default: the checked-in .env carries placeholder per-agent endpoints and models.
+AGENT_SETTINGS_ROUTING = os.environ.get("AGENT_SETTINGS_ROUTING", "").lower() in {"1", "true", "yes"}
+
+
+def config_for(agent_settings: Dict[str, str] | None = None) -> BedrockConfig:
+    """Bedrock config for one agent; per-agent model/api_base/api_key apply when routing is enabled."""
+    config = BedrockConfig()
+    if not AGENT_SETTINGS_ROUTING or not agent_settings:
+        return config
+    return replace(
+        config,
+        model=agent_settings.get("model") or config.model,
+        endpoint_url=agent_settings.get("api_base") or None,
+        api_key=agent_settings.get("api_key") or None,
+    )
+
+
+class ClientRegistry:
+    """Process-wide ClaudeClient instances, keyed by their full config.
+
+    Building a ChatBedrock client creates a boto session and connection pool,
+    so runs share warmed clients instead of constructing their own.
+    """
+
+    def __init__(self, factory: Callable[[BedrockConfig], ClaudeClient] = ClaudeClient) -> None:
+        self.factory = factory
+        self._clients: Dict[tuple, ClaudeClient] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def get(self, config: BedrockConfig) -> ClaudeClient:
+        key = astuple(config)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self.reused += 1
+                return client
+            client = self.factory(config)
+            self._clients[key] = client
+            self.created += 1
+            return client
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._clients.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"clients": len(self._clients), "created": self.created, "reused": self.reused}
+
+
+CLIENT_REGISTRY = ClientRegistry()
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+COMPLETION_CACHE_STAGES = os.environ.get("COMPLETION_CACHE_STAGES", "InputAgent,TaskDecomposer,WorkflowOrchestrator")
+COMPLETION_CACHE_TTL = float(os.environ.get("COMPLETION_CACHE_TTL", "3600"))
+COMPLETION_CACHE_MAX_ENTRIES = int(os.environ.get("COMPLETION_CACHE_MAX_ENTRIES", "1024"))
+COMPLETION_CACHE_PATH = os.environ.get("COMPLETION_CACHE_PATH")
+COMPLETION_CACHE_DISK_MAX_ENTRIES = int(os.environ.get("COMPLETION_CACHE_DISK_MAX_ENTRIES", "10000"))
+
+
+def cache_key(model: str, prompt: str, params: Dict[str, Any] | None = None) -> str:
+    raw = json.dumps({"model": model, "prompt": prompt, "params": params or {}}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _DiskTier:
+    def __init__(self, path: Path, max_entries: int) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        self._writes = 0
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, created_at REAL, value TEXT NOT NULL)"
+            )
+
+    def get(self, key: str, ttl: float) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM completions WHERE key = ? AND created_at > ?", (key, time.time() - ttl)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, created_at, value) VALUES (?, ?, ?)", (key, time.time(), value)
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._conn.execute(
+                    "DELETE FROM completions WHERE key NOT IN "
+                    "(SELECT key FROM completions ORDER BY created_at DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+
+class CompletionCache:
+    """Two-tier (in-memory LRU, optional SQLite) cache of raw model completions.
+
+    Only stages listed in ``stages`` are cached; hits and misses are counted per stage.
+    """
+
+    def __init__(
+        self,
+        stages: set[str],
+        ttl: float = COMPLETION_CACHE_TTL,
+        max_entries: int = COMPLETION_CACHE_MAX_ENTRIES,
+        path: str | None = COMPLETION_CACHE_PATH,
+        disk_max_entries: int = COMPLETION_CACHE_DISK_MAX_ENTRIES,
+    ) -> None:
+        self.stages = stages
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._disk = _DiskTier(Path(path), disk_max_entries) if path else None
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+
+    def enabled_for(self, stage: str) -> bool:
+        return stage in self.stages
+
+    async def get(self, stage: str, key: str) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry and entry[0] > time.time() - self.ttl:
+            self._memory.move_to_end(key)
+            self.hits[stage] += 1
+            return entry[1]
+        if entry:
+            del self._memory[key]
+        if self._disk is not None:
+            value = await asyncio.to_thread(self._disk.get, key, self.ttl)
+            if value is not None:
+                self._remember(key, value)
+                self.hits[stage] += 1
+                return value
+        self.misses[stage] += 1
+        return None
+
+    async def put(self, key: str, value: str) -> None:
+        self._remember(key, value)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.put, key, value)
+
+    def _remember(self, key: str, value: str) -> None:
+        self._memory[key] = (time.time(), value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "stages": sorted(self.stages),
+            "hits": dict(self.hits),
+            "misses": dict(self.misses),
+            "memory_entries": len(self._memory),
+            "disk_entries": len(self._disk) if self._disk is not None else None,
+        }
+
+
+COMPLETION_CACHE = CompletionCache({stage.strip() for stage in COMPLETION_CACHE_STAGES.split(",") if stage.strip()})
@@ -0,0 +1,313 @@
+"""Replay a set of queries through AgentPipeline and report throughput, per-stage latency and failure rates.
+
+Runs offline by default: ClaudeClient and Valyu use their demo output, with
+latency drawn from a simple model (fixed base + per-1k-prompt-token cost,
+log-normal jitter) so timings resemble a real deployment. ``--live`` uses the
+configured Bedrock and Valyu credentials instead. With ``FIXTURE_MODE`` set the
+real clients are always used, so calls are recorded to or replayed from the
+fixture store.
+
+Queries are JSONL, one ``{"id": ..., "query": ..., "mode": ...}`` object (or
+bare string) per line; ``--synthetic N`` generates N instead.
+
+    python -m agent_core.evaluate --queries queries.jsonl --workers 8 --out results.jsonl
+    python -m agent_core.evaluate --synthetic 200 --workers 16 --model-latency 0.8 --stages-out stages.parquet
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from agent_core import fixtures, valyu_tool
+from agent_core.bedrock_client import BedrockConfig, ClaudeClient
+from agent_core.client_registry import ClientRegistry
+from agent_core.completion_cache import COMPLETION_CACHE
+from agent_core.pipeline import AgentPipeline
+from agent_core.prompt_budget import estimate_tokens
+
+STEMS = ("InputAgent", "TaskDecomposer", "WorkflowOrchestrator")
+
+
+@dataclass
+class LatencyModel:
+    """Simulated provider latency: ``base + per_1k_tokens * prompt_tokens / 1000``, times log-normal jitter."""
+
+    model_base: float = 0.0
+    per_1k_tokens: float = 0.0
+    search: float = 0.0
+    jitter: float = 0.0  # sigma of the log-normal multiplier; 0 = deterministic
+    seed: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        self._rng = random.Random(self.seed)
+
+    def _jittered(self, seconds: float) -> float:
+        if seconds <= 0 or self.jitter <= 0:
+            return max(0.0, seconds)
+        # mean-preserving: E[lognormal(-s^2/2, s)] = 1
+        return seconds * self._rng.lognormvariate(-self.jitter ** 2 / 2, self.jitter)
+
+    def model(self, prompt: str) -> float:
+        return self._jittered(self.model_base + self.per_1k_tokens * estimate_tokens(prompt) / 1000)
+
+    def search_delay(self) -> float:
+        return self._jittered(self.search)
+
+
+class SimulatedClient(ClaudeClient):
+    """Demo-mode client that takes as long as the latency model says."""
+
+    def __init__(self, config: BedrockConfig, latency: LatencyModel) -> None:
+        # no credentials -> demo output, never a network call
+        super().__init__(replace(config, aws_access_key_id=None, aws_secret_access_key=None, api_key=None))
+        self.latency = latency
+
+    async def acomplete(self, prompt: str) -> str:
+        await asyncio.sleep(self.latency.model(prompt))
+        return self.complete(prompt)
+
+    async def astream(self, prompt: str):
+        yield await self.acomplete(prompt)
+
+
+def simulated_search(latency: LatencyModel):
+    async def search(query: str) -> list[str]:
+        await asyncio.sleep(latency.search_delay())
+        return valyu_tool._demo_results(query)
+
+    return search
+
+
+def load_queries(path: str) -> list[Dict[str, Any]]:
+    handle = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    with handle:
+        lines = [line for line in handle if line.strip()]
+    queries = []
+    for idx, line in enumerate(lines):
+        item = json.loads(line)
+        if isinstance(item, str):
+            item = {"query": item}
+        item.setdefault("id", str(idx))
+        queries.append(item)
+    return queries
+
+
+def synthetic_queries(count: int, seed: int) -> list[Dict[str, Any]]:
+    rng = random.Random(seed)
+    topics = ["solar storage", "EU AI act", "battery recycling", "LLM evaluation", "heat pumps", "GLP-1 drugs"]
+    asks = ["Summarize the latest on {}", "Compare the main approaches to {}", "What are the risks of {}?"]
+    return [{"id": str(i), "query": rng.choice(asks).format(rng.choice(topics))} for i in range(count)]
+
+
+async def run_query(pipeline: AgentPipeline, item: Dict[str, Any]) -> Dict[str, Any]:
+    """One query through the stem stages and its plan, auto-picking the first option (agents-only mode)."""
+    stages: list[Dict[str, Any]] = []
+    record: Dict[str, Any] = {"id": item["id"], "query": item["query"], "ok": True, "error": None, "stages": stages}
+    mode = item.get("mode", "agents_only")
+    started = time.perf_counter()
+
+    async def stage(node: str, call):
+        kind = node.split(":", 1)[0]
+        before = dict(pipeline._timing(kind))
+        entry: Dict[str, Any] = {"node": node, "stage": kind, "ok": True}
+        stages.append(entry)
+        stage_started = time.perf_counter()
+        try:
+            entry["output"] = await call
+        except Exception as exc:
+            entry.update(ok=False, error=f"{type(exc).__name__}: {exc}")
+            raise
+        finally:
+            entry["ms"] = round((time.perf_counter() - stage_started) * 1000, 2)
+            after = pipeline._timing(kind)
+            for key, value in after.items():
+                delta = value - before.get(key, 0)
+                if delta:
+                    entry[key] = round(delta, 2)
+        return entry["output"]
+
+    try:
+        intake = await stage("InputAgent", pipeline.arun_input(item["query"], mode, None))
+        query = intake["normalized_query"]
+        plan = await stage(
+            "TaskDecomposer", pipeline.arun_decomposer(query, intake["tools_needed"], intake["constraints"])
+        )
+        steps = item.get("plan") or plan["workflow_plan"]
+        await stage("WorkflowOrchestrator", pipeline.arun_workflow(steps, intake["engagement_mode"]))
+        picks: list[str] = []
+        analysis_pick = query
+        validation: Dict[str, Any] = {}
+        for node in steps:
+            kind = node.split(":", 1)[0]
+            if kind == "ResearchAgent":
+                research = await stage(node, pipeline.arun_research(query))
+                picks.append(research["candidates"][0] if research["candidates"] else "")
+            elif kind == "AnalysisAgent":
+                analysis = await stage(node, pipeline.arun_analysis(picks or [query]))
+                analysis_pick = analysis["options"][0] if analysis["options"] else ""
+            elif kind == "ValidationAgent":
+                validation = await stage(node, pipeline.arun_validation(analysis_pick))
+            elif kind == "OutputAgent":
+                final = await stage(node, pipeline.arun_output(analysis_pick, validation))
+                record["final"] = final["final_text"]
+    except Exception as exc:
+        record.update(ok=False, error=f"{type(exc).__name__}: {exc}")
+    record["total_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return record
+
+
+async def evaluate(
+    queries: list[Dict[str, Any]],
+    workers: int,
+    latency: Optional[LatencyModel],
+    cache: bool = False,
+) -> tuple[list[Dict[str, Any]], float]:
+    """Run every query with ``workers`` in flight; returns the records (in input order) and the wall time."""
+    if latency is not None:
+        valyu_tool.VALYU_API_KEY = None  # offline even if a key is configured
+        clients = ClientRegistry(factory=lambda config: SimulatedClient(config, latency))
+        search = simulated_search(latency)
+    else:
+        clients, search = ClientRegistry(), valyu_tool.avalyu_search
+    pending: asyncio.Queue = asyncio.Queue()
+    for idx, item in enumerate(queries):
+        pending.put_nowait((idx, item))
+    records: list[Optional[Dict[str, Any]]] = [None] * len(queries)
+
+    async def worker() -> None:
+        while not pending.empty():
+            idx, item = pending.get_nowait()
+            # a pipeline per query, so per-stage timings don't mix
+            pipeline = AgentPipeline(cache=COMPLETION_CACHE if cache else None, clients=clients, search=search)
+            records[idx] = await run_query(pipeline, item)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, workers))))
+    return [record for record in records if record is not None], time.perf_counter() - started
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+def summarize(records: list[Dict[str, Any]], wall: float, workers: int) -> Dict[str, Any]:
+    stages: Dict[str, Dict[str, list]] = {}
+    for record in records:
+        for entry in record["stages"]:
+            bucket = stages.setdefault(entry["stage"], {"ms": [], "failed": [], "unparsed": []})
+            bucket["ms"].append(entry["ms"])
+            bucket["failed"].append(not entry["ok"])
+            bucket["unparsed"].append(bool(entry.get("parse_failures")))
+    totals = [record["total_ms"] for record in records]
+    failed = sum(not record["ok"] for record in records)
+    return {
+        "queries": len(records),
+        "workers": workers,
+        "wall_s": round(wall, 3),
+        "throughput_qps": round(len(records) / wall, 3) if wall else 0.0,
+        "failure_rate": round(failed / len(records), 4) if records else 0.0,
+        "total_ms": {f"p{p}": round(percentile(totals, p), 1) for p in (50, 95, 99)},
+        "stages": {
+            stage: {
+                "n": len(bucket["ms"]),
+                **{f"p{p}_ms": round(percentile(bucket["ms"], p), 1) for p in (50, 95, 99)},
+                "failure_rate": round(sum(bucket["failed"]) / len(bucket["ms"]), 4),
+                "parse_fallback_rate": round(sum(bucket["unparsed"]) / len(bucket["ms"]), 4),
+            }
+            for stage, bucket in sorted(stages.items(), key=lambda kv: _stage_order(kv[0]))
+        },
+    }
+
+
+def _stage_order(stage: str) -> tuple[int, str]:
+    order = STEMS + ("ResearchAgent", "AnalysisAgent", "ValidationAgent", "OutputAgent")
+    return (order.index(stage) if stage in order else len(order), stage)
+
+
+def stage_rows(records: Iterable[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+    """One flat row per (query, stage): the columnar view for dataframes and Parquet."""
+    for record in records:
+        for entry in record["stages"]:
+            row = {"id": record["id"], **{k: v for k, v in entry.items() if k != "output"}}
+            row["output"] = json.dumps(entry.get("output"), ensure_ascii=False, default=str)
+            yield row
+
+
+def write_rows(path: str, rows: Iterable[Dict[str, Any]]) -> None:
+    rows = list(rows)
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("writing .parquet needs pyarrow (pip install pyarrow); use a .jsonl path instead")
+        columns = sorted({key for row in rows for key in row})
+        pq.write_table(pa.table({key: [row.get(key) for row in rows] for key in columns}), path)
+        return
+    with open(path, "w", encoding="utf-8") as fh:
+        for row in rows:
+            fh.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+
+
+def print_report(summary: Dict[str, Any]) -> None:
+    print(
+        f"{summary['queries']} queries, {summary['workers']} workers: {summary['wall_s']}s wall, "
+        f"{summary['throughput_qps']} queries/s, {summary['failure_rate']:.1%} failed"
+    )
+    total = summary["total_ms"]
+    print(f"end to end  p50 {total['p50']:>9.1f}ms  p95 {total['p95']:>9.1f}ms  p99 {total['p99']:>9.1f}ms")
+    print(f"{'stage':<22}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'failed':>9}{'unparsed':>10}")
+    for stage, row in summary["stages"].items():
+        print(
+            f"{stage:<22}{row['n']:>6}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+            f"{row['failure_rate']:>9.1%}{row['parse_fallback_rate']:>10.1%}"
+        )
+
+
+def main(argv: Optional[list[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--queries", help="JSONL file of queries ('-' for stdin)")
+    source.add_argument("--synthetic", type=int, metavar="N", help="generate N queries instead")
+    parser.add_argument("--workers", type=int, default=8, help="queries in flight at once")
+    parser.add_argument("--out", help="per-query records (JSONL)")
+    parser.add_argument("--stages-out", help="one row per query and stage (.jsonl, or .parquet with pyarrow)")
+    parser.add_argument("--summary-out", help="summary report as JSON")
+    parser.add_argument("--live", action="store_true", help="call the configured Bedrock/Valyu instead of demo mode")
+    parser.add_argument("--cache", action="store_true", help="use the process completion cache")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="simulated seconds per model call")
+    parser.add_argument("--per-1k-tokens", type=float, default=0.0, help="extra simulated seconds per 1k prompt tokens")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="simulated seconds per search")
+    parser.add_argument("--jitter", type=float, default=0.25, help="sigma of the log-normal latency jitter")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    queries = load_queries(args.queries) if args.queries else synthetic_queries(args.synthetic, args.seed)
+    latency = None if args.live or fixtures.FIXTURES is not None else LatencyModel(
+        args.model_latency, args.per_1k_tokens, args.search_latency, args.jitter, args.seed
+    )
+    records, wall = asyncio.run(evaluate(queries, args.workers, latency, args.cache))
+    summary = summarize(records, wall, args.workers)
+    if args.out:
+        write_rows(args.out, records)
+    if args.stages_out:
+        write_rows(args.stages_out, stage_rows(records))
+    if args.summary_out:
+        Path(args.summary_out).write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    print_report(summary)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterator, NamedTuple, Optional
+
+from agent_core.metrics import Collected
+
+FIXTURE_MODE = os.environ.get("FIXTURE_MODE", "off")
+# Same data directory as controller/run_store.py's DATA_DIR (agent_core does not import the controller).
+DATA_DIR = Path(os.environ.get("GREATAGENT_DATA_DIR", "data"))
+FIXTURE_PATH = Path(os.environ.get("FIXTURE_PATH", DATA_DIR / "fixtures.sqlite3"))
+# Replay speed: 0 answers instantly, 1 takes as long as the recorded call did, 2 twice as long.
+FIXTURE_LATENCY = float(os.environ.get("FIXTURE_LATENCY", "1"))
+
+
+class FixtureMissing(LookupError):
+    def __init__(self, kind: str, request: str) -> None:
+        super().__init__(f"no recorded {kind} response for {request[:120]!r}; record it with FIXTURE_MODE=record")
+
+
+class Fixture(NamedTuple):
+    response: Any
+    latency: float
+    first_chunk: Optional[float]
+
+
+def fixture_key(*parts: Any) -> str:
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class FixtureStore:
+    """Recorded request/response pairs of outbound calls (Bedrock, Valyu, LangSmith) with their timing.
+
+    ``record`` mode stores every real response; ``replay`` mode serves them
+    instead of calling out. A request recorded several times replays its
+    responses in recorded order, wrapping around, so repeated runs see the
+    same sequence.
+    """
+
+    def __init__(self, path: Path = FIXTURE_PATH, mode: str = FIXTURE_MODE, latency_scale: float = FIXTURE_LATENCY) -> None:
+        if mode not in {"record", "replay"}:
+            raise ValueError(f"unknown FIXTURE_MODE {mode!r} (expected 'off', 'record' or 'replay')")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        self._loaded: Dict[tuple[str, str], list[Fixture]] = {}
+        self._served: Counter[tuple[str, str]] = Counter()
+        self.counters: Counter[tuple[str, str]] = Counter()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS fixtures ("
+                " kind TEXT, key TEXT, seq INTEGER, request TEXT, response TEXT NOT NULL,"
+                " latency REAL, first_chunk REAL, recorded_at REAL, PRIMARY KEY (kind, key, seq))"
+            )
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def record(
+        self,
+        kind: str,
+        key: str,
+        response: Any,
+        latency: float,
+        first_chunk: Optional[float] = None,
+        request: str = "",
+        once: bool = False,
+    ) -> None:
+        """Append a response; ``once`` skips requests that already have one (e.g. deterministic demo output)."""
+        with self._lock, self._conn:
+            seq = self._conn.execute("SELECT COUNT(*) FROM fixtures WHERE kind = ? AND key = ?", (kind, key)).fetchone()[0]
+            if once and seq:
+                return
+            self._conn.execute(
+                "INSERT INTO fixtures (kind, key, seq, request, response, latency, first_chunk, recorded_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (kind, key, seq, request, json.dumps(response, ensure_ascii=False), latency, first_chunk, time.time()),
+            )
+            self.counters[(kind, "recorded")] += 1
+
+    def _next(self, kind: str, key: str, request: str) -> Fixture:
+        with self._lock:
+            fixtures = self._loaded.get((kind, key))
+            if fixtures is None:
+                rows = self._conn.execute(
+                    "SELECT response, latency, first_chunk FROM fixtures WHERE kind = ? AND key = ? ORDER BY seq", (kind, key)
+                ).fetchall()
+                fixtures = self._loaded[(kind, key)] = [Fixture(json.loads(r), l or 0.0, f) for r, l, f in rows]
+            if not fixtures:
+                self.counters[(kind, "missing")] += 1
+                raise FixtureMissing(kind, request)
+            fixture = fixtures[self._served[(kind, key)] % len(fixtures)]
+            self._served[(kind, key)] += 1
+            self.counters[(kind, "replayed")] += 1
+        return fixture
+
+    def replay(self, kind: str, key: str, request: str = "") -> Any:
+        """The next recorded response, after the (scaled) recorded latency; blocks the calling thread."""
+        fixture = self._next(kind, key, request)
+        if self.latency_scale > 0:
+            time.sleep(fixture.latency * self.latency_scale)
+        return fixture.response
+
+    async def areplay(self, kind: str, key: str, request: str = "") -> Any:
+        fixture = self._next(kind, key, request)
+        if self.latency_scale > 0:
+            await asyncio.sleep(fixture.latency * self.latency_scale)
+        return fixture.response
+
+    def replay_stream(self, kind: str, key: str, request: str = "") -> Iterator[str]:
+        """A recorded text response in word-sized chunks: the first after the recorded time to first chunk,
+        the rest spread over the remaining recorded latency."""
+        fixture = self._next(kind, key, request)
+        pieces = re.findall(r"\S+\s*", str(fixture.response)) or [str(fixture.response)]
+        first = fixture.latency if fixture.first_chunk is None else fixture.first_chunk
+        rest = max(0.0, fixture.latency - first) / max(1, len(pieces) - 1)
+        for idx, piece in enumerate(pieces):
+            if self.latency_scale > 0:
+                time.sleep((first if idx == 0 else rest) * self.latency_scale)
+            yield piece
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            recorded = self._conn.execute("SELECT kind, COUNT(*) FROM fixtures GROUP BY kind").fetchall()
+        return {
+            "mode": self.mode,
+            "stored": dict(recorded),
+            **{f"{kind}_{outcome}": count for (kind, outcome), count in self.counters.items()},
+        }
+
+
+FIXTURES: Optional[FixtureStore] = None if FIXTURE_MODE == "off" else FixtureStore()
+
+
+def replaying() -> bool:
+    return FIXTURES is not None and FIXTURES.replaying
+
+
+def recording() -> bool:
+    return FIXTURES is not None and FIXTURES.recording
+
+
+Collected(
+    "greatagent_fixture_calls_total",
+    "Outbound calls recorded to or replayed from the fixture store (FIXTURE_MODE).",
+    ("kind", "outcome"),
+    lambda: dict(FIXTURES.counters) if FIXTURES else {},
+    kind="counter",
+)
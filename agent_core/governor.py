@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+THROTTLE_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceQuotaExceededException"}
+TRANSIENT_CODES = {"ServiceUnavailableException", "InternalServerException", "ModelNotReadyException", "ModelTimeoutException"}
+
+
+def _env(kind: str, name: str, default: str) -> float:
+    return float(os.environ.get(f"{kind.upper()}_{name}", os.environ.get(f"GOVERNOR_{name}", default)))
+
+
+@dataclass
+class GovernorPolicy:
+    rate: float = 0.0  # requests per second; 0 disables the token bucket
+    burst: float = 1.0
+    max_concurrency: int = 16
+    max_attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    breaker_failures: int = 5
+    breaker_cooldown: float = 30.0
+
+    @classmethod
+    def from_env(cls, kind: str) -> "GovernorPolicy":
+        """``<KIND>_<SETTING>`` (e.g. ``BEDROCK_RATE``) falls back to ``GOVERNOR_<SETTING>``."""
+        return cls(
+            rate=_env(kind, "RATE", "0"),
+            burst=_env(kind, "BURST", "5"),
+            max_concurrency=int(_env(kind, "MAX_CONCURRENCY", "16")),
+            max_attempts=int(_env(kind, "MAX_ATTEMPTS", "4")),
+            base_delay=_env(kind, "RETRY_BASE_DELAY", "0.5"),
+            max_delay=_env(kind, "RETRY_MAX_DELAY", "8"),
+            breaker_failures=int(_env(kind, "BREAKER_FAILURES", "5")),
+            breaker_cooldown=_env(kind, "BREAKER_COOLDOWN", "30"),
+        )
+
+
+class CircuitOpen(RuntimeError):
+    def __init__(self, key: str, retry_in: float) -> None:
+        super().__init__(f"{key} is failing; circuit open for another {retry_in:.1f}s")
+        self.key = key
+        self.retry_in = retry_in
+
+
+def classify(exc: BaseException) -> Optional[str]:
+    """"throttle", "transient" or None (not worth retrying) for a provider error."""
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    if isinstance(response, dict):  # botocore ClientError
+        code = response.get("Error", {}).get("Code", "")
+        if code in THROTTLE_CODES:
+            return "throttle"
+        if code in TRANSIENT_CODES:
+            return "transient"
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    if status == 429:
+        return "throttle"
+    if isinstance(status, int) and status >= 500:
+        return "transient"
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return "transient"
+    name = type(exc).__name__
+    if name in {
+        "ConnectTimeout", "ReadTimeout", "ConnectError", "ReadError", "RemoteProtocolError", "ConnectionError", "Timeout",
+        "EndpointConnectionError", "ConnectionClosedError", "ReadTimeoutError", "ConnectTimeoutError",
+    }:
+        return "transient"
+    if status is None and ("Throttl" in str(exc) or "Too many requests" in str(exc)):
+        return "throttle"
+    return None
+
+
+def _retry_after(exc: BaseException) -> float:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take a token (possibly borrowing from the future) and return how long to wait for it."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+
+class _AimdWindow:
+    """Concurrency limit that grows by one per window of successes and halves on throttling."""
+
+    def __init__(self, limit: int) -> None:
+        self.max_limit = max(1, limit)
+        self.limit = float(self.max_limit)
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> None:
+        while self.active >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                else:
+                    self._wake()  # pass the wakeup on
+                raise
+        self.active += 1
+
+    def release(self) -> None:
+        self.active -= 1
+        self._wake()
+
+    def on_success(self) -> None:
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake()
+
+    def on_throttle(self) -> None:
+        self.limit = max(1.0, self.limit / 2)
+
+    def _wake(self) -> None:
+        free = int(self.limit) - self.active
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.get_loop().call_soon_threadsafe(_resolve, waiter)
+                free -= 1
+
+
+def _resolve(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class _Breaker:
+    def __init__(self, failures: int, cooldown: float) -> None:
+        self.threshold = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def check(self, key: str) -> None:
+        state = self.state
+        if state == "open" or (state == "half_open" and self._probing):
+            raise CircuitOpen(key, max(0.0, self.cooldown - (time.monotonic() - (self.opened_at or 0))))
+        if state == "half_open":
+            self._probing = True
+
+    def record(self, ok: Optional[bool]) -> None:
+        """ok=None: the provider answered but was busy; ends a probe without changing the state."""
+        self._probing = False
+        if ok is None:
+            return
+        if ok:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+class Governor:
+    """Rate limit, adaptive concurrency, retry and circuit breaker for one outbound target.
+
+    Throttling (429 / ThrottlingException) halves the concurrency window and is
+    retried; 5xx and connection errors are retried and count towards the breaker.
+    Anything else is raised immediately.
+    """
+
+    def __init__(self, key: str, policy: GovernorPolicy) -> None:
+        self.key = key
+        self.policy = policy
+        self.bucket = _TokenBucket(policy.rate, policy.burst)
+        self.window = _AimdWindow(policy.max_concurrency)
+        self.breaker = _Breaker(policy.breaker_failures, policy.breaker_cooldown)
+        self.counters: Counter[str] = Counter()
+
+    def _backoff(self, attempt: int, exc: BaseException) -> float:
+        ceiling = min(self.policy.max_delay, self.policy.base_delay * 2 ** attempt)
+        return max(random.uniform(0, ceiling), min(self.policy.max_delay, _retry_after(exc)))
+
+    def _failed(self, exc: BaseException, attempt: int) -> float:
+        """Record a failed attempt; re-raise unless it should be retried, else return the backoff."""
+        kind = classify(exc)
+        if kind is None:
+            self.counters["errors"] += 1
+            self.breaker.record(None)
+            raise exc
+        self.counters[kind] += 1
+        if kind == "throttle":
+            self.window.on_throttle()
+            self.breaker.record(None)
+        else:
+            self.breaker.record(False)
+        if attempt + 1 >= self.policy.max_attempts:
+            self.counters["gave_up"] += 1
+            raise exc
+        self.counters["retries"] += 1
+        return self._backoff(attempt, exc)
+
+    def _succeeded(self) -> None:
+        self.counters["ok"] += 1
+        self.window.on_success()
+        self.breaker.record(True)
+
+    async def _enter(self) -> None:
+        self.breaker.check(self.key)
+        self.counters["calls"] += 1
+        try:
+            delay = self.bucket.reserve()
+            if delay:
+                await asyncio.sleep(delay)
+            await self.window.acquire()
+        except BaseException:
+            self.breaker.record(None)  # cancelled before the call: a half-open probe must not stay claimed
+            raise
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        for attempt in range(self.policy.max_attempts):
+            try:
+                await self._enter()
+            except CircuitOpen:
+                self.counters["short_circuited"] += 1
+                raise
+            try:
+                result = await fn()
+            except Exception as exc:
+                delay = self._failed(exc, attempt)
+            except BaseException:
+                self.breaker.record(None)  # cancelled mid-call; ends a probe, proves nothing either way
+                raise
+            else:
+                self._succeeded()
+                return result
+            finally:
+                self.window.release()
+            await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
+
+    async def stream(self, open_stream: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Like call(), for streams: retried only while nothing has been yielded yet."""
+        for attempt in range(self.policy.max_attempts):
+            try:
+                await self._enter()
+            except CircuitOpen:
+                self.counters["short_circuited"] += 1
+                raise
+            started = False
+            try:
+                async for item in open_stream():
+                    started = True
+                    yield item
+            except Exception as exc:
+                if started:
+                    self.counters["errors"] += 1
+                    self.breaker.record(None)
+                    raise
+                delay = self._failed(exc, attempt)
+            except BaseException:
+                self.breaker.record(None)  # cancelled, or the consumer closed the stream early
+                raise
+            else:
+                self._succeeded()
+                return
+            finally:
+                self.window.release()
+            await asyncio.sleep(delay)
+
+    def call_sync(self, fn: Callable[[], T]) -> T:
+        """Blocking callers get retry and the breaker, but not the async limiter."""
+        for attempt in range(self.policy.max_attempts):
+            try:
+                self.breaker.check(self.key)
+            except CircuitOpen:
+                self.counters["short_circuited"] += 1
+                raise
+            self.counters["calls"] += 1
+            try:
+                result = fn()
+            except Exception as exc:
+                delay = self._failed(exc, attempt)
+            except BaseException:
+                self.breaker.record(None)
+                raise
+            else:
+                self._succeeded()
+                return result
+            time.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "window": round(self.window.limit, 2),
+            "active": self.window.active,
+            "breaker": self.breaker.state,
+        }
+
+
+POLICIES: Dict[str, GovernorPolicy] = {kind: GovernorPolicy.from_env(kind) for kind in ("bedrock", "valyu")}
+GOVERNORS: Dict[str, Governor] = {}
+
+
+def governor_for(kind: str, target: str) -> Governor:
+    """Shared governor per (kind, target), e.g. ("bedrock", model_id) or ("valyu", endpoint)."""
+    key = f"{kind}:{target}"
+    governor = GOVERNORS.get(key)
+    if governor is None:
+        governor = GOVERNORS[key] = Governor(key, POLICIES.get(kind) or GovernorPolicy.from_env(kind))
+    return governor
+
+
+def governor_stats() -> Dict[str, Any]:
+    return {key: governor.stats() for key, governor in GOVERNORS.items()}
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict, Iterator, Optional, Type
+
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+try:  # optional: several times faster on the multi-kilobyte research/analysis payloads
+    import orjson
+
+    def loads(text: str) -> Any:
+        return orjson.loads(text)
+
+    JSON_BACKEND = "orjson"
+except ImportError:  # pragma: no cover - depends on the environment
+    loads = json.loads
+    JSON_BACKEND = "json"
+
+# Characters that matter while looking for the end of a JSON value.
+_STRUCTURE = re.compile(r'[\[\]{}"\\]')
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class ParseError(ValueError):
+    """Model output that holds no JSON value matching the stage's schema."""
+
+
+def _value_end(text: str, start: int) -> int:
+    """Index just past the bracketed value opening at ``start``, or -1 if it never closes."""
+    stack = [_CLOSERS[text[start]]]
+    in_string = False
+    skip = -1
+    for match in _STRUCTURE.finditer(text, start + 1):
+        pos = match.start()
+        if pos == skip:
+            continue
+        ch = match.group()
+        if in_string:
+            if ch == "\\":
+                skip = pos + 1
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+        elif ch != "\\":
+            if ch != stack.pop():
+                return -1
+            if not stack:
+                return pos + 1
+    return -1
+
+
+def iter_json(text: str, openers: str = "{[") -> Iterator[Any]:
+    """Every balanced JSON value in ``text``, in order; prose, code fences and trailing remarks are skipped."""
+    stripped = text.strip()
+    if stripped[:1] in openers:
+        try:
+            yield loads(stripped)  # the common case: the reply is nothing but JSON
+            return
+        except ValueError:
+            pass
+    pos = 0
+    while True:
+        starts = [idx for idx in (text.find(ch, pos) for ch in openers) if idx >= 0]
+        if not starts:
+            return
+        start = min(starts)
+        end = _value_end(text, start)
+        if end > 0:
+            try:
+                yield loads(text[start:end])
+                pos = end
+                continue
+            except ValueError:
+                pass
+        pos = start + 1
+
+
+def extract_json(text: str, openers: str = "{[") -> Optional[Any]:
+    """The first balanced JSON value in ``text``, or None."""
+    return next(iter_json(text, openers), None)
+
+
+class _StageOutput(BaseModel):
+    # Every field is optional: the stage fills in its own defaults for what the model left out.
+    model_config = ConfigDict(extra="allow")
+
+
+class InputOutput(_StageOutput):
+    normalized_query: Optional[str] = None
+    engagement_mode: Optional[str] = None
+    tools_needed: Optional[list[str]] = None
+    constraints: Optional[list[str]] = None
+
+
+class DecomposerOutput(_StageOutput):
+    workflow_plan: Optional[list[str]] = None
+
+
+class WorkflowStep(BaseModel):
+    agent: str
+    notes: str = ""
+    requires_human: bool = False
+
+
+class WorkflowOutput(_StageOutput):
+    steps: Optional[list[WorkflowStep]] = None
+    control_panel: Optional[Dict[str, Any]] = None
+
+
+class ResearchOutput(_StageOutput):
+    candidates: Optional[list[str]] = None
+
+
+class AnalysisOutput(_StageOutput):
+    options: Optional[list[str]] = None
+    rationale: Optional[str] = None
+
+
+class ValidationOutput(_StageOutput):
+    is_consistent: Optional[bool] = None
+    confidence: Optional[float] = None
+    notes: Optional[str] = None
+
+
+class FinalOutput(_StageOutput):
+    final_text: Optional[str] = None
+
+
+STAGE_SCHEMAS: Dict[str, Type[_StageOutput]] = {
+    "InputAgent": InputOutput,
+    "TaskDecomposer": DecomposerOutput,
+    "WorkflowOrchestrator": WorkflowOutput,
+    "ResearchAgent": ResearchOutput,
+    "AnalysisAgent": AnalysisOutput,
+    "ValidationAgent": ValidationOutput,
+    "OutputAgent": FinalOutput,
+}
+
+
+def parse_stage_output(stage: str, text: str) -> Dict[str, Any]:
+    """The first JSON object in ``text`` that satisfies the stage's schema, as a plain dict.
+
+    Raises ParseError naming what was wrong, which is fed back to the model
+    in the repair prompt.
+    """
+    schema = STAGE_SCHEMAS.get(stage)
+    problem = "no JSON object found"
+    for value in iter_json(text, "{"):
+        if schema is None:
+            return value
+        try:
+            return schema.model_validate(value).model_dump(exclude_none=True)
+        except ValidationError as exc:
+            problem = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()[:5]
+            )
+    raise ParseError(problem)
+
+
+def schema_hint(stage: str) -> str:
+    schema = STAGE_SCHEMAS.get(stage)
+    return json.dumps(schema.model_json_schema()) if schema else "a JSON object"
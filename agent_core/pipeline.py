@@ -1,39 +1,184 @@
 from __future__ import annotations
 
-import json
+import asyncio
 import os
+import time
 import uuid
-from typing import Any, Dict
+from typing import Any, Awaitable, Callable, Dict, Optional
 
+from agent_core.batching import PROMPT_BATCHER, PromptBatcher
 from agent_core.bedrock_client import ClaudeClient
+from agent_core.client_registry import CLIENT_REGISTRY, ClientRegistry, config_for
+from agent_core.completion_cache import COMPLETION_CACHE, CompletionCache, cache_key
+from agent_core.metrics import MODEL_SECONDS, PARSE_OUTCOMES, PARSE_SECONDS, PROMPT_TOKENS_SAVED
+from agent_core.output_parsing import ParseError, parse_stage_output, schema_hint
+from agent_core.prompt_budget import budget_for, estimate_tokens, fit_evenly, fit_snippets, saved_tokens, truncate
 from agent_core.prompts import (
     ANALYSIS_PROMPT,
     DECOMPOSE_PROMPT,
     INPUT_PROMPT,
     OUTPUT_PROMPT,
+    REPAIR_PROMPT,
     RESEARCH_PROMPT,
     VALIDATION_PROMPT,
     WORKFLOW_PROMPT,
 )
-from agent_core.valyu_tool import valyu_search
+from agent_core.stream_json import JsonArrayScanner
+from agent_core.valyu_tool import avalyu_search
+
+# search(query) -> snippets; the evaluation harness swaps in a simulated one.
+SearchFn = Callable[[str], Awaitable[list[str]]]
+
+STREAM_STAGES = {
+    stage.strip()
+    for stage in os.environ.get("STREAM_STAGES", "ResearchAgent,AnalysisAgent,OutputAgent").split(",")
+    if stage.strip()
+}
+# One re-prompt with the parse error when a stage's reply holds no usable JSON.
+PARSE_REPAIR = os.environ.get("PARSE_REPAIR", "1") not in {"0", "false", "no"}
+# List fields surfaced item by item while a stage is still streaming.
+STREAM_ITEM_FIELDS = {"ResearchAgent": "candidates", "AnalysisAgent": "options"}
+
+# on_delta(stage, text, partial): partial is {"field", "start", "items"} once list items complete.
+DeltaCallback = Callable[[str, str, Optional[Dict[str, Any]]], Awaitable[None]]
+
+DEFAULT_PLAN = ["ResearchAgent", "AnalysisAgent", "ValidationAgent", "OutputAgent"]
+# Stages where the operator picks among options when a human is engaged.
+HUMAN_STAGES = {"ResearchAgent", "AnalysisAgent"}
+
+
+def default_workflow(plan: list[str], mode: str) -> Dict[str, Any]:
+    """The orchestrator's output when the model gives none (or isn't asked, see ``controller/fast_path.py``)."""
+    steps = [{"agent": agent, "notes": "Auto-generated", "requires_human": agent in HUMAN_STAGES} for agent in plan]
+    return {"steps": steps, "control_panel": {"mode": mode}}
 
 
 class AgentPipeline:
-    def __init__(self) -> None:
-        self.claude = ClaudeClient()
+    """Agent stages. The ``arun_*`` coroutines are the primary API; ``run_*`` are blocking wrappers."""
+
+    def __init__(
+        self,
+        cache: CompletionCache | None = COMPLETION_CACHE,
+        agent_settings: Dict[str, Dict[str, str]] | None = None,
+        clients: ClientRegistry = CLIENT_REGISTRY,
+        on_delta: DeltaCallback | None = None,
+        search: SearchFn = avalyu_search,
+        batcher: PromptBatcher | None = PROMPT_BATCHER,
+    ) -> None:
+        self.clients = clients
+        self.batcher = batcher
+        self.on_delta = on_delta
+        self.search = search
+        self.agent_settings = agent_settings or {}
+        self.claude = clients.get(config_for())
+        self.cache = cache
+        # per stage: model_ms, parse_ms, calls, cache_hits (+ repairs, parse_failures, prompt_tokens_saved), accumulated over this pipeline's lifetime
+        self.timings: Dict[str, Dict[str, float]] = {}
         self.demo_trace = os.environ.get("LANGSMITH_DEMO_URL", "https://smith.langchain.com/public/demo")
 
-    def _invoke(self, prompt: str) -> Dict[str, Any]:
-        response = self.claude.complete(prompt)
+    def _client(self, stage: str) -> ClaudeClient:
+        settings = self.agent_settings.get(stage)
+        return self.clients.get(config_for(settings)) if settings else self.claude
+
+    def _timing(self, stage: str) -> Dict[str, float]:
+        timing = self.timings.get(stage)
+        if timing is None:
+            timing = self.timings[stage] = {"model_ms": 0.0, "parse_ms": 0.0, "calls": 0, "cache_hits": 0}
+        return timing
+
+    def _budget(self, stage: str) -> int:
+        return budget_for(stage, self.agent_settings.get(stage))
+
+    def _saved(self, stage: str, before: list[str], after: list[str]) -> None:
+        saved = saved_tokens(before, after)
+        if saved:
+            timing = self._timing(stage)
+            timing["prompt_tokens_saved"] = timing.get("prompt_tokens_saved", 0) + saved
+            PROMPT_TOKENS_SAVED.inc(saved, stage=stage)
+
+    async def _complete(self, stage: str, prompt: str, stream: bool = True) -> str:
+        client = self._client(stage)
+        timing = self._timing(stage)
+        timing["calls"] += 1
+        key = None
+        if self.cache and self.cache.enabled_for(stage):
+            key = cache_key(client.config.model, prompt, {"demo": client.demo_mode})
+            cached = await self.cache.get(stage, key)
+            if cached is not None:
+                timing["cache_hits"] += 1
+                return cached
+        started = time.perf_counter()
+        response = await self._generate(client, stage, prompt, stream)
+        elapsed = time.perf_counter() - started
+        timing["model_ms"] += elapsed * 1000
+        MODEL_SECONDS.observe(elapsed, stage=stage, model=client.config.model)
+        if key is not None:
+            await self.cache.put(key, response)
+        return response
+
+    async def _generate(self, client: ClaudeClient, stage: str, prompt: str, stream: bool = True) -> str:
+        if not stream or self.on_delta is None or stage not in STREAM_STAGES:
+            if self.batcher and self.batcher.enabled_for(stage, client):
+                return await self.batcher.complete(client, stage, prompt)
+            return await client.acomplete(prompt)
+        field = STREAM_ITEM_FIELDS.get(stage)
+        scanner = JsonArrayScanner(field) if field else None
+        parts: list[str] = []
+        async for chunk in client.astream(prompt):
+            parts.append(chunk)
+            partial = None
+            if scanner:
+                start = scanner.count
+                items = scanner.feed(chunk)
+                if items:
+                    partial = {"field": field, "start": start, "items": items}
+            await self.on_delta(stage, chunk, partial)
+        return "".join(parts)
+
+    def _parse(self, stage: str, response: str) -> Dict[str, Any]:
+        started = time.perf_counter()
         try:
-            return json.loads(response)
-        except json.JSONDecodeError:
-            # fallback by wrapping response
-            return {"text": response}
+            return parse_stage_output(stage, response)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._timing(stage)["parse_ms"] += elapsed * 1000
+            PARSE_SECONDS.observe(elapsed, stage=stage)
 
-    def run_input(self, user_query: str, preferred_mode: str, guardrails: str | None) -> Dict[str, Any]:
+    def _unparsed(self, stage: str, response: str) -> Dict[str, Any]:
+        # the stage falls back to its defaults
+        timing = self._timing(stage)
+        timing["parse_failures"] = timing.get("parse_failures", 0) + 1
+        PARSE_OUTCOMES.inc(stage=stage, outcome="failed")
+        return {"text": response}
+
+    async def _invoke(self, stage: str, prompt: str) -> Dict[str, Any]:
+        response = await self._complete(stage, prompt)
+        if self._client(stage).demo_mode:
+            # demo text echoes the prompt, whose JSON examples must not be mistaken for an answer
+            return self._unparsed(stage, response)
+        try:
+            data = self._parse(stage, response)
+        except ParseError as exc:
+            if not PARSE_REPAIR:
+                return self._unparsed(stage, response)
+            problem = str(exc)
+        else:
+            PARSE_OUTCOMES.inc(stage=stage, outcome="ok")
+            return data
+        timing = self._timing(stage)
+        timing["repairs"] = timing.get("repairs", 0) + 1
+        repair = REPAIR_PROMPT.format(problem=problem, schema=schema_hint(stage), response=response)
+        retried = await self._complete(stage, repair, stream=False)
+        try:
+            data = self._parse(stage, retried)
+        except ParseError:
+            return self._unparsed(stage, response)
+        PARSE_OUTCOMES.inc(stage=stage, outcome="repaired")
+        return data
+
+    async def arun_input(self, user_query: str, preferred_mode: str, guardrails: str | None) -> Dict[str, Any]:
         prompt = INPUT_PROMPT.format(user_query=user_query, mode=preferred_mode, guardrails=guardrails or "none")
-        data = self._invoke(prompt)
+        data = await self._invoke("InputAgent", prompt)
         return {
             "normalized_query": data.get("normalized_query", user_query.strip()),
             "engagement_mode": data.get("engagement_mode", preferred_mode),
@@ -41,50 +186,87 @@ class AgentPipeline:
             "constraints": data.get("constraints", []),
         }
 
-    def run_decomposer(self, normalized_query: str, tools: list[str], constraints: list[str]) -> Dict[str, Any]:
+    async def arun_decomposer(self, normalized_query: str, tools: list[str], constraints: list[str]) -> Dict[str, Any]:
         prompt = DECOMPOSE_PROMPT.format(query=normalized_query, tools=tools, constraints=constraints)
-        data = self._invoke(prompt)
-        plan = data.get("workflow_plan") or ["ResearchAgent", "AnalysisAgent", "ValidationAgent", "OutputAgent"]
+        data = await self._invoke("TaskDecomposer", prompt)
+        plan = data.get("workflow_plan") or list(DEFAULT_PLAN)
         return {"workflow_plan": plan}
 
-    def run_workflow(self, plan: list[str], mode: str) -> Dict[str, Any]:
+    async def arun_workflow(self, plan: list[str], mode: str) -> Dict[str, Any]:
         prompt = WORKFLOW_PROMPT.format(plan=plan, mode=mode)
-        data = self._invoke(prompt)
-        steps = data.get("steps") or [
-            {"agent": agent, "notes": "Auto-generated", "requires_human": agent in {"ResearchAgent", "AnalysisAgent"}}
-            for agent in plan
-        ]
-        control_panel = data.get("control_panel") or {"mode": mode}
-        return {"steps": steps, "control_panel": control_panel}
+        data = await self._invoke("WorkflowOrchestrator", prompt)
+        fallback = default_workflow(plan, mode)
+        return {
+            "steps": data.get("steps") or fallback["steps"],
+            "control_panel": data.get("control_panel") or fallback["control_panel"],
+        }
 
-    def run_research(self, query: str) -> Dict[str, Any]:
-        snippets = valyu_search(query)
-        prompt = RESEARCH_PROMPT.format(query=query, snippets=snippets)
-        data = self._invoke(prompt)
+    async def arun_research(self, query: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        snippets = await self.search(query)
+        timing = self._timing("ResearchAgent")
+        timing["search_ms"] = timing.get("search_ms", 0.0) + (time.perf_counter() - started) * 1000
+        context = fit_snippets(query, snippets, self._budget("ResearchAgent"))
+        self._saved("ResearchAgent", snippets, context)
+        prompt = RESEARCH_PROMPT.format(query=query, snippets=context)
+        data = await self._invoke("ResearchAgent", prompt)
         candidates = data.get("candidates") or snippets
         return {"candidates": candidates}
 
-    def run_analysis(self, candidates: list[str]) -> Dict[str, Any]:
-        prompt = ANALYSIS_PROMPT.format(candidates=candidates)
-        data = self._invoke(prompt)
+    async def arun_analysis(self, candidates: list[str]) -> Dict[str, Any]:
+        context = fit_evenly(candidates, self._budget("AnalysisAgent"))
+        self._saved("AnalysisAgent", candidates, context)
+        prompt = ANALYSIS_PROMPT.format(candidates=context)
+        data = await self._invoke("AnalysisAgent", prompt)
         options = data.get("options") or candidates
         rationale = data.get("rationale", "Demo rationale")
         return {"options": options, "rationale": rationale}
 
-    def run_validation(self, draft: str) -> Dict[str, Any]:
-        prompt = VALIDATION_PROMPT.format(draft=draft)
-        data = self._invoke(prompt)
+    async def arun_validation(self, draft: str) -> Dict[str, Any]:
+        budget = self._budget("ValidationAgent")
+        context = truncate(draft, budget) if budget > 0 else draft
+        self._saved("ValidationAgent", [draft], [context])
+        prompt = VALIDATION_PROMPT.format(draft=context)
+        data = await self._invoke("ValidationAgent", prompt)
         return {
             "is_consistent": data.get("is_consistent", True),
             "confidence": data.get("confidence", 0.8),
             "notes": data.get("notes", "Demo validation"),
         }
 
-    def run_output(self, option: str, validation: Dict[str, Any]) -> Dict[str, Any]:
-        prompt = OUTPUT_PROMPT.format(option=option, validation=validation)
-        data = self._invoke(prompt)
+    async def arun_output(self, option: str, validation: Dict[str, Any]) -> Dict[str, Any]:
+        budget = self._budget("OutputAgent")
+        context, notes = option, validation
+        if budget > 0:
+            # validation notes get at most a quarter of the budget; the chosen option gets the rest
+            notes = {**validation, "notes": truncate(str(validation.get("notes", "")), budget // 4)}
+            context = truncate(option, budget - estimate_tokens(str(notes)))
+        self._saved("OutputAgent", [option, str(validation)], [context, str(notes)])
+        prompt = OUTPUT_PROMPT.format(option=context, validation=notes)
+        data = await self._invoke("OutputAgent", prompt)
         return {"final_text": data.get("final_text", option)}
 
+    def run_input(self, user_query: str, preferred_mode: str, guardrails: str | None) -> Dict[str, Any]:
+        return asyncio.run(self.arun_input(user_query, preferred_mode, guardrails))
+
+    def run_decomposer(self, normalized_query: str, tools: list[str], constraints: list[str]) -> Dict[str, Any]:
+        return asyncio.run(self.arun_decomposer(normalized_query, tools, constraints))
+
+    def run_workflow(self, plan: list[str], mode: str) -> Dict[str, Any]:
+        return asyncio.run(self.arun_workflow(plan, mode))
+
+    def run_research(self, query: str) -> Dict[str, Any]:
+        return asyncio.run(self.arun_research(query))
+
+    def run_analysis(self, candidates: list[str]) -> Dict[str, Any]:
+        return asyncio.run(self.arun_analysis(candidates))
+
+    def run_validation(self, draft: str) -> Dict[str, Any]:
+        return asyncio.run(self.arun_validation(draft))
+
+    def run_output(self, option: str, validation: Dict[str, Any]) -> Dict[str, Any]:
+        return asyncio.run(self.arun_output(option, validation))
+
     def start_trace(self) -> Dict[str, str]:
         trace_id = uuid.uuid4().hex
         base_url = os.environ.get("LANGSMITH_DASHBOARD_URL", self.demo_trace)
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import re
+from typing import Iterable, Sequence
+
+# Tokens of inserted context (snippets, candidates, drafts) per stage when agent settings give no ``token_budget``.
+DEFAULT_TOKEN_BUDGETS = {
+    "ResearchAgent": 1200,
+    "AnalysisAgent": 2000,
+    "ValidationAgent": 1500,
+    "OutputAgent": 1500,
+}
+# Jaccard similarity of word trigrams above which two snippets count as the same finding.
+NEAR_DUPLICATE = 0.8
+# Don't bother squeezing in a truncated tail shorter than this.
+MIN_TAIL_TOKENS = 24
+
+_WORD = re.compile(r"\w+")
+_ELLIPSIS = " …"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough Claude token count (~4 characters per token), the same estimate the client reports."""
+    return (len(text) + 3) // 4
+
+
+def budget_for(stage: str, settings: dict | None) -> int:
+    """The stage's budget from its agent settings, else the default; 0 or less means unlimited."""
+    raw = (settings or {}).get("token_budget")
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        return DEFAULT_TOKEN_BUDGETS.get(stage, 0)
+
+
+def truncate(text: str, tokens: int) -> str:
+    """Cut ``text`` to about ``tokens`` tokens at a sentence or word boundary."""
+    if estimate_tokens(text) <= tokens:
+        return text
+    limit = max(0, tokens * 4 - len(_ELLIPSIS))
+    cut = text[:limit]
+    boundary = max(cut.rfind(". "), cut.rfind("\n"))
+    if boundary < limit // 2:
+        boundary = cut.rfind(" ")
+    if boundary > 0:
+        cut = cut[: boundary + 1]
+    return cut.rstrip() + _ELLIPSIS
+
+
+def _shingles(words: Sequence[str]) -> set[int]:
+    if len(words) < 3:
+        return {hash(tuple(words))}
+    return {hash((words[i], words[i + 1], words[i + 2])) for i in range(len(words) - 2)}
+
+
+def dedupe(items: Iterable[str]) -> list[str]:
+    """Drop items that are (near-)copies of an earlier one, e.g. the same article from two sources."""
+    kept: list[tuple[str, set[int]]] = []
+    for item in items:
+        shingles = _shingles(_WORD.findall(item.lower()))
+        if any(len(shingles & seen) / len(shingles | seen) >= NEAR_DUPLICATE for _, seen in kept):
+            continue
+        kept.append((item, shingles))
+    return [item for item, _ in kept]
+
+
+def _relevance(query_terms: set[str], text: str) -> float:
+    if not query_terms:
+        return 0.0
+    return len(query_terms & set(_WORD.findall(text.lower()))) / len(query_terms)
+
+
+def fit_snippets(query: str, snippets: Sequence[str], budget: int) -> list[str]:
+    """Search snippets for the research prompt: duplicates dropped, then the most relevant kept within ``budget``.
+
+    The snippet that crosses the budget is truncated if a useful amount of
+    it fits; the rest are dropped.
+    """
+    unique = dedupe(snippets)
+    if budget <= 0:
+        return unique
+    terms = set(_WORD.findall(query.lower()))
+    ranked = sorted(unique, key=lambda snippet: -_relevance(terms, snippet))  # stable: ties keep search order
+    kept: list[str] = []
+    left = budget
+    for snippet in ranked:
+        cost = estimate_tokens(snippet)
+        if cost <= left:
+            kept.append(snippet)
+            left -= cost
+        elif left >= MIN_TAIL_TOKENS:
+            kept.append(truncate(snippet, left))
+            left = 0
+    return kept
+
+
+def fit_evenly(items: Sequence[str], budget: int) -> list[str]:
+    """Every (distinct) item kept, the longest ones truncated until together they fit ``budget``.
+
+    For inputs that are all needed, such as the candidates analysis compares.
+    """
+    unique = dedupe(items)
+    if budget <= 0 or sum(estimate_tokens(item) for item in unique) <= budget:
+        return unique
+    # water-filling: short items keep their length, the long ones share what's left
+    order = sorted(range(len(unique)), key=lambda i: estimate_tokens(unique[i]))
+    caps = [0] * len(unique)
+    left = budget
+    for rank, idx in enumerate(order):
+        share = left // (len(unique) - rank)
+        caps[idx] = min(estimate_tokens(unique[idx]), share)
+        left -= caps[idx]
+    return [truncate(item, cap) for item, cap in zip(unique, caps)]
+
+
+def saved_tokens(before: Iterable[str], after: Iterable[str]) -> int:
+    return max(0, sum(estimate_tokens(text) for text in before) - sum(estimate_tokens(text) for text in after))
@@ -7,7 +7,7 @@ Guardrails: {guardrails}
 """
 
 DECOMPOSE_PROMPT = """You are the Task Decomposer. Create a short ordered list of agent steps for the query.
-Return JSON {"workflow_plan": ["ResearchAgent", ...]}.
+Return JSON {{"workflow_plan": ["ResearchAgent", ...]}}.
 
 Query: {query}
 Tools: {tools}
@@ -20,24 +20,37 @@ Plan: {plan}
 Mode: {mode}
 """
 
-RESEARCH_PROMPT = """Synthesize three candidate answers from given search snippets. Respond JSON {"candidates": [..]}.
+RESEARCH_PROMPT = """Synthesize three candidate answers from given search snippets. Respond JSON {{"candidates": [..]}}.
 
 Query: {query}
 Snippets: {snippets}
 """
 
-ANALYSIS_PROMPT = """Compare the supplied candidates and output JSON {"options": [..], "rationale": "..."}.
+ANALYSIS_PROMPT = """Compare the supplied candidates and output JSON {{"options": [..], "rationale": "..."}}.
 
 Candidates: {candidates}
 """
 
-VALIDATION_PROMPT = """Validate the draft answer. Return JSON {"is_consistent": bool, "confidence": 0-1, "notes": "..."}.
+VALIDATION_PROMPT = """Validate the draft answer. Return JSON {{"is_consistent": bool, "confidence": 0-1, "notes": "..."}}.
 
 Draft: {draft}
 """
 
-OUTPUT_PROMPT = """Compose the final answer referencing validation notes. Return JSON {"final_text": "..."}.
+OUTPUT_PROMPT = """Compose the final answer referencing validation notes. Return JSON {{"final_text": "..."}}.
 
 Selected option: {option}
 Validation: {validation}
 """
+
+REPAIR_PROMPT = """Your previous reply could not be used: {problem}.
+Reply again with only a JSON object matching this JSON Schema, no prose and no code fences.
+
+Schema: {schema}
+Previous reply: {response}
+"""
+
+BATCH_PROMPT = """Below are {count} independent requests. Answer each one on its own, exactly as if it had been sent alone.
+Reply with only a JSON array of {count} objects, no prose and no code fences: {{"request": <number>, "reply": <the JSON object that request asks for>}}.
+
+{requests}
+"""
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+
+# Set to 0 to turn the cache off entirely; single runs can also bypass it with ``bypass_cache``.
+SEMANTIC_CACHE_ENABLED = os.environ.get("SEMANTIC_CACHE_ENABLED", "1") != "0"
+# Jaccard similarity of the queries' shingle sets needed to reuse an answer.
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.8"))
+SEMANTIC_CACHE_TTL = float(os.environ.get("SEMANTIC_CACHE_TTL", "3600"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+# MinHash signature length, split into LSH bands of ``MINHASH_ROWS`` values each.
+MINHASH_PERMUTATIONS = 64
+MINHASH_ROWS = 4
+
+_PRIME = (1 << 61) - 1
+_WORD = re.compile(r"\w+")
+_NUMBER = re.compile(r"\d")
+# Function words carry no topic; negations do, so they are kept.
+_STOPWORDS = frozenset(
+    "a an the of in on at to for from by with about and or is are was were be been being do does did "
+    "what which who whom how when where why this that these those it its me my i you your we our please "
+    "has have had can could would should will tell give explain show".split()
+)
+
+
+class SemanticHit(NamedTuple):
+    final_text: str
+    similarity: float
+    query: str
+    run_id: Optional[str]
+
+
+class _Entry(NamedTuple):
+    query: str
+    scope: str
+    shingles: frozenset
+    numbers: frozenset
+    bands: tuple
+    final_text: str
+    run_id: Optional[str]
+    created_at: float
+
+
+def scope_key(*parts: Any) -> str:
+    """A short key for whatever besides the query shapes the answer (workflow, graph); only equal scopes match."""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _stem(word: str) -> str:
+    for suffix in ("ing", "ed", "es", "s", "e"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def shingles(query: str) -> tuple[frozenset, frozenset]:
+    """The query's content words, crudely stemmed so "changed" and "changes" agree, and its numbers.
+
+    Whole words rather than character n-grams, so that swapping the subject
+    ("Go" for "Rust") costs a full word of similarity. Two queries that
+    differ in a number (a year, a quantity) never match, however similar the
+    rest is.
+    """
+    words = [_stem(word) for word in _WORD.findall(query.lower()) if word not in _STOPWORDS]
+    return frozenset(words), frozenset(word for word in words if _NUMBER.search(word))
+
+
+class SemanticCache:
+    """Final answers of finished runs, looked up by near-duplicate ``normalized_query``.
+
+    Each query becomes a MinHash signature over its shingles. The signature
+    is split into LSH bands that index the entries, so a lookup only compares
+    against entries sharing at least one band rather than scanning them all.
+    Candidates are then checked by exact Jaccard similarity against
+    ``threshold``. Entries expire after ``ttl`` seconds and the least recently
+    used are evicted beyond ``max_entries``.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = SEMANTIC_CACHE_ENABLED,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl: float = SEMANTIC_CACHE_TTL,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        permutations: int = MINHASH_PERMUTATIONS,
+        rows: int = MINHASH_ROWS,
+    ) -> None:
+        self.enabled = enabled
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.rows = rows
+        rng = random.Random(0x5EED)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(permutations)]
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._buckets: Dict[tuple, set[int]] = {}
+        self._next_id = 0
+        self.counts: Counter[str] = Counter()
+
+    def _bands(self, scope: str, grams: frozenset) -> tuple:
+        hashed = [hash(gram) & 0xFFFFFFFFFFFFFFFF for gram in grams] or [0]
+        signature = [min((a * x + b) % _PRIME for x in hashed) for a, b in self._perms]
+        return tuple(
+            (scope, start, tuple(signature[start: start + self.rows]))
+            for start in range(0, len(signature), self.rows)
+        )
+
+    def lookup(self, query: str, scope: str = "") -> Optional[SemanticHit]:
+        grams, numbers = shingles(query)
+        bands = self._bands(scope, grams)
+        candidates: set[int] = set()
+        for band in bands:
+            candidates |= self._buckets.get(band, set())
+        best: Optional[tuple[float, int]] = None
+        expired = time.time() - self.ttl
+        for entry_id in candidates:
+            entry = self._entries[entry_id]
+            if entry.created_at < expired:
+                self._drop(entry_id)
+                self.counts["expired"] += 1
+                continue
+            if entry.numbers != numbers:
+                continue
+            similarity = len(grams & entry.shingles) / (len(grams | entry.shingles) or 1)
+            if similarity >= self.threshold and (best is None or similarity > best[0]):
+                best = (similarity, entry_id)
+        if best is None:
+            self.counts["miss"] += 1
+            return None
+        self.counts["hit"] += 1
+        self._entries.move_to_end(best[1])
+        entry = self._entries[best[1]]
+        return SemanticHit(entry.final_text, round(best[0], 3), entry.query, entry.run_id)
+
+    def put(self, query: str, final_text: str, scope: str = "", run_id: Optional[str] = None) -> None:
+        if not final_text:
+            return
+        grams, numbers = shingles(query)
+        entry = _Entry(query, scope, grams, numbers, self._bands(scope, grams), final_text, run_id, time.time())
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = entry
+        for band in entry.bands:
+            self._buckets.setdefault(band, set()).add(entry_id)
+        self.counts["stored"] += 1
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            self.counts["evicted"] += 1
+
+    def bypass(self) -> None:
+        self.counts["bypass"] += 1
+
+    def _drop(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        for band in entry.bands:
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[band]
+
+    def clear(self) -> None:
+        """Forget every answer, e.g. when agent settings (prompts, models) change."""
+        self._entries.clear()
+        self._buckets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counts["hit"] + self.counts["miss"]
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "entries": len(self._entries),
+            **{name: self.counts[name] for name in ("hit", "miss", "bypass", "stored", "evicted", "expired")},
+            "hit_rate": round(self.counts["hit"] / lookups, 4) if lookups else None,
+        }
+
+
+SEMANTIC_CACHE = SemanticCache()
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any
+
+
+class JsonArrayScanner:
+    """Pulls finished elements of one array field (e.g. ``"options": [...]``) out of streamed JSON text.
+
+    ``feed`` returns the elements completed by the new chunk, so callers can
+    surface each candidate as soon as its closing quote/brace arrives.
+    """
+
+    def __init__(self, field: str) -> None:
+        self.field = field
+        self.count = 0
+        self.done = False
+        self._marker = re.compile(r'"%s"\s*:\s*\[' % re.escape(field))
+        self._buffer = ""
+        self._pos = -1
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._start: int | None = None
+
+    def feed(self, chunk: str) -> list[Any]:
+        self._buffer += chunk
+        if self.done:
+            return []
+        if self._pos < 0:
+            match = self._marker.search(self._buffer)
+            if not match:
+                return []
+            self._pos = match.end()
+        items: list[Any] = []
+        buf = self._buffer
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == "," and self._depth == 0:
+                self._take(buf[self._start:i] if self._start is not None else "", items)
+                self._start = None
+            elif ch == "]" and self._depth == 0:
+                self._take(buf[self._start:i] if self._start is not None else "", items)
+                self.done = True
+                break
+            elif not ch.isspace():
+                if self._start is None:
+                    self._start = i
+                if ch == '"':
+                    self._in_string = True
+                elif ch in "[{":
+                    self._depth += 1
+                elif ch in "]}":
+                    self._depth -= 1
+            i += 1
+        self._pos = i
+        return items
+
+    def _take(self, text: str, items: list[Any]) -> None:
+        text = text.strip()
+        if not text:
+            return
+        try:
+            items.append(json.loads(text))
+        except json.JSONDecodeError:
+            return
+        self.count += 1
@@ -1,23 +1,166 @@
 from __future__ import annotations
 
+import asyncio
 import os
+import time
+import weakref
+from collections import Counter, OrderedDict
+from typing import Any
+
+import httpx
 import requests
 
+from agent_core import fixtures
+from agent_core.governor import governor_for
+from agent_core.metrics import SEARCH_SECONDS
+
 VALYU_ENDPOINT = os.environ.get("VALYU_API_URL", "https://api.valyu.ai/search")
 VALYU_API_KEY = os.environ.get("VALYU_API_KEY")
+VALYU_TIMEOUT = float(os.environ.get("VALYU_TIMEOUT", "15"))
+VALYU_CACHE_TTL = float(os.environ.get("VALYU_CACHE_TTL", "300"))
+VALYU_CACHE_MAX_ENTRIES = int(os.environ.get("VALYU_CACHE_MAX_ENTRIES", "512"))
 
+SEARCH_STATS: Counter[str] = Counter()
 
-def valyu_search(query: str) -> list[str]:
-    if not VALYU_API_KEY:
-        return [
-            f"[Valyu demo] Top finding for {query}",
-            f"[Valyu demo] Counterpoint for {query}",
-        ]
-    headers = {"Authorization": f"Bearer {VALYU_API_KEY}"}
-    resp = requests.get(VALYU_ENDPOINT, params={"q": query, "limit": 3}, headers=headers, timeout=15)
-    resp.raise_for_status()
-    data = resp.json()
+_SESSION = requests.Session()
+_CACHE: OrderedDict[str, tuple[float, list[str]]] = OrderedDict()
+
+
+class _LoopState:
+    """httpx.AsyncClient and in-flight searches are bound to the loop they were created on."""
+
+    def __init__(self) -> None:
+        self.client = httpx.AsyncClient(timeout=VALYU_TIMEOUT, limits=httpx.Limits(max_keepalive_connections=20))
+        self.inflight: dict[str, asyncio.Task] = {}
+
+
+_LOOP_STATES: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _demo_results(query: str) -> list[str]:
+    return [
+        f"[Valyu demo] Top finding for {query}",
+        f"[Valyu demo] Counterpoint for {query}",
+    ]
+
+
+def _demo(query: str) -> list[str]:
+    results = _demo_results(query)
+    if fixtures.recording():
+        # recorded too, so a replay sees exactly the searches the recording run saw
+        data = {"results": [{"summary": result} for result in results]}
+        fixtures.FIXTURES.record("valyu", normalize_query(query), data, 0.0, request=query, once=True)
+    return results
+
+
+def _parse_results(data: Any) -> list[str]:
     items = data.get("results") or data.get("data") or []
     if isinstance(items, list):
         return [item.get("summary") or item.get("title") or str(item) for item in items[:3]]
     return [str(items)]
+
+
+def _cached(key: str) -> list[str] | None:
+    entry = _CACHE.get(key)
+    if entry is None:
+        return None
+    if entry[0] <= time.time() - VALYU_CACHE_TTL:
+        del _CACHE[key]
+        return None
+    _CACHE.move_to_end(key)
+    SEARCH_STATS["cache_hits"] += 1
+    return list(entry[1])
+
+
+def _remember(key: str, results: list[str]) -> None:
+    if VALYU_CACHE_TTL <= 0:
+        return
+    _CACHE[key] = (time.time(), list(results))
+    _CACHE.move_to_end(key)
+    while len(_CACHE) > VALYU_CACHE_MAX_ENTRIES:
+        _CACHE.popitem(last=False)
+
+
+def _recorded(key: str, query: str, data: Any, started: float) -> Any:
+    if fixtures.recording():
+        fixtures.FIXTURES.record("valyu", key, data, time.perf_counter() - started, request=query)
+    return data
+
+
+def _loop_state() -> _LoopState:
+    loop = asyncio.get_running_loop()
+    state = _LOOP_STATES.get(loop)
+    if state is None or state.client.is_closed:
+        state = _LoopState()
+        _LOOP_STATES[loop] = state
+    return state
+
+
+def valyu_search(query: str) -> list[str]:
+    if not VALYU_API_KEY and not fixtures.replaying():
+        return _demo(query)
+    key = normalize_query(query)
+    cached = _cached(key)
+    if cached is not None:
+        return cached
+    headers = {"Authorization": f"Bearer {VALYU_API_KEY}"}
+
+    def get() -> Any:
+        SEARCH_STATS["outbound"] += 1
+        if fixtures.replaying():
+            return fixtures.FIXTURES.replay("valyu", key, query)
+        started = time.perf_counter()
+        resp = _SESSION.get(VALYU_ENDPOINT, params={"q": query, "limit": 3}, headers=headers, timeout=VALYU_TIMEOUT)
+        SEARCH_SECONDS.observe(time.perf_counter() - started)
+        resp.raise_for_status()
+        return _recorded(key, query, resp.json(), started)
+
+    results = _parse_results(governor_for("valyu", VALYU_ENDPOINT).call_sync(get))
+    _remember(key, results)
+    return results
+
+
+async def _fetch(client: httpx.AsyncClient, key: str, query: str) -> list[str]:
+    headers = {"Authorization": f"Bearer {VALYU_API_KEY}"}
+
+    async def get() -> Any:
+        SEARCH_STATS["outbound"] += 1
+        if fixtures.replaying():
+            return await fixtures.FIXTURES.areplay("valyu", key, query)
+        started = time.perf_counter()
+        resp = await client.get(VALYU_ENDPOINT, params={"q": query, "limit": 3}, headers=headers)
+        SEARCH_SECONDS.observe(time.perf_counter() - started)
+        resp.raise_for_status()
+        return _recorded(key, query, resp.json(), started)
+
+    results = _parse_results(await governor_for("valyu", VALYU_ENDPOINT).call(get))
+    _remember(key, results)
+    return results
+
+
+async def avalyu_search(query: str) -> list[str]:
+    """Cached search; concurrent calls for the same normalized query share one request."""
+    if not VALYU_API_KEY and not fixtures.replaying():
+        return _demo(query)
+    key = normalize_query(query)
+    cached = _cached(key)
+    if cached is not None:
+        return cached
+    state = _loop_state()
+    task = state.inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_fetch(state.client, key, query))
+        state.inflight[key] = task
+        task.add_done_callback(lambda _: state.inflight.pop(key, None))
+    else:
+        SEARCH_STATS["coalesced"] += 1
+    # shield: one caller being cancelled must not cancel the request the others wait on
+    return list(await asyncio.shield(task))
+
+
+def search_stats() -> dict[str, Any]:
+    return {**SEARCH_STATS, "cache_entries": len(_CACHE)}
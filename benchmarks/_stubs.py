@@ -0,0 +1,94 @@
+"""Shared helpers for the offline benchmarks: slow and flaky stand-ins for ChatBedrock and percentile maths."""
+from __future__ import annotations
+
+import os
+import random
+import statistics
+import threading
+import time
+
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+
+from botocore.exceptions import ClientError  # noqa: E402
+
+from agent_core import bedrock_client  # noqa: E402
+
+
+class SlowModel:
+    latency = 0.5
+    reply = "{}"
+    calls = 0
+
+    def __init__(self, **_: object) -> None:
+        pass
+
+    def invoke(self, messages):
+        SlowModel.calls += 1
+        time.sleep(self.latency)
+        return type("Msg", (), {"content": self.reply})()
+
+    def stream(self, messages):
+        yield self.invoke(messages)
+
+
+def install_slow_model(latency: float, reply: str = "{}") -> None:
+    SlowModel.latency = latency
+    SlowModel.reply = reply
+    bedrock_client.ChatBedrock = SlowModel
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def report(name: str, samples: list[float]) -> None:
+    ms = [s * 1000 for s in samples]
+    print(
+        f"{name:<10} n={len(ms):<4} p50={percentile(ms, 50):8.1f}ms "
+        f"p99={percentile(ms, 99):8.1f}ms max={max(ms, default=0):8.1f}ms mean={statistics.fmean(ms) if ms else 0:8.1f}ms"
+    )
+
+
+class FlakyModel(SlowModel):
+    """Fake provider with limited capacity: calls beyond ``capacity`` in flight get a ThrottlingException,
+    and ``error_rate`` of the rest fail with ServiceUnavailableException."""
+
+    capacity = 4
+    error_rate = 0.0
+    inflight = 0
+    throttled = 0
+    _lock = threading.Lock()
+
+    def invoke(self, messages):
+        with FlakyModel._lock:
+            FlakyModel.inflight += 1
+            busy = FlakyModel.inflight > self.capacity
+            if busy:
+                FlakyModel.throttled += 1
+        try:
+            if busy:
+                time.sleep(self.latency / 10)
+                raise _client_error("ThrottlingException", 429)
+            if random.random() < self.error_rate:
+                raise _client_error("ServiceUnavailableException", 503)
+            return super().invoke(messages)
+        finally:
+            with FlakyModel._lock:
+                FlakyModel.inflight -= 1
+
+
+def _client_error(code: str, status: int) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": code}, "ResponseMetadata": {"HTTPStatusCode": status}}, "InvokeModel")
+
+
+def install_flaky_model(latency: float, capacity: int, error_rate: float = 0.0, reply: str = "{}") -> None:
+    install_slow_model(latency, reply)
+    FlakyModel.capacity = capacity
+    FlakyModel.error_rate = error_rate
+    bedrock_client.ChatBedrock = FlakyModel
@@ -0,0 +1,97 @@
+"""Throughput and latency of a cheap stage (InputAgent) at increasing concurrency, with and without prompt batching.
+
+The stub provider serves at most ``--capacity`` calls at once, and a call
+takes ``--model-latency`` plus ``--per-item`` for every extra request
+folded into it (more output tokens). Batched prompts get a JSON array back,
+except for a ``--malformed`` share of batch replies, which are cut short so
+their missing items fall back to individual calls.
+
+    python -m benchmarks.bench_batching --concurrency 1 8 32 64 --calls 4
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+
+from benchmarks._stubs import SlowModel, install_slow_model, report
+from agent_core.batching import PromptBatcher  # noqa: E402  (after the stubs set credentials)
+
+REPLY = {"normalized_query": "q", "engagement_mode": "agents_only", "tools_needed": ["research"], "constraints": []}
+
+
+class BatchAwareModel(SlowModel):
+    capacity = 8
+    per_item = 0.02
+    malformed = 0.0
+    calls = 0
+    _slots = threading.BoundedSemaphore(capacity)
+
+    def invoke(self, messages):
+        prompt = messages[0].content
+        count = len(re.findall(r"^### Request \d+", prompt, re.M))
+        with BatchAwareModel._slots:
+            BatchAwareModel.calls += 1
+            time.sleep(self.latency + self.per_item * max(0, count - 1))
+        if not count:
+            text = json.dumps(REPLY)
+        else:
+            items = [{"request": idx, "reply": REPLY} for idx in range(1, count + 1)]
+            text = json.dumps(items)
+            if random.random() < self.malformed:
+                text = text[: len(text) // 2]
+        return type("Msg", (), {"content": text})()
+
+
+async def _round(concurrency: int, calls: int, batcher: PromptBatcher | None) -> None:
+    from agent_core.pipeline import AgentPipeline
+
+    BatchAwareModel.calls = 0
+    latencies: list[float] = []
+
+    async def worker(idx: int) -> None:
+        pipeline = AgentPipeline(cache=None, batcher=batcher)
+        for call in range(calls):
+            started = time.perf_counter()
+            await pipeline.arun_input(f"batching bench {idx} {call}", "agents_only", None)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(idx) for idx in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    total = concurrency * calls
+    fallbacks = sum(count for (_, kind), count in batcher.counts.items() if kind == "fallback") if batcher else 0
+    print(f"  {total / elapsed:7.1f} calls/s  model calls {BatchAwareModel.calls:<4} fallbacks {fallbacks}")
+    report("  latency", latencies)
+
+
+async def main(args: argparse.Namespace) -> None:
+    install_slow_model(args.model_latency)
+    from agent_core import bedrock_client
+
+    BatchAwareModel.per_item = args.per_item
+    BatchAwareModel.malformed = args.malformed
+    BatchAwareModel._slots = threading.BoundedSemaphore(args.capacity)
+    bedrock_client.ChatBedrock = BatchAwareModel
+    for concurrency in args.concurrency:
+        print(f"concurrency {concurrency}, unbatched")
+        await _round(concurrency, args.calls, None)
+        print(f"concurrency {concurrency}, batched (window {args.window_ms}ms, max {args.max_size})")
+        await _round(concurrency, args.calls, PromptBatcher({"InputAgent"}, args.window_ms, args.max_size))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--calls", type=int, default=4, help="sequential InputAgent calls per worker")
+    parser.add_argument("--capacity", type=int, default=8, help="calls the provider serves at once")
+    parser.add_argument("--model-latency", type=float, default=0.2)
+    parser.add_argument("--per-item", type=float, default=0.02)
+    parser.add_argument("--malformed", type=float, default=0.1)
+    parser.add_argument("--window-ms", type=float, default=5)
+    parser.add_argument("--max-size", type=int, default=8)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,113 @@
+"""Checkpoint writes per run and retry latency after a failed node, checking what a failed run leaves behind.
+
+Every run's first ValidationAgent call fails, so each run pauses in
+``paused_error``. The check asserts that the stored checkpoint says
+``paused_error`` and names the failed node, and that the run was finished in
+the registry, which is the state a restarted controller leaves alone for
+``/runs/{id}/retry``. It then retries every run and times how long it takes
+to get from the retry to ``done``; only the failed node runs again. Half the
+runs are recovered through ``/resume`` instead (the dashboard's button),
+which must retry them, while ``/pause`` on a failed or finished run is
+refused with 409. Last, a checkpoint left by an earlier process with this
+process's hostname and pid (a restarted container) must be claimed.
+
+    python -m benchmarks.bench_checkpoints --runs 20
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi import HTTPException
+
+from benchmarks._stubs import install_slow_model, report
+
+
+async def _wait_status(server, run_ids: list[str], statuses: set[str]) -> None:
+    while any(server.RUNS[run_id]["status"] not in statuses for run_id in run_ids):
+        await asyncio.sleep(0.01)
+
+
+async def _refused(call, run_id: str) -> str:
+    try:
+        await call(run_id)
+    except HTTPException as exc:
+        assert exc.status_code == 409, exc.status_code
+        return exc.detail
+    raise AssertionError(f"{call.__name__} accepted a run that is not executing")
+
+
+async def main(args: argparse.Namespace) -> None:
+    tmp = Path(tempfile.mkdtemp(prefix="bench_checkpoints_"))
+    os.environ["RUN_CHECKPOINT_PATH"] = str(tmp / "checkpoints.sqlite3")
+    os.environ["RUN_STORE_PATH"] = str(tmp / "runs.sqlite3")
+    install_slow_model(args.model_latency)
+    from agent_core.pipeline import AgentPipeline
+    from controller import server
+
+    failures = {"left": args.runs}  # each run validates once before it pauses, so every run fails once
+    validate = AgentPipeline.arun_validation
+
+    async def flaky_validation(self, draft: str):
+        if failures["left"] > 0:
+            failures["left"] -= 1
+            raise RuntimeError("validation unavailable")
+        return await validate(self, draft)
+
+    AgentPipeline.arun_validation = flaky_validation
+    server.SCHEDULER = server.RunScheduler(max_running=args.runs, max_queued=args.runs)
+    run_ids = []
+    for i in range(args.runs):
+        run_ids.append((await server.start_run(server.StartRunReq(user_query=f"checkpoint bench {time.time()} {i}")))["run_id"])
+    await _wait_status(server, run_ids, {"paused_error", "done", "error"})
+
+    for run_id in run_ids:
+        assert server.RUNS[run_id]["status"] == "paused_error", server.RUNS[run_id]["status"]
+        stored = server.CHECKPOINTS.load(run_id)
+        assert stored is not None, f"{run_id}: no checkpoint"
+        assert stored["status"] == "paused_error", f"{run_id}: checkpoint says {stored['status']}"
+        assert stored["store"]["failed"]["node"] == "ValidationAgent", stored["store"].get("failed")
+        assert run_id in server.REGISTRY._finished, f"{run_id}: not finished in the registry"
+    saved = server.CHECKPOINTS.saved
+    print(f"{args.runs} runs paused_error with matching checkpoints, {saved / args.runs:.1f} checkpoint writes per run")
+
+    assert "/retry" in await _refused(server.pause, run_ids[0])
+    latencies: dict[str, list[float]] = {"retry": [], "resume": []}
+    for idx, run_id in enumerate(run_ids):
+        via = "resume" if idx % 2 else "retry"
+        started = time.perf_counter()
+        if via == "resume":
+            await server.resume(run_id)
+        else:
+            result = await server.retry_run(run_id)
+            assert result["retrying"] == "ValidationAgent", result
+        await _wait_status(server, [run_id], {"done", "error", "paused_error"})
+        assert server.RUNS[run_id]["status"] == "done", f"{via}: {server.RUNS[run_id]['status']}"
+        latencies[via].append(time.perf_counter() - started)
+    assert all(server.CHECKPOINTS.load(run_id) is None for run_id in run_ids), "done runs kept their checkpoint"
+    await _refused(server.pause, run_ids[0])
+    await _refused(server.resume, run_ids[0])
+    for via, samples in latencies.items():
+        report(via, samples)
+
+    # a restarted container: same hostname and pid as the process that wrote the checkpoint, other start stamp
+    from controller import checkpoints
+    stale_owner = checkpoints.WORKER_ID.rsplit(":", 1)[0] + ":previous-boot"
+    with server.CHECKPOINTS._conn:
+        server.CHECKPOINTS._conn.execute(
+            "INSERT INTO checkpoints (run_id, owner, status, updated, run) VALUES (?, ?, 'running', 0, ?)",
+            ("same-pid-run", stale_owner, '{"id": "same-pid-run"}'),
+        )
+    assert [run["id"] for run in server.CHECKPOINTS.claim_orphans()] == ["same-pid-run"], "same-pid orphan not claimed"
+    print("checkpoint of an earlier process with our hostname and pid is claimed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--model-latency", type=float, default=0.01)
+    asyncio.run(main(parser.parse_args()))
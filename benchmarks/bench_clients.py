@@ -0,0 +1,50 @@
+"""Time-to-first-stage with a fresh Bedrock client per run vs. the shared client registry.
+
+Builds real ChatBedrock clients (boto session, connection pool) with dummy
+credentials; only ``invoke``/``stream`` are stubbed, so no request leaves the machine.
+
+    python -m benchmarks.bench_clients --runs 20
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+
+from langchain_aws import ChatBedrock
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from agent_core.client_registry import CLIENT_REGISTRY
+from benchmarks._stubs import report
+
+
+async def _first_stage(server) -> float:
+    run_id = (await server.start_run(server.StartRunReq(user_query="client bench")))["run_id"]
+    while server.RUNS[run_id]["status"] not in {"done", "error", "paused_error"}:
+        await asyncio.sleep(0.002)
+    return server.RUNS[run_id]["store"]["time_to_first_stage_ms"] / 1000
+
+
+async def main(args: argparse.Namespace) -> None:
+    ChatBedrock.invoke = lambda self, messages, *a, **kw: AIMessage(content="{}")
+    ChatBedrock.stream = lambda self, messages, *a, **kw: iter([AIMessageChunk(content="{}")])
+    from controller import server
+
+    per_run = []
+    for _ in range(args.runs):
+        CLIENT_REGISTRY.invalidate()  # what every run paid before the registry existed
+        per_run.append(await _first_stage(server))
+    shared = [await _first_stage(server) for _ in range(args.runs)]
+    report("per-run", per_run)
+    report("shared", shared)
+    print(CLIENT_REGISTRY.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,87 @@
+"""Control-plane latency while many runs are in flight.
+
+Starts the controller on a local port with a stubbed Bedrock model (``time.sleep``
+per call) and a stubbed Valyu endpoint, launches N concurrent runs and samples
+``/pause`` + ``/resume`` round trips and ``/events`` time-to-first-event.
+
+    python -m benchmarks.bench_event_loop --runs 50 --model-latency 0.5
+    python -m benchmarks.bench_event_loop --blocking   # call Bedrock inline, as before
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from agent_core import bedrock_client
+from benchmarks._stubs import install_slow_model, report
+
+
+async def _first_event(client: httpx.AsyncClient, run_id: str) -> float:
+    started = time.perf_counter()
+    async with client.stream("GET", f"/events/{run_id}") as resp:
+        async for line in resp.aiter_lines():
+            if line.startswith("event:"):
+                return time.perf_counter() - started
+    return time.perf_counter() - started
+
+
+async def main(args: argparse.Namespace) -> None:
+    install_slow_model(args.model_latency)
+    # probes hang up after the first event; asyncio warns on every write to the closed socket
+    logging.getLogger("asyncio").setLevel(logging.ERROR)
+    if args.blocking:
+        async def inline(self, prompt):
+            return self.complete(prompt)
+
+        bedrock_client.ClaudeClient.acomplete = inline
+
+    from controller.server import app
+
+    # The controller gets its own thread and loop so a blocked server loop cannot stall the probes.
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    pause_samples: list[float] = []
+    event_samples: list[float] = []
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=60) as client:
+        run_ids = [
+            (await client.post("/run", json={"user_query": f"bench query {i}", "mode": "auto"})).json()["run_id"]
+            for i in range(args.runs)
+        ]
+        deadline = time.perf_counter() + args.duration
+        probe = 0
+        while time.perf_counter() < deadline:
+            run_id = run_ids[probe % len(run_ids)]
+            probe += 1
+            started = time.perf_counter()
+            await client.post(f"/pause/{run_id}")
+            await client.post(f"/resume/{run_id}")
+            pause_samples.append((time.perf_counter() - started) / 2)
+            event_samples.append(await _first_event(client, run_id))
+            await asyncio.sleep(args.interval)
+
+    server.should_exit = True
+    thread.join(timeout=args.model_latency * 10)
+    print(f"runs={args.runs} model_latency={args.model_latency}s blocking={args.blocking}")
+    report("/pause", pause_samples)
+    report("/events", event_samples)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--model-latency", type=float, default=0.5)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--interval", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=8791)
+    parser.add_argument("--blocking", action="store_true")
+    asyncio.run(main(parser.parse_args()))
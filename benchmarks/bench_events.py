@@ -0,0 +1,104 @@
+"""Bytes sent and encode time per run on /events: plain JSON against the compact encoding, with several subscribers.
+
+Runs go through the controller with the slow stub model answering every
+stage with research-sized candidates and options, then each run's event log
+is encoded the way ``/events`` does it for ``--subscribers`` streams:
+``json.dumps`` per subscriber (before), plain JSON encoded once per run, and
+``?encoding=compact`` with and without ``compress``.
+
+    python -m benchmarks.bench_events --runs 20 --subscribers 3
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+
+from agent_core.completion_cache import COMPLETION_CACHE
+from benchmarks._stubs import install_slow_model
+from controller.event_codec import EventCodec
+
+TERMINAL = {"done", "error", "paused_error"}
+
+
+def _reply(size: int) -> str:
+    finding = "The 2024 survey reports a 14% rise in adoption, driven by lower storage costs and new tooling. "
+    candidates = [f"Candidate {i}: " + finding * size for i in range(3)]
+    return json.dumps({
+        "normalized_query": "how did adoption change",
+        "workflow_plan": ["ResearchAgent", "AnalysisAgent", "ValidationAgent", "OutputAgent"],
+        "candidates": candidates,
+        "options": [f"Option {i}: " + "weighs cost against tooling maturity. " * size for i in range(3)],
+        "rationale": "Option 0 is best supported.",
+        "is_consistent": True,
+        "confidence": 0.8,
+        "notes": "Consistent with the sources.",
+        "final_text": "Adoption rose about 14%. " + finding * size,
+    })
+
+
+def _before(items: list[dict], subscribers: int) -> tuple[int, float]:
+    sent = 0
+    started = time.perf_counter()
+    for _ in range(subscribers):
+        for item in items:
+            sent += len(json.dumps(item["data"], ensure_ascii=False).encode("utf-8"))
+    return sent, time.perf_counter() - started
+
+
+def _encoded(items: list[dict], subscribers: int, compact: bool, compress: bool = False) -> tuple[int, float]:
+    codec = EventCodec()
+    sent = 0
+    started = time.perf_counter()
+    for _ in range(subscribers):
+        seen: set[str] = set()
+        for item in items:
+            data = codec.compact(item, seen, compress) if compact else codec.full(item)
+            sent += len(data.encode("utf-8"))
+    return sent, time.perf_counter() - started
+
+
+async def main(args: argparse.Namespace) -> None:
+    install_slow_model(0.0, _reply(args.reply_size))
+    COMPLETION_CACHE.stages.clear()
+    from controller import server
+
+    server.SCHEDULER = server.RunScheduler(max_running=args.runs, max_queued=args.runs)
+    run_ids = [
+        (await server.start_run(server.StartRunReq(user_query=f"events bench {time.time()} {i}")))["run_id"]
+        for i in range(args.runs)
+    ]
+    while any(server.RUNS[run_id]["status"] not in TERMINAL for run_id in run_ids):
+        await asyncio.sleep(0.01)
+    logs = [server.EVENT_LOGS[run_id].snapshot() for run_id in run_ids]
+    events = sum(len(items) for items in logs) / len(logs)
+    print(f"{args.runs} runs, {events:.0f} events each, {args.subscribers} subscribers per run\n")
+
+    modes = [
+        ("json, per subscriber", lambda items: _before(items, args.subscribers)),
+        ("json, once per run", lambda items: _encoded(items, args.subscribers, compact=False)),
+        ("compact", lambda items: _encoded(items, args.subscribers, compact=True)),
+        ("compact + compress", lambda items: _encoded(items, args.subscribers, compact=True, compress=True)),
+    ]
+    baseline = None
+    for name, encode in modes:
+        sent = seconds = 0.0
+        for items in logs:
+            run_sent, run_seconds = encode(items)
+            sent += run_sent
+            seconds += run_seconds
+        per_run = sent / len(logs)
+        baseline = baseline or per_run
+        print(
+            f"{name:<22} {per_run / 1024:8.1f} KiB/run ({per_run / baseline:6.1%})"
+            f"  encode {seconds / len(logs) * 1000:7.2f} ms/run"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--subscribers", type=int, default=3)
+    parser.add_argument("--reply-size", type=int, default=8, help="repetitions of a finding per candidate/option")
+    asyncio.run(main(parser.parse_args()))
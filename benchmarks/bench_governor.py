@@ -0,0 +1,108 @@
+"""Runs against a fake Bedrock that throttles beyond a fixed capacity, with and without the call governor.
+
+Without retries every ThrottlingException parks its run in ``paused_error``;
+with the governor the AIMD window settles near the provider's capacity and
+the throttles are retried with jittered backoff. Before that, a check trips
+a breaker and cancels its half-open probe (mid-call, mid-stream and while
+queued for the window) and asserts the next call is let through.
+
+    python -m benchmarks.bench_governor --runs 40 --capacity 6 --error-rate 0.02
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from agent_core import governor
+from agent_core.completion_cache import COMPLETION_CACHE
+from benchmarks._stubs import FlakyModel, install_flaky_model, report
+
+TERMINAL = {"done", "error", "paused_error"}
+
+
+async def _round(server, runs: int, policy: governor.GovernorPolicy) -> None:
+    governor.POLICIES["bedrock"] = policy
+    governor.GOVERNORS.clear()
+    FlakyModel.throttled = 0
+    started = time.perf_counter()
+    run_ids = [
+        (await server.start_run(server.StartRunReq(user_query=f"governor bench {started} {i}")))["run_id"]
+        for i in range(runs)
+    ]
+    finished: dict[str, float] = {}
+    while len(finished) < runs:
+        for run_id in run_ids:
+            if run_id not in finished and server.RUNS[run_id]["status"] in TERMINAL:
+                finished[run_id] = time.perf_counter() - started
+        await asyncio.sleep(0.01)
+    done = [finished[run_id] for run_id in run_ids if server.RUNS[run_id]["status"] == "done"]
+    stats = next(iter(governor.governor_stats().values()), {})
+    print(
+        f"  done {len(done)}/{runs}  provider throttles {FlakyModel.throttled}  retries {stats.get('retries', 0)}"
+        f"  gave up {stats.get('gave_up', 0)}  final window {stats.get('window')}"
+    )
+    report("  done", done)
+
+
+async def _cancelled_probe(where: str) -> None:
+    gov = governor.Governor("probe-check", governor.GovernorPolicy(max_attempts=1, max_concurrency=1, breaker_failures=1, breaker_cooldown=0.05))
+
+    async def unavailable():
+        raise ConnectionError("down")
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def hang_stream():
+        yield "first"
+        await asyncio.sleep(10)
+
+    async def consume():
+        async for _ in gov.stream(hang_stream):
+            pass
+
+    try:
+        await gov.call(unavailable)
+    except ConnectionError:
+        pass
+    assert gov.breaker.state == "open"
+    await asyncio.sleep(0.06)
+    if where == "window":
+        gov.window.active = 1  # the window is full, so the probe queues in acquire()
+    probe = asyncio.create_task(consume() if where == "stream" else gov.call(hang))
+    await asyncio.sleep(0.01)
+    probe.cancel()
+    await asyncio.gather(probe, return_exceptions=True)
+    gov.window.active = 0
+
+    async def ok():
+        return "ok"
+
+    assert await gov.call(ok) == "ok", where  # raised CircuitOpen forever while the probe stayed claimed
+    assert gov.breaker.state == "closed", gov.breaker.state
+
+
+async def main(args: argparse.Namespace) -> None:
+    for where in ("call", "stream", "window"):
+        await _cancelled_probe(where)
+    print("cancelled half-open probes release the breaker (call, stream, window)")
+    install_flaky_model(args.model_latency, args.capacity, args.error_rate)
+    COMPLETION_CACHE.stages.clear()
+    from controller import server
+
+    server.SCHEDULER = server.RunScheduler(max_running=args.runs, max_queued=args.runs)
+    server.GLOBAL_WORKFLOW_OVERRIDE = ["ResearchAgent", "AnalysisAgent", "OutputAgent"]
+    print("no retry")
+    await _round(server, args.runs, governor.GovernorPolicy(max_attempts=1, max_concurrency=1000))
+    print("governor")
+    await _round(server, args.runs, governor.GovernorPolicy(max_attempts=6, base_delay=args.model_latency, max_concurrency=16))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=40)
+    parser.add_argument("--capacity", type=int, default=6)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--model-latency", type=float, default=0.05)
+    asyncio.run(main(parser.parse_args()))
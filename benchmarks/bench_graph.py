@@ -0,0 +1,66 @@
+"""Wall-clock time of a linear workflow vs. the same stages wired as a diamond.
+
+Diamond: two ResearchAgent variants fan out after the orchestrator, join in
+AnalysisAgent, then ValidationAgent and OutputAgent run side by side.
+
+    python -m benchmarks.bench_graph --model-latency 0.3
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from agent_core.completion_cache import COMPLETION_CACHE
+from benchmarks._stubs import install_slow_model
+
+STEPS = ["ResearchAgent:web", "ResearchAgent:news", "AnalysisAgent", "ValidationAgent", "OutputAgent"]
+STEMS = ["InputAgent", "TaskDecomposer", "WorkflowOrchestrator"]
+
+
+def _blueprint(edges: list[tuple[str, str]]) -> dict:
+    nodes = [{"id": node} for node in STEMS + STEPS]
+    return {"nodes": nodes, "edges": [{"source": src, "target": dst} for src, dst in edges]}
+
+
+LINEAR = _blueprint(list(zip(STEMS + STEPS, (STEMS + STEPS)[1:])))
+DIAMOND = _blueprint(
+    list(zip(STEMS, STEMS[1:]))
+    + [
+        ("WorkflowOrchestrator", "ResearchAgent:web"),
+        ("WorkflowOrchestrator", "ResearchAgent:news"),
+        ("ResearchAgent:web", "AnalysisAgent"),
+        ("ResearchAgent:news", "AnalysisAgent"),
+        ("AnalysisAgent", "ValidationAgent"),
+        ("AnalysisAgent", "OutputAgent"),
+    ]
+)
+
+
+async def _timed_run(server, blueprint: dict) -> float:
+    server.GLOBAL_GRAPH_BLUEPRINT = blueprint
+    server.GLOBAL_WORKFLOW_OVERRIDE = STEPS
+    started = time.perf_counter()
+    run_id = (await server.start_run(server.StartRunReq(user_query=f"graph bench {time.time()}")))["run_id"]
+    while server.RUNS[run_id]["status"] not in {"done", "error", "paused_error"}:
+        await asyncio.sleep(0.005)
+    assert server.RUNS[run_id]["status"] == "done", server.RUNS[run_id]["status"]
+    return time.perf_counter() - started
+
+
+async def main(args: argparse.Namespace) -> None:
+    install_slow_model(args.model_latency)
+    COMPLETION_CACHE.stages.clear()
+    from controller import server
+
+    linear = await _timed_run(server, LINEAR)
+    diamond = await _timed_run(server, DIAMOND)
+    print(f"model latency per call  {args.model_latency:.2f}s")
+    print(f"linear   (8 calls)      {linear:.2f}s")
+    print(f"diamond  (critical 6)   {diamond:.2f}s   ideal {6 * args.model_latency:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-latency", type=float, default=0.3)
+    asyncio.run(main(parser.parse_args()))
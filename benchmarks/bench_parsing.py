@@ -0,0 +1,106 @@
+"""Parse success rate and parse time of stage outputs: bare ``json.loads`` against the extracting, schema-validating parser.
+
+The built-in corpus wraps well-formed stage replies the way models tend to:
+code fences, a sentence before or after, braces inside strings, a stray
+bracketed citation ahead of the object, plus a share of replies that are
+truncated or not JSON at all (those are what the repair re-prompt is for).
+``--corpus`` takes a JSONL file of recorded ``{"stage": ..., "response": ...}``
+lines instead.
+
+    python -m benchmarks.bench_parsing --size 5000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+
+from agent_core import output_parsing
+from agent_core.output_parsing import ParseError, parse_stage_output
+
+SAMPLES = {
+    "InputAgent": {"normalized_query": "compare {x} and [y]", "engagement_mode": "agents_only", "tools_needed": ["research"], "constraints": []},
+    "TaskDecomposer": {"workflow_plan": ["ResearchAgent", "AnalysisAgent", "ValidationAgent", "OutputAgent"]},
+    "ResearchAgent": {"candidates": [f"Candidate {i}: " + "evidence \"quoted\" {braced} " * 20 for i in range(3)]},
+    "AnalysisAgent": {"options": [f"Option {i} " + "reasoning, " * 40 for i in range(3)], "rationale": "Option 0 cites [1] and {2}."},
+    "ValidationAgent": {"is_consistent": True, "confidence": 0.82, "notes": "Checked against sources."},
+    "OutputAgent": {"final_text": "Final answer\n\n" + "paragraph text. " * 60},
+}
+
+WRAPPERS = [
+    ("bare", lambda body: body),
+    ("fenced", lambda body: f"```json\n{body}\n```"),
+    ("prose", lambda body: f"Here is the JSON you asked for:\n\n{body}\n\nLet me know if you need anything else."),
+    ("citation", lambda body: f"Based on [1] and [2], the result is {body}"),
+    ("trailing", lambda body: f"{body}\nNote: fields like {{notes}} are optional."),
+    ("truncated", lambda body: body[: len(body) * 2 // 3]),
+    ("refusal", lambda body: "I'm unable to produce that in JSON right now."),
+]
+WEIGHTS = [50, 15, 12, 5, 8, 6, 4]
+
+
+def build_corpus(size: int, seed: int) -> list[tuple[str, str, str]]:
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        stage = rng.choice(list(SAMPLES))
+        name, wrap = rng.choices(WRAPPERS, WEIGHTS)[0]
+        corpus.append((stage, name, wrap(json.dumps(SAMPLES[stage], indent=rng.choice([None, 2])))))
+    return corpus
+
+
+def load_corpus(path: str) -> list[tuple[str, str, str]]:
+    with open(path, encoding="utf-8") as fh:
+        rows = [json.loads(line) for line in fh if line.strip()]
+    return [(row["stage"], row.get("kind", "recorded"), row["response"]) for row in rows]
+
+
+def bare(stage: str, text: str) -> bool:
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return False
+    return isinstance(data, dict)
+
+
+def robust(stage: str, text: str) -> bool:
+    try:
+        parse_stage_output(stage, text)
+    except ParseError:
+        return False
+    return True
+
+
+def measure(name: str, parse, corpus: list[tuple[str, str, str]]) -> dict[str, list[bool]]:
+    outcomes: dict[str, list[bool]] = {}
+    started = time.perf_counter()
+    for stage, kind, text in corpus:
+        outcomes.setdefault(kind, []).append(parse(stage, text))
+    elapsed = time.perf_counter() - started
+    ok = sum(sum(values) for values in outcomes.values())
+    print(f"{name:<22} parsed {ok}/{len(corpus)} ({ok / len(corpus):.1%})  {elapsed / len(corpus) * 1e6:7.1f}us/reply")
+    return outcomes
+
+
+def main(args: argparse.Namespace) -> None:
+    corpus = load_corpus(args.corpus) if args.corpus else build_corpus(args.size, args.seed)
+    before = measure("json.loads", bare, corpus)
+    after = measure(f"extract+schema ({output_parsing.JSON_BACKEND})", robust, corpus)
+    if output_parsing.JSON_BACKEND != "json":
+        output_parsing.loads = json.loads
+        measure("extract+schema (json)", robust, corpus)
+    print("\nby reply shape       json.loads  extract+schema")
+    for kind in before:
+        n = len(before[kind])
+        print(f"  {kind:<18} {sum(before[kind]):>5}/{n:<5} {sum(after[kind]):>7}/{n:<5}")
+    left = sum(len(v) - sum(v) for v in after.values())
+    print(f"\n{left} replies would get one repair re-prompt (PARSE_REPAIR=1) instead of falling back to defaults")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--corpus", help="JSONL of recorded {stage, response} lines")
+    main(parser.parse_args())
@@ -0,0 +1,62 @@
+"""Burst of runs submitted at once: unbounded launching vs. the run scheduler's slot cap.
+
+Every run competes for the same Bedrock worker pool, so launching everything
+at once stretches every run; capping concurrency lets early runs finish early.
+The last line times one ``high`` priority run submitted behind the burst.
+
+    python -m benchmarks.bench_scheduler --runs 128 --max-running 24 --model-latency 0.05
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from agent_core.completion_cache import COMPLETION_CACHE
+from benchmarks._stubs import install_slow_model, report
+
+
+async def _wait_done(server, run_ids: list[str], submitted: dict[str, float]) -> list[float]:
+    latencies: dict[str, float] = {}
+    while len(latencies) < len(run_ids):
+        for run_id in run_ids:
+            if run_id not in latencies and server.RUNS[run_id]["status"] in {"done", "error", "paused_error"}:
+                latencies[run_id] = time.perf_counter() - submitted[run_id]
+        await asyncio.sleep(0.005)
+    return [latencies[run_id] for run_id in run_ids]
+
+
+async def _burst(server, runs: int, max_running: int) -> tuple[float, list[float], float]:
+    server.SCHEDULER = server.RunScheduler(max_running=max_running, max_queued=runs + 1)
+    started = time.perf_counter()
+    submitted: dict[str, float] = {}
+    batch = await server.start_runs_batch(
+        server.BatchRunReq(user_queries=[f"scheduler bench {started} {i}" for i in range(runs)], priority="low")
+    )
+    for run_id in batch["run_ids"]:
+        submitted[run_id] = started
+    urgent = (await server.start_run(server.StartRunReq(user_query=f"urgent {started}", priority="high")))["run_id"]
+    submitted[urgent] = time.perf_counter()
+    latencies = await _wait_done(server, batch["run_ids"] + [urgent], submitted)
+    return time.perf_counter() - started, latencies[:-1], latencies[-1]
+
+
+async def main(args: argparse.Namespace) -> None:
+    install_slow_model(args.model_latency)
+    COMPLETION_CACHE.stages.clear()
+    from controller import server
+
+    server.GLOBAL_WORKFLOW_OVERRIDE = ["ResearchAgent", "AnalysisAgent", "OutputAgent"]
+    for name, cap in (("unbounded", args.runs + 1), ("capped", args.max_running)):
+        wall, latencies, urgent = await _burst(server, args.runs, cap)
+        print(f"{name:<10} max_running={cap:<4} wall={wall:6.2f}s throughput={args.runs / wall:6.1f} runs/s")
+        report(name, latencies)
+        print(f"{'':<10} high-priority run submitted last finished in {urgent * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=128)
+    parser.add_argument("--max-running", type=int, default=24)
+    parser.add_argument("--model-latency", type=float, default=0.05)
+    asyncio.run(main(parser.parse_args()))
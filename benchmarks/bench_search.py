@@ -0,0 +1,82 @@
+"""Outbound Valyu calls and latency: one request per caller vs. the cached, coalescing search layer.
+
+A local stub stands in for the Valyu API (fixed latency, counts requests).
+``--callers`` concurrent searches are spread over ``--distinct`` trending queries.
+
+    python -m benchmarks.bench_search --callers 200 --distinct 5 --latency 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import threading
+import time
+
+PORT = int(os.environ.get("BENCH_VALYU_PORT", "8793"))
+os.environ["VALYU_API_KEY"] = "bench"
+os.environ["VALYU_API_URL"] = f"http://127.0.0.1:{PORT}/search"
+
+import requests
+import uvicorn
+from fastapi import FastAPI
+
+from agent_core import valyu_tool
+from benchmarks._stubs import report
+
+stub = FastAPI()
+stub.state.latency = 0.2
+stub.state.requests = 0
+
+
+@stub.get("/search")
+async def _search(q: str, limit: int = 3):
+    stub.state.requests += 1
+    await asyncio.sleep(stub.state.latency)
+    return {"results": [{"summary": f"{q} finding {i}"} for i in range(limit)]}
+
+
+def _naive(query: str) -> list[str]:
+    # What valyu_search used to do: a fresh connection per call, no cache.
+    resp = requests.get(valyu_tool.VALYU_ENDPOINT, params={"q": query, "limit": 3}, timeout=15)
+    resp.raise_for_status()
+    return valyu_tool._parse_results(resp.json())
+
+
+async def _timed(call) -> float:
+    started = time.perf_counter()
+    await call
+    return time.perf_counter() - started
+
+
+async def main(args: argparse.Namespace) -> None:
+    stub.state.latency = args.latency
+    server = uvicorn.Server(uvicorn.Config(stub, host="127.0.0.1", port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    queries = [f"Trending Topic {i % args.distinct}" for i in range(args.callers)]
+
+    stub.state.requests = 0
+    naive = await asyncio.gather(*(_timed(asyncio.to_thread(_naive, q)) for q in queries))
+    naive_calls = stub.state.requests
+
+    stub.state.requests = 0
+    layered = await asyncio.gather(*(_timed(valyu_tool.avalyu_search(q)) for q in queries))
+    layered_calls = stub.state.requests
+
+    print(f"callers={args.callers} distinct={args.distinct} stub latency={args.latency}s")
+    print(f"naive     outbound={naive_calls}")
+    report("naive", naive)
+    print(f"layered   outbound={layered_calls} {valyu_tool.search_stats()}")
+    report("layered", layered)
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.2)
+    asyncio.run(main(parser.parse_args()))
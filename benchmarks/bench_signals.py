@@ -0,0 +1,73 @@
+"""Idle cost of parked runs and selection-to-next-stage latency.
+
+Parks N human-mode runs on their first research selection (plus N paused runs),
+measures controller CPU time over a quiet window, then answers each selection
+and times how long until the run leaves the node.
+
+    python -m benchmarks.bench_signals --runs 500 --window 2
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from benchmarks._stubs import install_slow_model, report
+
+
+async def _wait_status(server, run_ids: list[str], status: str) -> None:
+    while any(server.RUNS[run_id]["status"] != status for run_id in run_ids):
+        await asyncio.sleep(0.01)
+
+
+async def _until_exit(log, node: str) -> None:
+    async for item in log.subscribe(after=log.last_id):
+        if item["event"] == "exit" and item["data"].get("node") == node:
+            return
+
+
+async def main(args: argparse.Namespace) -> None:
+    install_slow_model(args.model_latency)
+    from controller import server
+
+    # default slots: parked runs lend theirs out; only the queue must hold every run at once
+    server.SCHEDULER = server.RunScheduler(max_queued=2 * args.runs)
+    selecting = [
+        (await server.start_run(server.StartRunReq(user_query=f"q{i}", mode="human")))["run_id"] for i in range(args.runs)
+    ]
+    paused = []
+    for i in range(args.runs):
+        # before the run's task first runs, so it parks at its first stage instead of finishing
+        paused.append((await server.start_run(server.StartRunReq(user_query=f"p{i}")))["run_id"])
+        await server.pause(paused[-1])
+    await _wait_status(server, selecting, "awaiting_selection")
+
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    await asyncio.sleep(args.window)
+    cpu = time.process_time() - cpu_started
+    wall = time.perf_counter() - wall_started
+    print(f"parked runs={2 * args.runs} window={wall:.2f}s cpu={cpu * 1000:.1f}ms ({100 * cpu / wall:.2f}% of one core)")
+    stats = server.SCHEDULER.stats()
+    print(f"scheduler running={stats['running']}/{stats['max_running']} parked={stats['parked']} queued={stats['queued']}")
+
+    latencies: list[float] = []
+    for run_id in selecting:
+        log = server.EVENT_LOGS[run_id]
+        waiter = asyncio.create_task(_until_exit(log, "ResearchAgent"))
+        await asyncio.sleep(0)
+        started = time.perf_counter()
+        await server.select(server.SelectionReq(run_id=run_id, node="ResearchAgent", choice_index=0))
+        await waiter
+        latencies.append(time.perf_counter() - started)
+    report("select", latencies)
+
+    for run_id in selecting + paused:
+        await server.stop(run_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--window", type=float, default=2.0)
+    parser.add_argument("--model-latency", type=float, default=0.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,103 @@
+"""Runs driven through several uvicorn workers sharing the SQLite run backend.
+
+Every request opens a new connection, so /run, /pause, /resume, /events and
+/runs/{id} for one run land on arbitrary workers. Reports throughput, how
+many control requests had to be forwarded to the owning worker, failures
+(anything but 200 or a run not ending ``done``), and the time from /resume
+to the run's next event as seen by a stream served from any worker.
+
+    python -m benchmarks.bench_workers --workers 1 2 4 --runs 40
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks._stubs import report
+
+
+async def _drive(client: httpx.AsyncClient, index: int, stats: dict) -> None:
+    resp = await client.post("/run", json={"user_query": f"workers bench {time.time()} {index}", "mode": "auto"})
+    run_id = resp.json()["run_id"]
+    for kind in ("pause", "resume"):
+        resp = await client.post(f"/{kind}/{run_id}")
+        stats["control"] += 1
+        stats["forwarded"] += bool(resp.status_code == 200 and resp.json().get("forwarded"))
+        stats["failures"] += resp.status_code != 200
+        if kind == "pause":
+            await asyncio.sleep(0.05)
+    resumed = time.perf_counter()
+    first_after_resume = None
+    async with client.stream("GET", f"/events/{run_id}") as stream:
+        async for line in stream.aiter_lines():
+            if line.startswith("event:"):
+                event = line.split(":", 1)[1].strip()
+                if event == "resumed":
+                    first_after_resume = time.perf_counter() - resumed
+                if event == "end":
+                    break
+    if first_after_resume is not None:
+        stats["resume_seen"].append(first_after_resume)
+    status = (await client.get(f"/runs/{run_id}")).json().get("status")
+    stats["failures"] += status != "done"
+
+
+async def _round(workers: int, args: argparse.Namespace) -> None:
+    tmp = Path(tempfile.mkdtemp(prefix="bench-workers-"))
+    env = {
+        **os.environ,
+        "RUN_BACKEND": "sqlite",
+        "RUN_BACKEND_PATH": str(tmp / "backend.sqlite3"),
+        "RUN_STORE_PATH": str(tmp / "runs.sqlite3"),
+        "COMPLETION_CACHE_STAGES": "",
+        "BENCH_MODEL_LATENCY": str(args.model_latency),
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.stub_app:app", "--port", str(args.port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+    limits = httpx.Limits(max_keepalive_connections=0)  # a fresh connection per request spreads them over workers
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=120, limits=limits) as client:
+            while True:
+                try:
+                    await client.get("/runs_stats")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.2)
+            await asyncio.sleep(1.0 * workers)  # let every worker finish booting
+            stats = {"control": 0, "forwarded": 0, "failures": 0, "resume_seen": []}
+            started = time.perf_counter()
+            await asyncio.gather(*(_drive(client, i, stats) for i in range(args.runs)))
+            wall = time.perf_counter() - started
+    finally:
+        proc.terminate()
+        proc.wait()
+    print(
+        f"workers={workers}  {args.runs} runs in {wall:5.2f}s ({args.runs / wall:5.1f} runs/s)"
+        f"  control={stats['control']} forwarded={stats['forwarded']} failures={stats['failures']}"
+    )
+    report("  resumed", stats["resume_seen"])
+
+
+async def main(args: argparse.Namespace) -> None:
+    for workers in args.workers:
+        await _round(workers, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--runs", type=int, default=40)
+    parser.add_argument("--model-latency", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=8794)
+    asyncio.run(main(parser.parse_args()))
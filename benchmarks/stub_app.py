@@ -0,0 +1,13 @@
+"""Controller app with the slow stub model installed, for benchmarks that start uvicorn worker processes.
+
+    BENCH_MODEL_LATENCY=0.05 uvicorn benchmarks.stub_app:app --workers 2
+"""
+from __future__ import annotations
+
+import os
+
+from benchmarks._stubs import install_slow_model
+
+install_slow_model(float(os.environ.get("BENCH_MODEL_LATENCY", "0.05")))
+
+from controller.server import app  # noqa: E402,F401
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict
+
+from controller.run_store import DATA_DIR
+
+RUN_CHECKPOINT_PATH = Path(os.environ.get("RUN_CHECKPOINT_PATH", DATA_DIR / "checkpoints.sqlite3"))
+
+def _start_stamp(pid: int) -> str | None:
+    """Boot id and start tick of process ``pid``, which a reused pid doesn't share; None where /proc can't tell."""
+    try:
+        with open("/proc/sys/kernel/random/boot_id", encoding="ascii") as fh:
+            boot = fh.read().strip()
+        with open(f"/proc/{pid}/stat", encoding="ascii", errors="replace") as fh:
+            stat = fh.read()
+    except OSError:
+        return None
+    return f"{boot[:8]}-{stat.rpartition(')')[2].split()[19]}"  # field 22, starttime
+
+
+# hostname:pid:nonce of this controller process. A restarted container often comes back with the same
+# hostname and pid (1); the nonce tells the old process's checkpoints from ours so they get resumed.
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{_start_stamp(os.getpid()) or uuid.uuid4().hex[:12]}"
+
+
+def _owner_alive(owner: str) -> bool:
+    host, pid, nonce = (owner.rsplit(":", 2) + [""])[:3]
+    if host != socket.gethostname():
+        return True  # another machine's process; not ours to judge
+    try:
+        pid_number = int(pid)
+    except ValueError:
+        return True
+    if pid_number == os.getpid():
+        return False  # our pid but not our id: an earlier process that had the same pid
+    try:
+        os.kill(pid_number, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    stamp = _start_stamp(pid_number)
+    return stamp is None or stamp == nonce  # a live pid with another start stamp was reused by a new process
+
+
+class CheckpointStore:
+    """Latest state of every unfinished run, rewritten after each completed stage.
+
+    A run that ends ``done`` or ``error`` drops its checkpoint; ``paused_error``
+    keeps it so the failed node can be retried later, even after a restart.
+    """
+
+    def __init__(self, path: Path = RUN_CHECKPOINT_PATH) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " run_id TEXT PRIMARY KEY, owner TEXT, status TEXT, updated REAL, run TEXT NOT NULL)"
+            )
+        self.saved = 0
+
+    def save(self, run_id: str, status: str, blob: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (run_id, owner, status, updated, run) VALUES (?, ?, ?, ?, ?)",
+                (run_id, WORKER_ID, status, time.time(), blob),
+            )
+        self.saved += 1
+
+    def load(self, run_id: str) -> Dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute("SELECT run FROM checkpoints WHERE run_id = ?", (run_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, run_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM checkpoints WHERE run_id = ?", (run_id,))
+
+    def claim_orphans(self) -> list[Dict[str, Any]]:
+        """Take over checkpoints of runs whose controller process is gone; returns their run dicts."""
+        with self._lock:
+            rows = self._conn.execute("SELECT run_id, owner FROM checkpoints WHERE owner != ?", (WORKER_ID,)).fetchall()
+        claimed = []
+        for run_id, owner in rows:
+            if _owner_alive(owner):
+                continue
+            with self._lock, self._conn:
+                cursor = self._conn.execute(
+                    "UPDATE checkpoints SET owner = ? WHERE run_id = ? AND owner = ?", (WORKER_ID, run_id, owner)
+                )
+                row = self._conn.execute("SELECT run FROM checkpoints WHERE run_id = ?", (run_id,)).fetchone()
+            if cursor.rowcount == 1 and row:  # another worker may have won the race
+                claimed.append(json.loads(row[0]))
+        return claimed
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import os
+import zlib
+from json.encoder import encode_basestring
+from typing import Any, Dict, Optional
+
+# Values whose JSON is at least this long are sent once per subscriber and referenced by hash after that.
+EVENT_REF_MIN_BYTES = int(os.environ.get("EVENT_REF_MIN_BYTES", "128"))
+# With compression on, referenced values at least this long are sent deflated (base64).
+EVENT_COMPRESS_MIN_BYTES = int(os.environ.get("EVENT_COMPRESS_MIN_BYTES", "1024"))
+
+
+_CONSTANTS = {None: "null", True: "true", False: "false"}
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str).encode
+
+
+class EventCodec:
+    """Encodes one run's events for SSE, once per run rather than once per subscriber.
+
+    ``full`` is the plain JSON payload the original protocol sends. ``compact``
+    is the opt-in protocol: every large value (research candidates, analysis
+    options, the workflow graph, stage outputs, ...) is replaced by
+    ``{"$ref": <hash>}`` and its content sent in ``defs`` only the first time
+    a subscriber needs it, so a candidate list that went out with ``options``
+    is not repeated in the node's ``segment``. Containers are encoded bottom
+    up, so a new value that holds an already-sent one only carries the
+    reference. A frame is ``{"defs": {<hash>: <json or {"$z": deflated}>}, "d": <payload>}``.
+
+    With ``retain`` off (a codec for one remote subscriber, whose events
+    arrive as fresh objects and are never encoded twice) nothing outlives the
+    frame being built.
+    """
+
+    def __init__(
+        self,
+        ref_min_bytes: int = EVENT_REF_MIN_BYTES,
+        compress_min_bytes: int = EVENT_COMPRESS_MIN_BYTES,
+        retain: bool = True,
+    ) -> None:
+        self.ref_min_bytes = ref_min_bytes
+        self.compress_min_bytes = compress_min_bytes
+        self.retain = retain
+        self._full: Dict[int, tuple[Dict[str, Any], str]] = {}
+        self._compact: Dict[int, tuple[Dict[str, Any], str, tuple[str, ...]]] = {}
+        self._blobs: Dict[str, str] = {}  # hash -> JSON, itself possibly holding refs
+        self._deflated: Dict[str, str] = {}
+        self.encoded = 0  # payloads actually serialized; cache hits don't count
+
+    def _cached(self, cache: Dict[int, tuple], item: Dict[str, Any]) -> Optional[tuple]:
+        entry = cache.get(item["id"])
+        # synthesized items (e.g. ``lagged``) reuse ids of evicted ones; only trust the very same item
+        return entry if entry is not None and entry[0] is item else None
+
+    def full(self, item: Dict[str, Any]) -> str:
+        entry = self._cached(self._full, item)
+        if entry is None:
+            self.encoded += 1
+            entry = (item, json.dumps(item["data"], ensure_ascii=False, default=str))
+            if self.retain:
+                self._full[item["id"]] = entry
+        return entry[1]
+
+    def _encode(self, value: Any, refs: list[str]) -> str:
+        if isinstance(value, str):
+            text = encode_basestring(value)
+        elif isinstance(value, (dict, list)):
+            text = _dumps(value)
+            if len(text) < self.ref_min_bytes:
+                return text  # nothing inside can be large enough to reference
+            if isinstance(value, dict):
+                text = "{" + ",".join(f"{encode_basestring(str(k))}:{self._encode(v, refs)}" for k, v in value.items()) + "}"
+            else:
+                text = "[" + ",".join(self._encode(v, refs) for v in value) + "]"
+        elif value is None or value is True or value is False:
+            return _CONSTANTS[value]
+        elif type(value) is int:
+            return int.__repr__(value)
+        else:
+            return _dumps(value)
+        if len(text) < self.ref_min_bytes:
+            return text
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+        self._blobs.setdefault(digest, text)
+        refs.append(digest)
+        return f'{{"$ref":"{digest}"}}'
+
+    def _payload(self, item: Dict[str, Any]) -> tuple[str, tuple[str, ...]]:
+        entry = self._cached(self._compact, item)
+        if entry is None:
+            self.encoded += 1
+            refs: list[str] = []
+            data = item["data"]
+            # the top level stays inline so clients can read node/ids without resolving anything
+            body = (
+                "{" + ",".join(f"{encode_basestring(str(k))}:{self._encode(v, refs)}" for k, v in data.items()) + "}"
+                if isinstance(data, dict) else self._encode(data, refs)
+            )
+            entry = (item, body, tuple(dict.fromkeys(refs)))
+            if self.retain:
+                self._compact[item["id"]] = entry
+        return entry[1], entry[2]
+
+    def _blob(self, digest: str, compress: bool) -> str:
+        text = self._blobs[digest]
+        if not compress or len(text) < self.compress_min_bytes:
+            return text
+        packed = self._deflated.get(digest)
+        if packed is None:
+            packed = self._deflated[digest] = _dumps({"$z": base64.b64encode(zlib.compress(text.encode("utf-8"), 6)).decode("ascii")})
+        return packed
+
+    def compact(self, item: Dict[str, Any], seen: set[str], compress: bool = False) -> str:
+        """The compact frame of ``item`` for a subscriber that has already received the blobs in ``seen``."""
+        body, refs = self._payload(item)
+        defs: list[str] = []
+        pending = [digest for digest in refs if digest not in seen]
+        while pending:
+            digest = pending.pop()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            text = self._blobs[digest]
+            defs.append(f'"{digest}":{self._blob(digest, compress)}')
+            # a new blob may point at blobs this subscriber hasn't had yet
+            if '"$ref"' in text:
+                pending.extend(_refs_in(text))
+        if not self.retain:
+            self._blobs.clear()  # everything this frame references is either in it or in ``seen``
+            self._deflated.clear()
+        if not defs:
+            return '{"d":' + body + "}"
+        return '{"defs":{' + ",".join(defs) + '},"d":' + body + "}"
+
+    def prune(self, oldest_id: int) -> None:
+        """Forget frames of events the log no longer retains, and the blobs only those frames referenced."""
+        for cache in (self._full, self._compact):
+            for event_id in [event_id for event_id in cache if event_id < oldest_id]:
+                del cache[event_id]
+        live: set[str] = set()
+        pending = [digest for entry in self._compact.values() for digest in entry[2]]
+        while pending:
+            digest = pending.pop()
+            if digest in live or digest not in self._blobs:
+                continue
+            live.add(digest)
+            text = self._blobs[digest]
+            if '"$ref"' in text:
+                pending.extend(_refs_in(text))
+        for digest in [digest for digest in self._blobs if digest not in live]:
+            del self._blobs[digest]
+            self._deflated.pop(digest, None)
+
+    @property
+    def nbytes(self) -> int:
+        """Characters held in cached frames and blobs, for the registry's size accounting."""
+        return (
+            sum(len(entry[1]) for entry in self._full.values())
+            + sum(len(entry[1]) for entry in self._compact.values())
+            + sum(map(len, self._blobs.values()))
+            + sum(map(len, self._deflated.values()))
+        )
+
+
+def _refs_in(text: str) -> list[str]:
+    refs = []
+    start = text.find('{"$ref":"')
+    while start >= 0:
+        refs.append(text[start + 9: start + 25])
+        start = text.find('{"$ref":"', start + 25)
+    return refs
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from controller.event_codec import EventCodec
+from controller.run_signals import RunSignal
+
+EVENT_LOG_MAX_EVENTS = int(os.environ.get("EVENT_LOG_MAX_EVENTS", "5000"))
+# Streamed text of a node is merged into one ``delta`` event per this many milliseconds or characters.
+DELTA_FLUSH_MS = float(os.environ.get("DELTA_FLUSH_MS", "100"))
+DELTA_FLUSH_CHARS = int(os.environ.get("DELTA_FLUSH_CHARS", "2048"))
+
+
+class EventLog:
+    """Append-only event log of one run, broadcast to any number of subscribers.
+
+    Each subscriber reads at its own cursor, so nobody competes for events and
+    a late subscriber sees everything still retained. Only the newest
+    ``max_events`` entries are kept; a subscriber that falls further behind
+    receives a ``lagged`` event and continues from the oldest retained entry.
+    """
+
+    def __init__(self, max_events: int = EVENT_LOG_MAX_EVENTS) -> None:
+        self._items: deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self._next_id = 1
+        self._signal = RunSignal()
+        self.codec = EventCodec()  # SSE frames, encoded once for all subscribers
+        self.closed = False
+
+    @classmethod
+    def restore(cls, history: list[Dict[str, Any]]) -> "EventLog":
+        log = cls(max_events=max(len(history), EVENT_LOG_MAX_EVENTS))
+        log._items.extend(history)
+        log._next_id = history[-1]["id"] + 1 if history else 1
+        log.closed = True
+        return log
+
+    @property
+    def last_id(self) -> int:
+        return self._next_id - 1
+
+    def append(self, event: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        item = {"id": self._next_id, "event": event, "data": data}
+        self._next_id += 1
+        self._items.append(item)
+        if len(self._items) == self._items.maxlen and item["id"] % 256 == 0:
+            self.codec.prune(self._items[0]["id"])
+        self._signal.notify()
+        return item
+
+    def close(self) -> None:
+        self.closed = True
+        self._signal.notify()
+
+    def reopen(self) -> None:
+        """Accept events again, e.g. when a run is retried from its checkpoint."""
+        self.closed = False
+
+    def snapshot(self) -> list[Dict[str, Any]]:
+        return list(self._items)
+
+    async def subscribe(self, after: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every event with an id greater than ``after``, then wait for more until closed."""
+        cursor = after + 1
+        while True:
+            if self._items and cursor < self._items[0]["id"]:
+                oldest = self._items[0]["id"]
+                yield {"id": oldest - 1, "event": "lagged", "data": {"skipped": oldest - cursor}}
+                cursor = oldest
+            while cursor < self._next_id:
+                item = self._items[cursor - self._items[0]["id"]]
+                cursor += 1
+                yield item
+                if self._items and cursor < self._items[0]["id"]:
+                    break
+            else:
+                if self.closed:
+                    return
+                await self._signal.wait_for(lambda: self.closed or cursor < self._next_id)
+
+
+class DeltaBuffer:
+    """Merges a run's streamed text chunks per node into few ``delta`` events.
+
+    A model streams a reply in many small chunks; logged one event each, a
+    few long replies would push the run's earlier events out of its bounded
+    log, and with them out of replay and the archived history. Chunks are
+    held until ``flush_ms`` after the first of them or until ``flush_chars``
+    have piled up. ``flush`` must also run before any other event of the run
+    is logged, so the text stays in order with the events around it.
+    """
+
+    def __init__(
+        self,
+        publish: Callable[[str, Dict[str, Any]], None],
+        flush_ms: float = DELTA_FLUSH_MS,
+        flush_chars: int = DELTA_FLUSH_CHARS,
+    ) -> None:
+        self._publish = publish
+        self.flush_ms = flush_ms
+        self.flush_chars = flush_chars
+        self._parts: Dict[str, list[str]] = {}
+        self._chars = 0
+        self._started = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.chunks = 0
+        self.events = 0
+
+    def add(self, node: str, text: str) -> None:
+        if not self._parts:
+            self._started = time.perf_counter()
+        self._parts.setdefault(node, []).append(text)
+        self._chars += len(text)
+        self.chunks += 1
+        if self.flush_ms <= 0 or self._chars >= self.flush_chars:
+            self.flush()
+        elif (time.perf_counter() - self._started) * 1000 >= self.flush_ms:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.flush_ms / 1000, self.flush)
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        parts, self._parts, self._chars = self._parts, {}, 0
+        for node, texts in parts.items():
+            self.events += 1
+            self._publish("delta", {"node": node, "text": "".join(texts)})
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import os
+from collections import Counter
+from typing import Any, Dict, NamedTuple, Optional
+
+from agent_core.metrics import Collected
+from agent_core.pipeline import DEFAULT_PLAN, default_workflow
+from controller.graph_scheduler import STEM_NODES, node_kind
+
+# Stem stages that may be computed locally instead of asking the model; empty turns the fast path off.
+# WorkflowOrchestrator is opt-in: with the default plan every run would skip it, and with it WORKFLOW_PROMPT
+# and the stage's agent settings.
+FAST_PATH_STAGES = os.environ.get("FAST_PATH_STAGES", "TaskDecomposer")
+# Weight of the newest duration in the running average used to estimate the latency a skip saved.
+FAST_PATH_EWMA = 0.2
+
+# tools_needed values the intake agent reports, and the stage each stands for.
+TOOL_STAGES = {
+    "research": "ResearchAgent",
+    "analysis": "AnalysisAgent",
+    "validation": "ValidationAgent",
+    "output": "OutputAgent",
+}
+
+
+class Decision(NamedTuple):
+    output: Dict[str, Any]
+    reason: str
+
+
+class FastPath:
+    """Decides per run whether a stem stage's output is already determined, so the model call can be skipped.
+
+    TaskDecomposer is skipped when a workflow override replaces its plan
+    anyway, or when the intake asked only for known tools and set no
+    constraints. The plan then is those tools' nodes in graph-blueprint
+    order, so blueprint variants such as ``ResearchAgent:news`` are kept.
+    WorkflowOrchestrator only decorates the plan; when enabled it is skipped
+    when every step is a known stage. Skips are counted together with an estimate of
+    the latency they saved: the running average of the stage when it did
+    run, or, before it ever has, the run's own intake model call.
+    """
+
+    def __init__(self, stages: set[str]) -> None:
+        self.stages = stages
+        self.counts: Counter[tuple[str, str]] = Counter()
+        self.reasons: Counter[tuple[str, str]] = Counter()
+        self.avg_seconds: Dict[str, float] = {}
+        self.avoided_seconds: Counter[str] = Counter()
+
+    def plan(self, intake: Dict[str, Any], override: Optional[list[str]], blueprint: Dict[str, Any]) -> Optional[Decision]:
+        if "TaskDecomposer" not in self.stages:
+            return None
+        if override:
+            return Decision({"workflow_plan": list(override)}, "workflow_override")
+        tools = intake.get("tools_needed") or []
+        if intake.get("constraints") or not isinstance(tools, list):
+            return None
+        wanted = set()
+        for tool in tools:
+            stage = TOOL_STAGES.get(str(tool).strip().lower()) or (tool if tool in DEFAULT_PLAN else None)
+            if stage is None:
+                return None  # a tool we have no stage for; the model decides
+            wanted.add(stage)
+        wanted = wanted or set(DEFAULT_PLAN)
+        wanted.add("OutputAgent")
+        nodes = sorted(blueprint.get("nodes", []), key=lambda node: node.get("order", 0))
+        plan = [node["id"] for node in nodes if node["id"] not in STEM_NODES and node_kind(node["id"]) in wanted]
+        present = {node_kind(step) for step in plan}
+        plan += [stage for stage in DEFAULT_PLAN if stage in wanted and stage not in present]
+        plan.sort(key=lambda step: DEFAULT_PLAN.index(node_kind(step)))  # stable: variants keep blueprint order
+        return Decision({"workflow_plan": plan}, "tools_rule")
+
+    def workflow(self, plan: list[str], mode: str) -> Optional[Decision]:
+        if "WorkflowOrchestrator" not in self.stages:
+            return None
+        if not plan or any(node_kind(step) not in DEFAULT_PLAN for step in plan):
+            return None
+        return Decision(default_workflow(plan, mode), "known_stages")
+
+    def skipped(self, stage: str, reason: str, proxy_seconds: float = 0.0) -> None:
+        """``proxy_seconds`` stands in for the saving until the stage has run at least once (e.g. the run's intake call)."""
+        self.counts[(stage, "skipped")] += 1
+        self.reasons[(stage, reason)] += 1
+        self.avoided_seconds[stage] += self.avg_seconds.get(stage, proxy_seconds)
+
+    def ran(self, stage: str, seconds: float) -> None:
+        self.counts[(stage, "ran")] += 1
+        previous = self.avg_seconds.get(stage)
+        self.avg_seconds[stage] = seconds if previous is None else previous + FAST_PATH_EWMA * (seconds - previous)
+
+    def stats(self) -> Dict[str, Any]:
+        by_stage: Dict[str, Dict[str, Any]] = {}
+        for stage in sorted({stage for stage, _ in self.counts} | self.stages):
+            by_stage[stage] = {
+                "skipped": self.counts[(stage, "skipped")],
+                "ran": self.counts[(stage, "ran")],
+                "reasons": {reason: n for (s, reason), n in self.reasons.items() if s == stage},
+                "avg_model_ms": round(self.avg_seconds[stage] * 1000, 1) if stage in self.avg_seconds else None,
+                "avoided_ms": round(self.avoided_seconds[stage] * 1000, 1),
+            }
+        return {"stages": sorted(self.stages), "by_stage": by_stage}
+
+
+FAST_PATH = FastPath({stage.strip() for stage in FAST_PATH_STAGES.split(",") if stage.strip()})
+
+Collected(
+    "greatagent_fast_path_total", "Stem stages computed locally (skipped) or by the model (ran).", ("stage", "outcome"),
+    lambda: dict(FAST_PATH.counts), kind="counter",
+)
+Collected(
+    "greatagent_fast_path_avoided_seconds_total", "Estimated model latency saved by fast-path skips.", ("stage",),
+    lambda: {(stage,): seconds for stage, seconds in FAST_PATH.avoided_seconds.items()}, kind="counter",
+)
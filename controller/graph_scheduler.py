@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+STEM_NODES = ("InputAgent", "TaskDecomposer", "WorkflowOrchestrator")
+
+
+class NodeFailed(Exception):
+    def __init__(self, node: str, error: BaseException) -> None:
+        super().__init__(str(error))
+        self.node = node
+        self.error = error
+
+
+def node_kind(node_id: str) -> str:
+    """``ResearchAgent:news`` is a variant of ``ResearchAgent``."""
+    return node_id.split(":", 1)[0]
+
+
+def stage_dependencies(plan_steps: list[str], blueprint: Dict[str, Any]) -> Dict[str, list[str]]:
+    """Dependencies between plan steps, taken from the blueprint edges.
+
+    Edges that pass through nodes outside the plan (e.g. the stem agents) are
+    followed transitively. Plan steps the blueprint does not know about run
+    after the previous step, as the old linear loop did.
+    """
+    planned = list(dict.fromkeys(plan_steps))
+    planned_set = set(planned)
+    known = {node["id"] for node in blueprint.get("nodes", [])}
+    parents: Dict[str, list[str]] = {}
+    for edge in blueprint.get("edges", []):
+        parents.setdefault(edge["target"], []).append(edge["source"])
+
+    deps: Dict[str, list[str]] = {}
+    for idx, node in enumerate(planned):
+        if node not in known:
+            deps[node] = [planned[idx - 1]] if idx else []
+            continue
+        found: list[str] = []
+        seen = {node}
+        stack = list(parents.get(node, []))
+        while stack:
+            parent = stack.pop()
+            if parent in seen:
+                continue
+            seen.add(parent)
+            if parent in planned_set:
+                found.append(parent)
+            else:
+                stack.extend(parents.get(parent, []))
+        deps[node] = sorted(found, key=planned.index)
+    return deps
+
+
+def topological_order(deps: Dict[str, list[str]]) -> list[str]:
+    """Kahn's algorithm; ties keep insertion order. Raises ValueError on cycles."""
+    remaining = {node: set(parents) & deps.keys() for node, parents in deps.items()}
+    order: list[str] = []
+    while remaining:
+        ready = [node for node, parents in remaining.items() if not parents]
+        if not ready:
+            raise ValueError(f"workflow graph has a cycle through {sorted(remaining)}")
+        for node in ready:
+            order.append(node)
+            del remaining[node]
+        for parents in remaining.values():
+            parents.difference_update(ready)
+    return order
+
+
+def ancestors(node: str, deps: Dict[str, list[str]]) -> list[str]:
+    seen: list[str] = []
+    stack = list(deps.get(node, []))
+    while stack:
+        parent = stack.pop()
+        if parent not in seen:
+            seen.append(parent)
+            stack.extend(deps.get(parent, []))
+    return seen
+
+
+async def run_graph(
+    deps: Dict[str, list[str]],
+    run_node: Callable[[str], Awaitable[None]],
+    max_parallel: int,
+) -> None:
+    """Run every node once all of its dependencies finished, at most ``max_parallel`` at a time.
+
+    The first failing node cancels the rest and is re-raised as NodeFailed.
+    """
+    order = topological_order(deps)
+    limit = asyncio.Semaphore(max(1, max_parallel))
+    done: set[str] = set()
+    running: Dict[asyncio.Task, str] = {}
+
+    async def guarded(node: str) -> None:
+        async with limit:
+            await run_node(node)
+
+    def launch_ready() -> None:
+        started = set(running.values())
+        for node in order:
+            if node in done or node in started:
+                continue
+            if all(parent in done for parent in deps[node]):
+                running[asyncio.create_task(guarded(node))] = node
+
+    launch_ready()
+    try:
+        while running:
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                node = running.pop(task)
+                if task.exception() is not None:
+                    raise NodeFailed(node, task.exception())
+                done.add(node)
+            launch_ready()
+    finally:
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
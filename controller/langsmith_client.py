@@ -1,37 +1,219 @@
 from __future__ import annotations
 
+import asyncio
 import os
+import time
+from typing import Any, Dict, Optional
+
+import httpx
 import requests
 
+from agent_core import fixtures
+from agent_core.fixtures import fixture_key
+from agent_core.governor import governor_for
+
 LANGSMITH_API_URL = os.environ.get("LANGSMITH_API_URL", "https://api.smith.langchain.com")
 LANGSMITH_API_KEY = os.environ.get("LANGSMITH_API_KEY")
 LANGSMITH_PROJECT = os.environ.get("LANGSMITH_PROJECT", "greatagent-demo")
+LANGSMITH_SYNC_SECONDS = float(os.environ.get("LANGSMITH_SYNC_SECONDS", "15"))
+LANGSMITH_PAGE_SIZE = int(os.environ.get("LANGSMITH_PAGE_SIZE", "100"))
+LANGSMITH_TRACE_CACHE_MAX = int(os.environ.get("LANGSMITH_TRACE_CACHE_MAX", "2000"))
+
+# Runs in these states may still change, so the next sync starts no later than the oldest of them.
+UNFINISHED = {"running", "pending", "queued"}
+
+
+def _demo_traces() -> list[dict]:
+    return [
+        {
+            "id": "demo-1",
+            "name": "Mock Run",
+            "status": "completed",
+            "url": f"https://smith.langchain.com/public/{LANGSMITH_PROJECT}/demo-1",
+        }
+    ]
+
+
+def _trace(run: dict) -> dict:
+    return {
+        "id": run.get("id"),
+        "name": run.get("name"),
+        "status": run.get("status"),
+        "url": run.get("url") or run.get("dashboard_url"),
+        "start_time": run.get("start_time"),
+        "error": run.get("error"),
+    }
+
+
+def _runs(data: Any) -> list[dict]:
+    if isinstance(data, dict):
+        return data.get("runs") or data.get("data") or []
+    return data or []
 
 
 def fetch_recent_traces(limit: int = 5):
-    if not LANGSMITH_API_KEY:
-        return [
-            {
-                "id": "demo-1",
-                "name": "Mock Run",
-                "status": "completed",
-                "url": f"https://smith.langchain.com/public/{LANGSMITH_PROJECT}/demo-1",
-            }
-        ]
+    """One blocking fetch of the newest runs; the controller serves ``TRACE_SYNCER`` instead."""
+    if not LANGSMITH_API_KEY and not fixtures.replaying():
+        return _demo_traces()
     headers = {"x-api-key": LANGSMITH_API_KEY}
     params = {"project_name": LANGSMITH_PROJECT, "limit": limit}
-    resp = requests.get(f"{LANGSMITH_API_URL}/runs", headers=headers, params=params, timeout=15)
-    resp.raise_for_status()
-    data = resp.json()
-    runs = data.get("data") or data
-    traces = []
-    for run in runs[:limit]:
-        traces.append(
-            {
-                "id": run.get("id"),
-                "name": run.get("name"),
-                "status": run.get("status"),
-                "url": run.get("url") or run.get("dashboard_url"),
-            }
-        )
-    return traces
+    key = fixture_key("runs", params)
+    if fixtures.replaying():
+        data = fixtures.FIXTURES.replay("langsmith", key, f"/runs {params}")
+    else:
+        started = time.perf_counter()
+        resp = requests.get(f"{LANGSMITH_API_URL}/runs", headers=headers, params=params, timeout=15)
+        resp.raise_for_status()
+        data = resp.json()
+        if fixtures.recording():
+            fixtures.FIXTURES.record("langsmith", key, data, time.perf_counter() - started, request=f"/runs {params}")
+    return [_trace(run) for run in _runs(data)[:limit]]
+
+
+class TraceSyncer:
+    """Keeps recent LangSmith runs in memory, fetched incrementally in the background.
+
+    Each sync asks only for runs started at or after the cursor: the newest
+    start time seen, or the oldest run still in progress, so status changes
+    are picked up too. ``query`` never touches the network.
+    """
+
+    def __init__(
+        self,
+        interval: float = LANGSMITH_SYNC_SECONDS,
+        page_size: int = LANGSMITH_PAGE_SIZE,
+        max_traces: int = LANGSMITH_TRACE_CACHE_MAX,
+    ) -> None:
+        self.interval = interval
+        self.page_size = page_size
+        self.max_traces = max_traces
+        self._traces: Dict[str, dict] = {}
+        self._ordered: list[dict] = []  # newest first
+        self._by_status: Dict[str, list[dict]] = {}
+        self._cursor: Optional[str] = None
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self.synced_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.syncs = 0
+        self.pages = 0
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wake = asyncio.Event()
+            self._task = loop.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def kick(self) -> None:
+        """Sync now instead of at the next interval (e.g. right after a run finished)."""
+        self._wake.set()
+
+    async def _loop(self) -> None:
+        while True:
+            await self.sync()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def sync(self) -> None:
+        try:
+            if not LANGSMITH_API_KEY and not fixtures.replaying():
+                self._merge(_demo_traces())
+            else:
+                await self._fetch_new()
+            self.last_error = None
+        except Exception as exc:  # keep serving what we have
+            self.last_error = f"{type(exc).__name__}: {exc}"
+        self.syncs += 1
+        self.synced_at = time.time()
+
+    async def _get(self, params: Dict[str, Any]) -> Any:
+        key = fixture_key("runs", params)
+        if fixtures.replaying():
+            return await fixtures.FIXTURES.areplay("langsmith", key, f"/runs {params}")
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=15, headers={"x-api-key": LANGSMITH_API_KEY or ""})
+
+        async def get() -> Any:
+            started = time.perf_counter()
+            resp = await self._client.get(f"{LANGSMITH_API_URL}/runs", params=params)
+            resp.raise_for_status()
+            data = resp.json()
+            if fixtures.recording():
+                fixtures.FIXTURES.record("langsmith", key, data, time.perf_counter() - started, request=f"/runs {params}")
+            return data
+
+        return await governor_for("langsmith", LANGSMITH_API_URL).call(get)
+
+    async def _fetch_new(self) -> None:
+        params: Dict[str, Any] = {"project_name": LANGSMITH_PROJECT, "limit": self.page_size}
+        if self._cursor:
+            params["start_time"] = self._cursor
+        offset = 0
+        while True:
+            data = await self._get({**params, "offset": offset} if offset else params)
+            self.pages += 1
+            runs = _runs(data)
+            self._merge([_trace(run) for run in runs])
+            # the first sync only takes the newest page; later ones page through everything since the cursor
+            if "start_time" not in params or len(runs) < self.page_size or offset + len(runs) >= self.max_traces:
+                break
+            offset += len(runs)
+
+    def _merge(self, traces: list[dict]) -> None:
+        if not traces:
+            return
+        for trace in traces:
+            if trace["id"] is not None:
+                self._traces[trace["id"]] = trace
+        ordered = sorted(self._traces.values(), key=lambda t: t.get("start_time") or "", reverse=True)
+        for stale in ordered[self.max_traces:]:
+            self._traces.pop(stale["id"], None)
+        self._ordered = ordered[: self.max_traces]
+        by_status: Dict[str, list[dict]] = {}
+        for trace in self._ordered:
+            by_status.setdefault(str(trace.get("status") or "").lower(), []).append(trace)
+        self._by_status = by_status
+        unfinished = [t["start_time"] for t in self._ordered if t.get("status") in UNFINISHED and t.get("start_time")]
+        newest = next((t["start_time"] for t in self._ordered if t.get("start_time")), None)
+        self._cursor = min(unfinished) if unfinished else newest
+
+    def query(self, status: Optional[str] = None, name: Optional[str] = None, limit: int = 5, offset: int = 0) -> Dict[str, Any]:
+        traces = self._by_status.get(status.lower(), []) if status else self._ordered
+        if name:
+            needle = name.lower()
+            traces = [trace for trace in traces if needle in str(trace.get("name") or "").lower()]
+        return {
+            "traces": traces[offset: offset + limit],
+            "total": len(traces),
+            "offset": offset,
+            "synced_at": self.synced_at,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cached": len(self._ordered),
+            "cursor": self._cursor,
+            "syncs": self.syncs,
+            "pages": self.pages,
+            "synced_at": self.synced_at,
+            "last_error": self.last_error,
+        }
+
+
+TRACE_SYNCER = TraceSyncer()
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from controller.run_store import DATA_DIR
+
+RUN_BACKEND = os.environ.get("RUN_BACKEND", "local")
+RUN_BACKEND_PATH = Path(os.environ.get("RUN_BACKEND_PATH", DATA_DIR / "run_backend.sqlite3"))
+RUN_BACKEND_POLL_SECONDS = float(os.environ.get("RUN_BACKEND_POLL_SECONDS", "0.05"))
+
+# apply(run_id, kind, payload): runs a control command forwarded by another worker
+CommandHandler = Callable[[str, str, Dict[str, Any]], Awaitable[None]]
+
+
+class LocalBackend:
+    """Single-process default: every run lives in this process and nothing is shared."""
+
+    shared = False
+
+    def start(self, apply: CommandHandler) -> None:
+        pass
+
+    async def announce(self, run: dict) -> None:
+        pass
+
+    def publish(self, run: dict, item: Dict[str, Any]) -> None:
+        pass
+
+    def close(self, run: dict) -> None:
+        pass
+
+    async def forward(self, run_id: str, kind: str, payload: Dict[str, Any]) -> bool:
+        return False
+
+    async def remote_run(self, run_id: str) -> Optional[dict]:
+        return None
+
+    async def remote_events(self, run_id: str, after: int) -> AsyncIterator[Dict[str, Any]]:
+        return
+        yield
+
+    async def get_config(self, key: str, default: Any) -> Any:
+        return default
+
+    async def set_config(self, key: str, value: Any) -> None:
+        pass
+
+    async def forget(self, run_id: str) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "local"}
+
+
+class SqliteBackend(LocalBackend):
+    """Run snapshots, events, control commands and shared config in one SQLite file.
+
+    Every controller worker points at the same file. The worker executing a run
+    batches its events and run snapshot into the file every poll interval;
+    other workers serve ``/events`` and ``/runs`` from there and forward
+    control requests as commands, which the owner picks up on its next poll.
+    """
+
+    shared = True
+
+    def __init__(self, path: Path = RUN_BACKEND_PATH, poll: float = RUN_BACKEND_POLL_SECONDS) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.poll = poll
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        self._pending: list[tuple[str, Dict[str, Any]]] = []
+        self._dirty: Dict[str, dict] = {}
+        self._closed: set[str] = set()
+        self._apply: Optional[CommandHandler] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: tuple[list, dict] = ([], {})  # the batch being written, put back if the write fails
+        self.flushed_events = 0
+        self.failed_flushes = 0
+        self.applied_commands = 0
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                " id TEXT PRIMARY KEY, owner TEXT, status TEXT, closed INTEGER DEFAULT 0, updated REAL, run TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS events (run_id TEXT, id INTEGER, event TEXT, data TEXT, PRIMARY KEY (run_id, id))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS commands ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT, owner TEXT, run_id TEXT, kind TEXT, payload TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS commands_owner ON commands (owner, seq)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS config (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _write(self, sql: str, params: tuple = ()) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(sql, params)
+
+    def start(self, apply: CommandHandler) -> None:
+        self._apply = apply
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._pump())
+
+    async def announce(self, run: dict) -> None:
+        """Make a new run visible to the other workers right away rather than on the next flush."""
+        self._dirty[run["id"]] = run
+        await self.flush()
+
+    def publish(self, run: dict, item: Dict[str, Any]) -> None:
+        self._pending.append((run["id"], item))
+        self._dirty[run["id"]] = run
+
+    def close(self, run: dict) -> None:
+        """No more events will follow; remote subscribers stop once they have read the rest."""
+        self._closed.add(run["id"])
+        self._dirty[run["id"]] = run
+
+    async def _pump(self) -> None:
+        while True:
+            try:
+                await self.flush()
+                await self._apply_commands()
+            except sqlite3.OperationalError:
+                pass  # file busy beyond the timeout; flush kept the batch, so the next poll retries it
+            await asyncio.sleep(self.poll)
+
+    async def flush(self) -> None:
+        if not self._pending and not self._dirty:
+            return
+        pending, self._pending = self._pending, []
+        dirty, self._dirty = self._dirty, {}
+        now = time.time()
+        # serialize on the loop thread: the run dicts keep changing under us
+        runs = [
+            (run_id, self.worker_id, run.get("status"), run_id in self._closed, now, json.dumps(run, ensure_ascii=False, default=str))
+            for run_id, run in dirty.items()
+        ]
+        events = [
+            (run_id, item["id"], item["event"], json.dumps(item["data"], ensure_ascii=False, default=str))
+            for run_id, item in pending
+        ]
+        self._inflight = (pending, dirty)
+        try:
+            await asyncio.to_thread(self._write_batch, runs, events)
+        except sqlite3.OperationalError:
+            # events (and a run's closed flag) have no later snapshot to supersede them: requeue, oldest first
+            self.failed_flushes += 1
+            self._pending[:0] = pending
+            self._dirty = {**dirty, **self._dirty}
+            raise
+        finally:
+            self._inflight = ([], {})
+        self.flushed_events += len(events)
+
+    def _write_batch(self, runs: list[tuple], events: list[tuple]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO runs (id, owner, status, closed, updated, run) VALUES (?, ?, ?, ?, ?, ?)", runs
+            )
+            self._conn.executemany("INSERT OR REPLACE INTO events (run_id, id, event, data) VALUES (?, ?, ?, ?)", events)
+
+    async def _apply_commands(self) -> None:
+        rows = await asyncio.to_thread(
+            self._query, "SELECT seq, run_id, kind, payload FROM commands WHERE owner = ? ORDER BY seq", (self.worker_id,)
+        )
+        if not rows:
+            return
+        await asyncio.to_thread(self._write, "DELETE FROM commands WHERE owner = ? AND seq <= ?", (self.worker_id, rows[-1][0]))
+        for _, run_id, kind, payload in rows:
+            self.applied_commands += 1
+            if self._apply is not None:
+                await self._apply(run_id, kind, json.loads(payload))
+
+    async def forward(self, run_id: str, kind: str, payload: Dict[str, Any]) -> bool:
+        rows = await asyncio.to_thread(self._query, "SELECT owner FROM runs WHERE id = ?", (run_id,))
+        if not rows:
+            return False
+        await asyncio.to_thread(
+            self._write,
+            "INSERT INTO commands (owner, run_id, kind, payload) VALUES (?, ?, ?, ?)",
+            (rows[0][0], run_id, kind, json.dumps(payload)),
+        )
+        return True
+
+    async def remote_run(self, run_id: str) -> Optional[dict]:
+        rows = await asyncio.to_thread(self._query, "SELECT run FROM runs WHERE id = ?", (run_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    async def remote_events(self, run_id: str, after: int) -> AsyncIterator[Dict[str, Any]]:
+        """Events of a run owned by another worker, polled until its owner closes the run."""
+        cursor = after
+        while True:
+            closed = await asyncio.to_thread(self._query, "SELECT closed FROM runs WHERE id = ?", (run_id,))
+            rows = await asyncio.to_thread(
+                self._query, "SELECT id, event, data FROM events WHERE run_id = ? AND id > ? ORDER BY id", (run_id, cursor)
+            )
+            for event_id, event, data in rows:
+                cursor = event_id
+                yield {"id": event_id, "event": event, "data": json.loads(data)}
+            if not rows:
+                if not closed or closed[0][0]:
+                    return
+                await asyncio.sleep(self.poll)
+
+    async def get_config(self, key: str, default: Any) -> Any:
+        rows = await asyncio.to_thread(self._query, "SELECT value FROM config WHERE key = ?", (key,))
+        return json.loads(rows[0][0]) if rows else default
+
+    async def set_config(self, key: str, value: Any) -> None:
+        await asyncio.to_thread(
+            self._write, "INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)", (key, json.dumps(value, ensure_ascii=False))
+        )
+
+    async def forget(self, run_id: str) -> None:
+        """Drop a run that has been archived to the RunStore."""
+        pending, dirty = self._inflight
+        for queue, runs in ((self._pending, self._dirty), (pending, dirty)):
+            queue[:] = [entry for entry in queue if entry[0] != run_id]
+            runs.pop(run_id, None)
+        self._closed.discard(run_id)
+
+        def delete() -> None:
+            with self._lock, self._conn:
+                for table, column in (("runs", "id"), ("events", "run_id"), ("commands", "run_id")):
+                    self._conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (run_id,))
+
+        await asyncio.to_thread(delete)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "sqlite",
+            "worker_id": self.worker_id,
+            "pending_events": len(self._pending),
+            "flushed_events": self.flushed_events,
+            "failed_flushes": self.failed_flushes,
+            "applied_commands": self.applied_commands,
+        }
+
+
+def create_backend(kind: str = RUN_BACKEND) -> LocalBackend:
+    if kind == "local":
+        return LocalBackend()
+    if kind == "sqlite":
+        return SqliteBackend()
+    raise ValueError(f"unknown RUN_BACKEND {kind!r} (expected 'local' or 'sqlite')")
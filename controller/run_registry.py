@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from controller.event_log import EventLog
+from controller.run_signals import RunSignal
+from controller.run_store import RunStore
+
+RUN_TTL_SECONDS = float(os.environ.get("RUN_TTL_SECONDS", "600"))
+RUN_REGISTRY_MAX_FINISHED = int(os.environ.get("RUN_REGISTRY_MAX_FINISHED", "200"))
+
+
+class RunRegistry:
+    """In-memory runs plus their signals and event logs.
+
+    Finished runs stay resident for ``ttl`` seconds, and at most ``max_finished``
+    of them are kept; older ones are spilled to the RunStore and can still be
+    looked up (and their events replayed) from there.
+    """
+
+    def __init__(
+        self,
+        store: RunStore,
+        ttl: float = RUN_TTL_SECONDS,
+        max_finished: int = RUN_REGISTRY_MAX_FINISHED,
+        on_evict: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> None:
+        self.store = store
+        self.on_evict = on_evict
+        self.ttl = ttl
+        self.max_finished = max_finished
+        self.runs: Dict[str, dict] = {}
+        self.signals: Dict[str, RunSignal] = {}
+        self.logs: Dict[str, EventLog] = {}
+        self._finished: OrderedDict[str, float] = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._sweep_lock = asyncio.Lock()
+        self.evicted = 0
+
+    def register(self, run: dict) -> None:
+        run_id = run["id"]
+        self.runs[run_id] = run
+        self.signals[run_id] = RunSignal()
+        self.logs[run_id] = EventLog()
+
+    def restore(self, run: dict, history: list[dict] | None = None) -> None:
+        """Make a finished, archived or checkpointed run live again, keeping its event history."""
+        run_id = run["id"]
+        self._finished.pop(run_id, None)
+        self._sizes.pop(run_id, None)
+        self.runs[run_id] = run
+        self.signals.setdefault(run_id, RunSignal())
+        log = self.logs.get(run_id)
+        if log is None:
+            log = self.logs[run_id] = EventLog.restore(history or [])
+        log.reopen()
+
+    async def finish(self, run_id: str) -> None:
+        self.logs[run_id].close()
+        self._finished[run_id] = time.time()
+        self._sizes[run_id] = self._size_of(run_id)
+        await self.sweep()
+
+    async def sweep(self) -> None:
+        async with self._sweep_lock:
+            cutoff = time.time() - self.ttl
+            victims = [run_id for run_id, finished_at in self._finished.items() if finished_at <= cutoff]
+            overflow = len(self._finished) - len(victims) - self.max_finished
+            if overflow > 0:
+                victims.extend([run_id for run_id in self._finished if run_id not in victims][:overflow])
+            for run_id in victims:
+                await self._evict(run_id)
+
+    async def _evict(self, run_id: str) -> None:
+        finished_at = self._finished[run_id]
+        run = self.runs[run_id]
+        await asyncio.to_thread(self.store.save, run, self.logs[run_id].snapshot(), finished_at)
+        del self._finished[run_id]
+        self._sizes.pop(run_id, None)
+        for table in (self.runs, self.signals, self.logs):
+            table.pop(run_id, None)
+        self.evicted += 1
+        if self.on_evict is not None:
+            await self.on_evict(run_id)
+
+    async def lookup(self, run_id: str) -> tuple[dict, list[dict]] | None:
+        """Run and event history, from memory or from the on-disk store."""
+        run = self.runs.get(run_id)
+        if run is not None:
+            return run, self.logs[run_id].snapshot()
+        return await asyncio.to_thread(self.store.load, run_id)
+
+    def _size_of(self, run_id: str) -> int:
+        log = self.logs[run_id]
+        return (
+            len(json.dumps(self.runs[run_id], ensure_ascii=False, default=str))
+            + len(json.dumps(log.snapshot(), ensure_ascii=False, default=str))
+            + log.codec.nbytes
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        live_bytes = sum(self._size_of(run_id) for run_id in self.runs if run_id not in self._sizes)
+        return {
+            "resident_runs": len(self.runs),
+            "resident_finished_runs": len(self._finished),
+            "resident_bytes": live_bytes + sum(self._sizes.values()),
+            "evicted_runs": self.evicted,
+            "ttl_seconds": self.ttl,
+            "max_finished": self.max_finished,
+        }
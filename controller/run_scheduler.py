@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict
+
+RUN_MAX_CONCURRENT = int(os.environ.get("RUN_MAX_CONCURRENT", "32"))
+RUN_QUEUE_MAX = int(os.environ.get("RUN_QUEUE_MAX", "1000"))
+
+PRIORITIES = ("high", "normal", "low")
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after: int, available: int) -> None:
+        super().__init__(f"run queue is full; retry in {retry_after}s")
+        self.retry_after = retry_after
+        self.available = available
+
+
+class RunScheduler:
+    """Admits runs into a fixed number of execution slots.
+
+    Waiting runs sit in one queue per priority; within a priority, tenants are
+    served round-robin so one tenant's burst cannot starve the others. A run
+    that waits on a person (a pause or a selection) is parked: it lends its
+    slot to the queue and takes one back before it continues, ahead of runs
+    that have not started yet.
+    """
+
+    def __init__(self, max_running: int = RUN_MAX_CONCURRENT, max_queued: int = RUN_QUEUE_MAX) -> None:
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.running = 0
+        self.queued = 0
+        self._queues: Dict[str, OrderedDict[str, deque]] = {priority: OrderedDict() for priority in PRIORITIES}
+        self._queued_ids: set[str] = set()
+        self.parked = 0
+        self._resuming: deque[asyncio.Future] = deque()
+        self._avg_run_seconds = 5.0
+        self.completed = 0
+
+    def admit(self, count: int) -> None:
+        """Raise QueueFull unless ``count`` more runs fit in the queue."""
+        available = self.max_queued - self.queued
+        if count > available:
+            waves = math.ceil((self.queued + count) / max(1, self.max_running))
+            raise QueueFull(retry_after=max(1, int(waves * self._avg_run_seconds)), available=max(0, available))
+
+    def submit(self, run_id: str, launch: Callable[[], Awaitable[Any]], priority: str = "normal", tenant: str = "default") -> bool:
+        """Queue a run and start whatever fits; True if this run is still waiting for a slot."""
+        tenants = self._queues[priority]
+        tenants.setdefault(tenant, deque()).append((run_id, launch))
+        self._queued_ids.add(run_id)
+        self.queued += 1
+        self._dispatch()
+        return run_id in self._queued_ids
+
+    def cancel(self, run_id: str) -> bool:
+        if run_id not in self._queued_ids:
+            return False
+        for tenants in self._queues.values():
+            for tenant, items in list(tenants.items()):
+                for item in items:
+                    if item[0] == run_id:
+                        items.remove(item)
+                        if not items:
+                            del tenants[tenant]
+                        self._queued_ids.discard(run_id)
+                        self.queued -= 1
+                        return True
+        return False
+
+    def _next(self):
+        for priority in PRIORITIES:
+            tenants = self._queues[priority]
+            if tenants:
+                tenant, items = next(iter(tenants.items()))
+                item = items.popleft()
+                del tenants[tenant]
+                if items:
+                    tenants[tenant] = items  # back of the line
+                return item
+        return None
+
+    def park(self) -> None:
+        """The calling run stops needing its slot for now; a queued run may take it."""
+        self.running -= 1
+        self.parked += 1
+        self._dispatch()
+
+    async def unpark(self) -> None:
+        """Wait for a slot for a parked run that is about to continue."""
+        self.parked -= 1
+        if self.running < self.max_running and not self._resuming:
+            self.running += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._resuming.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                self.running += 1  # _run releases one slot when the run ends, however it ends
+            raise
+
+    def unpark_now(self) -> None:
+        """Like ``unpark`` without waiting, for a run that is ending anyway (stopped, cancelled)."""
+        self.parked -= 1
+        self.running += 1
+
+    def _dispatch(self) -> None:
+        while self.running < self.max_running and self._resuming:
+            future = self._resuming.popleft()
+            if not future.done():
+                self.running += 1
+                future.set_result(None)
+        while self.running < self.max_running and self.queued:
+            run_id, launch = self._next()
+            self._queued_ids.discard(run_id)
+            self.queued -= 1
+            self.running += 1
+            asyncio.create_task(self._run(launch))
+
+    async def _run(self, launch: Callable[[], Awaitable[Any]]) -> None:
+        started = time.perf_counter()
+        try:
+            await launch()
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._avg_run_seconds = 0.9 * self._avg_run_seconds + 0.1 * (time.perf_counter() - started)
+            self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": self.queued,
+            "parked": self.parked,
+            "resuming": len(self._resuming),
+            "max_running": self.max_running,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "avg_run_seconds": round(self._avg_run_seconds, 3),
+            "queued_by_priority": {
+                priority: {tenant: len(items) for tenant, items in tenants.items()}
+                for priority, tenants in self._queues.items()
+            },
+        }
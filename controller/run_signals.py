@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Callable
+
+
+class RunSignal:
+    """Wakes coroutines parked on a run's control state instead of having them poll.
+
+    Call ``notify()`` after changing pause/stop/selection/status; waiters
+    re-check their predicate and park again if it still does not hold.
+    """
+
+    def __init__(self) -> None:
+        self._event = asyncio.Event()
+
+    def notify(self) -> None:
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    async def wait_for(self, predicate: Callable[[], bool]) -> None:
+        while not predicate():
+            await self._event.wait()
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict
+
+# Directory for the controller's SQLite files whose paths are not set explicitly.
+DATA_DIR = Path(os.environ.get("GREATAGENT_DATA_DIR", "data"))
+RUN_STORE_PATH = Path(os.environ.get("RUN_STORE_PATH", DATA_DIR / "runs.sqlite3"))
+
+
+class RunStore:
+    """SQLite archive for runs evicted from memory, together with their event history."""
+
+    def __init__(self, path: Path = RUN_STORE_PATH) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # timeout: with several controller workers the file is shared between processes
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                " id TEXT PRIMARY KEY, status TEXT, finished_at REAL, run TEXT NOT NULL, events TEXT NOT NULL)"
+            )
+
+    def save(self, run: Dict[str, Any], events: list[Dict[str, Any]], finished_at: float) -> int:
+        run_blob = json.dumps(run, ensure_ascii=False)
+        events_blob = json.dumps(events, ensure_ascii=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO runs (id, status, finished_at, run, events) VALUES (?, ?, ?, ?, ?)",
+                (run["id"], run.get("status"), finished_at, run_blob, events_blob),
+            )
+        return len(run_blob) + len(events_blob)
+
+    def load(self, run_id: str) -> tuple[Dict[str, Any], list[Dict[str, Any]]] | None:
+        with self._lock:
+            row = self._conn.execute("SELECT run, events FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), json.loads(row[1])
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
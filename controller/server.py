@@ -1,24 +1,59 @@
 from __future__ import annotations
 import asyncio
+import contextvars
 import json
+import os
 import uuid
 import time
+from contextlib import asynccontextmanager
 from enum import Enum
 from copy import deepcopy
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sse_starlette.sse import EventSourceResponse
 from pydantic import BaseModel, Field
 
+from agent_core import metrics
+from agent_core.client_registry import CLIENT_REGISTRY
+from agent_core.completion_cache import COMPLETION_CACHE
+from agent_core.governor import GOVERNORS, governor_stats
 from agent_core.pipeline import AgentPipeline
-from controller.langsmith_client import fetch_recent_traces
-from controller.settings_store import (
-    get_agent_settings,
-    update_agent_settings,
+from agent_core.semantic_cache import SEMANTIC_CACHE, scope_key
+from agent_core.valyu_tool import SEARCH_STATS, search_stats
+from controller.checkpoints import CheckpointStore
+from controller.event_codec import EventCodec
+from controller.event_log import DeltaBuffer, EventLog
+from controller.fast_path import FAST_PATH
+from controller.graph_scheduler import (
+    NodeFailed,
+    ancestors,
+    node_kind,
+    run_graph,
+    stage_dependencies,
+    topological_order,
 )
-
-app = FastAPI(title="GreatAgent Controller")
+from controller.langsmith_client import TRACE_SYNCER
+from controller.run_backend import create_backend
+from controller.run_registry import RunRegistry
+from controller.run_scheduler import QueueFull, RunScheduler
+from controller.run_signals import RunSignal
+from controller.run_store import RunStore
+from controller.speculation import SPECULATION_STATS, SPECULATING, Speculator
+from controller.settings_store import SETTINGS, update_agent_settings
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await _resume_orphaned_runs()
+    TRACE_SYNCER.start()
+    SETTINGS.start()
+    yield
+    await TRACE_SYNCER.stop()
+    await asyncio.to_thread(SETTINGS.stop)
+
+
+app = FastAPI(title="GreatAgent Controller", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,8 +63,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-RUNS: dict[str, dict] = {}
-EVENT_QUEUES: dict[str, asyncio.Queue] = {}
+# Where run snapshots, events and control commands are shared between controller workers (RUN_BACKEND).
+BACKEND = create_backend()
+REGISTRY = RunRegistry(RunStore(), on_evict=BACKEND.forget)
+RUNS: dict[str, dict] = REGISTRY.runs
+EVENT_LOGS: dict[str, EventLog] = REGISTRY.logs
+SIGNALS: dict[str, RunSignal] = REGISTRY.signals
+SPECULATORS: dict[str, Speculator] = {}
+DELTAS: dict[str, DeltaBuffer] = {}
+PARKED: dict[str, int] = {}  # run id -> branches waiting on a person; the run's slot is lent out meanwhile
+SCHEDULER = RunScheduler()
+CHECKPOINTS = CheckpointStore()
+
+
+def _settings_changed(snapshot) -> None:
+    # warmed model clients and cached answers came from the old settings, whether changed via the API or the file
+    CLIENT_REGISTRY.invalidate()
+    SEMANTIC_CACHE.clear()
+
+
+SETTINGS.subscribe(_settings_changed)
+RETRYABLE_STATUSES = {"paused_error", "error"}
+# Runs whose pipeline task exists (or is queued to start), so pause/resume have something to act on.
+ACTIVE_STATUSES = {"queued", "running", "paused", "awaiting_selection"}
+SSE_SUBSCRIBERS = 0
+TERMINAL_EVENTS = {"done", "error", "stopping"}
+# Graph node currently executing in this task; streamed deltas are attributed to it.
+CURRENT_NODE: contextvars.ContextVar[str] = contextvars.ContextVar("current_node")
 
 DEFAULT_GRAPH_BLUEPRINT = {
     "nodes": [
@@ -53,6 +113,7 @@ DEFAULT_GRAPH_BLUEPRINT = {
 
 GLOBAL_GRAPH_BLUEPRINT = deepcopy(DEFAULT_GRAPH_BLUEPRINT)
 GLOBAL_WORKFLOW_OVERRIDE: list[str] | None = None
+RUN_MAX_PARALLEL_NODES = int(os.environ.get("RUN_MAX_PARALLEL_NODES", "4"))
 
 
 class RunMode(str, Enum):
@@ -60,9 +121,27 @@ class RunMode(str, Enum):
     HUMAN = "human"
 
 
-class StartRunReq(BaseModel):
-    user_query: str
+class RunPriority(str, Enum):
+    HIGH = "high"
+    NORMAL = "normal"
+    LOW = "low"
+
+
+class RunOptions(BaseModel):
     mode: RunMode = Field(default=RunMode.AUTO)
+    max_parallel: int | None = Field(default=None, ge=1)
+    speculative: bool = False
+    bypass_cache: bool = False
+    priority: RunPriority = Field(default=RunPriority.NORMAL)
+    tenant: str = "default"
+
+
+class StartRunReq(RunOptions):
+    user_query: str
+
+
+class BatchRunReq(RunOptions):
+    user_queries: list[str] = Field(min_length=1)
 
 
 class SelectionReq(BaseModel):
@@ -101,6 +180,7 @@ class AgentConfig(BaseModel):
     api_key: str = ""
     model: str = ""
     prompt: str = ""
+    token_budget: str | int = ""
 
 
 class AgentSettingsReq(BaseModel):
@@ -111,99 +191,412 @@ def now_ms() -> int:
     return int(time.time() * 1000)
 
 
+STAGE_SECONDS = metrics.Histogram("greatagent_stage_seconds", "Stage wall time, enter to exit.", ("stage",))
+WAIT_SECONDS = metrics.Histogram("greatagent_wait_seconds", "Time runs spent parked on a pause or a human selection.", ("reason",))
+QUEUE_SECONDS = metrics.Histogram("greatagent_queue_seconds", "Time from submission until a run got a slot.")
+SSE_LAG_EVENTS = metrics.Histogram(
+    "greatagent_sse_lag_events", "Events a subscriber was behind the log head when sending.",
+    buckets=(0, 1, 2, 5, 10, 50, 100, 1000),
+)
+SSE_CHARS = metrics.Counter("greatagent_sse_payload_chars_total", "Event payload characters sent on /events streams.", ("encoding",))
+metrics.Collected("greatagent_runs", "Resident runs by status.", ("status",), lambda: _count_by(run["status"] for run in RUNS.values()))
+metrics.Collected(
+    "greatagent_scheduler_runs", "Runs holding or waiting for a scheduler slot.", ("state",),
+    lambda: {("running",): SCHEDULER.running, ("queued",): SCHEDULER.queued, ("parked",): SCHEDULER.parked},
+)
+metrics.Collected("greatagent_sse_subscribers", "Open /events streams.", (), lambda: {(): SSE_SUBSCRIBERS})
+metrics.Collected(
+    "greatagent_semantic_cache_lookups_total", "Whole-run answer cache lookups: hit, miss, bypass.", ("result",),
+    lambda: {(result,): SEMANTIC_CACHE.counts[result] for result in ("hit", "miss", "bypass")},
+    kind="counter",
+)
+metrics.Collected(
+    "greatagent_completion_cache_lookups_total", "Completion cache lookups by stage and result.", ("stage", "result"),
+    lambda: {
+        **{(stage, "hit"): hits for stage, hits in COMPLETION_CACHE.hits.items()},
+        **{(stage, "miss"): misses for stage, misses in COMPLETION_CACHE.misses.items()},
+    },
+    kind="counter",
+)
+metrics.Collected(
+    "greatagent_search_calls_total", "Valyu searches by outcome: cache_hits, coalesced, outbound.", ("kind",),
+    lambda: {(kind,): n for kind, n in SEARCH_STATS.items()},
+    kind="counter",
+)
+metrics.Collected(
+    "greatagent_governor_window", "Current AIMD concurrency window per outbound target.", ("target",),
+    lambda: {(key,): governor.window.limit for key, governor in GOVERNORS.items()},
+)
+
+
+def _count_by(values) -> dict:
+    counts: dict = {}
+    for value in values:
+        counts[(value,)] = counts.get((value,), 0) + 1
+    return counts
+
+
+def _publish(run_id: str, event: str, payload: dict):
+    log = EVENT_LOGS.get(run_id)
+    if log:
+        BACKEND.publish(RUNS[run_id], log.append(event, payload))
+
+
 async def emit(run_id: str, event: str, payload: dict):
-    queue = EVENT_QUEUES.get(run_id)
-    if queue:
-        await queue.put({"event": event, "data": payload})
+    deltas = DELTAS.get(run_id)
+    if deltas:
+        deltas.flush()  # streamed text logged so far goes before this event
+    _publish(run_id, event, payload)
+
+
+def _notify(run_id: str):
+    signal = SIGNALS.get(run_id)
+    if signal:
+        signal.notify()
+
+
+def _waited(run: dict, reason: str, started: float):
+    elapsed = time.perf_counter() - started
+    WAIT_SECONDS.observe(elapsed, reason=reason)
+    waits = run["store"].setdefault("timing", {}).setdefault("wait_ms", {})
+    waits[reason] = waits.get(reason, 0) + int(elapsed * 1000)
+
+
+def _stage_done(run: dict, node: str, started: float) -> int:
+    elapsed = time.perf_counter() - started
+    STAGE_SECONDS.observe(elapsed, stage=node_kind(node))
+    run["store"].setdefault("timing", {}).setdefault("stages_ms", {})[node] = int(elapsed * 1000)
+    return int(elapsed * 1000)
+
+
+@asynccontextmanager
+async def _parked(run_id: str):
+    """Lend the run's scheduler slot out while its first branch waits on a person; take it back after the last."""
+    waiting = PARKED.get(run_id, 0)
+    PARKED[run_id] = waiting + 1
+    if not waiting:
+        SCHEDULER.park()
+    ending = True
+    try:
+        yield
+        ending = RUNS[run_id]["stop"]
+    finally:
+        PARKED[run_id] -= 1
+        if not PARKED[run_id]:
+            del PARKED[run_id]
+            if ending:
+                SCHEDULER.unpark_now()  # no point queueing for a slot just to stop
+            else:
+                await SCHEDULER.unpark()
 
 
 async def _wait_ok(run_id: str):
-    while True:
-        run = RUNS[run_id]
-        if run["stop"]:
-            raise RuntimeError("Stopped by user")
-        if not run["paused"]:
-            return
-        await asyncio.sleep(0.1)
+    run = RUNS[run_id]
+    if run["paused"] and not run["stop"]:
+        started = time.perf_counter()
+        async with _parked(run_id):
+            await SIGNALS[run_id].wait_for(lambda: run["stop"] or not run["paused"])
+        _waited(run, "pause", started)
+    if run["stop"]:
+        raise RuntimeError("Stopped by user")
 
 
-@app.post("/run")
-async def start_run(req: StartRunReq):
+async def _refresh_shared_config():
+    global GLOBAL_GRAPH_BLUEPRINT, GLOBAL_WORKFLOW_OVERRIDE
+    GLOBAL_WORKFLOW_OVERRIDE = await BACKEND.get_config("workflow_override", GLOBAL_WORKFLOW_OVERRIDE)
+    GLOBAL_GRAPH_BLUEPRINT = await BACKEND.get_config("graph_blueprint", GLOBAL_GRAPH_BLUEPRINT)
+
+
+async def _finish(run_id: str):
+    run = RUNS[run_id]
+    if run["status"] == "paused_error":
+        await _checkpoint(run_id)
+    else:
+        await asyncio.to_thread(CHECKPOINTS.delete, run_id)
+    BACKEND.close(run)
+    TRACE_SYNCER.kick()  # the run's trace shows up on the next /traces poll
+    await REGISTRY.finish(run_id)
+
+
+async def _checkpoint(run_id: str):
+    run = RUNS[run_id]
+    blob = json.dumps(run, ensure_ascii=False, default=str)  # on the loop: the run keeps changing
+    await asyncio.to_thread(CHECKPOINTS.save, run_id, run["status"], blob)
+
+
+async def _relaunch(run: dict, history: list[dict] | None, reason: str):
+    """Put a checkpointed run back on the scheduler; _run_pipeline skips the stages it already completed."""
+    run_id = run["id"]
+    failed = run["store"].pop("failed", None)
+    run.update(paused=False, stop=False, awaiting=[], status="queued", created_ms=now_ms())
+    REGISTRY.restore(run, history)
+    await BACKEND.announce(run)
+    await emit(run_id, "restored", {
+        "reason": reason,
+        "completed": list(run["store"].get("segments", {})),
+        "retrying": failed["node"] if failed else None,
+        "ts": now_ms(),
+    })
+    await _checkpoint(run_id)
+    BACKEND.start(_apply_forwarded)
+    SCHEDULER.submit(run_id, lambda: _run_pipeline(run_id), run.get("priority", "normal"), run.get("tenant", "default"))
+    return failed
+
+
+async def _resume_orphaned_runs():
+    """Pick up runs whose controller process died mid-flight (startup only)."""
+    runs = await asyncio.to_thread(CHECKPOINTS.claim_orphans)
+    for run in runs:
+        if run["status"] == "paused_error":
+            REGISTRY.restore(run)
+            await _finish(run["id"])  # stays retryable via /runs/{id}/retry
+        else:
+            await _relaunch(run, None, "restart")
+
+
+async def _register_run(user_query: str, opts: RunOptions) -> str:
     run_id = str(uuid.uuid4())
-    EVENT_QUEUES[run_id] = asyncio.Queue()
-    RUNS[run_id] = {
+    REGISTRY.register({
         "id": run_id,
-        "mode": req.mode,
-        "status": "running",
+        "mode": opts.mode,
+        "status": "queued",
         "store": {
-            "user_query": req.user_query,
+            "user_query": user_query,
             "selections": {},
             "workflow_override": GLOBAL_WORKFLOW_OVERRIDE,
             "graph_blueprint": deepcopy(GLOBAL_GRAPH_BLUEPRINT),
         },
         "paused": False,
         "stop": False,
-    }
-    asyncio.create_task(_run_pipeline(run_id))
-    return {"run_id": run_id}
+        "awaiting": [],
+        "created_ms": now_ms(),
+        "speculative": opts.speculative,
+        "bypass_cache": opts.bypass_cache,
+        "max_parallel": opts.max_parallel or RUN_MAX_PARALLEL_NODES,
+        "priority": opts.priority.value,
+        "tenant": opts.tenant,
+    })
+    await BACKEND.announce(RUNS[run_id])
+    await _checkpoint(run_id)
+    return run_id
+
+
+def _admit(count: int):
+    try:
+        SCHEDULER.admit(count)
+    except QueueFull as exc:
+        raise HTTPException(
+            429,
+            {"message": str(exc), "retry_after": exc.retry_after, "available": exc.available},
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+
+async def _submit(user_query: str, opts: RunOptions) -> str:
+    BACKEND.start(_apply_forwarded)
+    run_id = await _register_run(user_query, opts)
+    if SCHEDULER.submit(run_id, lambda: _run_pipeline(run_id), opts.priority.value, opts.tenant):
+        await emit(run_id, "queued", {"queued": SCHEDULER.queued, "ts": now_ms()})
+    return run_id
+
+
+@app.post("/run")
+async def start_run(req: StartRunReq):
+    await REGISTRY.sweep()
+    _admit(1)
+    await _refresh_shared_config()
+    return {"run_id": await _submit(req.user_query, req)}
+
+
+@app.post("/runs/batch")
+async def start_runs_batch(req: BatchRunReq):
+    await REGISTRY.sweep()
+    _admit(len(req.user_queries))
+    await _refresh_shared_config()
+    run_ids = [await _submit(query, req) for query in req.user_queries]
+    return {"run_ids": run_ids, "scheduler": SCHEDULER.stats()}
+
+
+@app.get("/scheduler")
+async def get_scheduler_stats():
+    return SCHEDULER.stats()
 
 
 @app.get("/events/{run_id}")
-async def events(run_id: str):
-    if run_id not in RUNS:
-        raise HTTPException(404, "run not found")
+async def events(
+    run_id: str,
+    last_event_id: int = Header(0, alias="Last-Event-ID"),
+    encoding: str = Query("json", pattern="^(json|compact)$"),
+    compress: bool = False,
+):
+    log = EVENT_LOGS.get(run_id)
+    if log is not None:
+        source = log.subscribe(after=last_event_id)
+    elif await BACKEND.remote_run(run_id) is not None:
+        source = BACKEND.remote_events(run_id, last_event_id)
+    else:
+        found = await REGISTRY.lookup(run_id)
+        if not found:
+            raise HTTPException(404, "run not found")
+        log = EventLog.restore(found[1])
+        source = log.subscribe(after=last_event_id)
+
+    # remote events arrive as fresh objects per connection: nothing to share, so this codec keeps nothing
+    codec = log.codec if log is not None else EventCodec(retain=False)
+    compact = encoding == "compact"
+    seen: set[str] = set()  # blobs this subscriber already has
 
     async def gen():
-        queue = EVENT_QUEUES.get(run_id)
-        while RUNS.get(run_id):
-            try:
-                item = await asyncio.wait_for(queue.get(), timeout=0.1)
-                yield {"event": item["event"], "data": json.dumps(item["data"], ensure_ascii=False)}
-                if item["event"] in {"done", "error", "stopping"}:
-                    break
-            except asyncio.TimeoutError:
-                run = RUNS[run_id]
-                if run["status"] in {"done", "error", "stopping"} and queue.empty():
+        global SSE_SUBSCRIBERS
+        SSE_SUBSCRIBERS += 1
+        try:
+            async for item in source:
+                if log is not None:
+                    SSE_LAG_EVENTS.observe(log.last_id - item["id"])
+                data = codec.compact(item, seen, compress) if compact else codec.full(item)
+                SSE_CHARS.inc(len(data), encoding=encoding)
+                yield {"id": str(item["id"]), "event": item["event"], "data": data}
+                if item["event"] in TERMINAL_EVENTS:
                     break
-        yield {"event": "end", "data": json.dumps({"run_id": run_id})}
+            end = {"run_id": run_id}
+            yield {"event": "end", "data": json.dumps({"d": end} if compact else end)}
+        finally:
+            SSE_SUBSCRIBERS -= 1
 
     return EventSourceResponse(gen())
 
 
+@app.get("/runs/{run_id}")
+async def get_run(run_id: str):
+    run = RUNS.get(run_id) or await BACKEND.remote_run(run_id)
+    if run is None:
+        found = await REGISTRY.lookup(run_id)
+        if not found:
+            raise HTTPException(404, "run not found")
+        run, _ = found
+    return {"id": run["id"], "mode": run["mode"], "status": run["status"], "store": run["store"]}
+
+
+@app.get("/runs_stats")
+async def get_runs_stats():
+    return {**REGISTRY.stats(), "backend": BACKEND.stats()}
+
+
+def _require_active(run: dict, action: str):
+    if run["status"] not in ACTIVE_STATUSES:
+        hint = "; use /runs/{id}/retry".format(id=run["id"]) if run["status"] in RETRYABLE_STATUSES else ""
+        raise HTTPException(409, f"cannot {action} a run that is {run['status']}{hint}")
+
+
+async def _pause(run: dict, payload: dict):
+    _require_active(run, "pause")
+    run["paused"] = True
+    run["status"] = "paused"
+    _notify(run["id"])
+    await emit(run["id"], "paused", {"ts": now_ms()})
+
+
+async def _resume(run: dict, payload: dict):
+    if run["status"] == "paused_error":
+        return await _retry(run, payload)  # its pipeline has ended; resuming means re-running the failed node
+    _require_active(run, "resume")
+    run["paused"] = False
+    run["status"] = "running"
+    _notify(run["id"])
+    await emit(run["id"], "resumed", {"ts": now_ms()})
+
+
+async def _stop(run: dict, payload: dict):
+    run_id = run["id"]
+    run["stop"] = True
+    run["status"] = "stopping"
+    _notify(run_id)
+    await emit(run_id, "stopping", {"ts": now_ms()})
+    if SCHEDULER.cancel(run_id):
+        run["status"] = "error"
+        await emit(run_id, "error", {"message": "Stopped by user"})
+        await _finish(run_id)
+
+
+async def _select(run: dict, payload: dict):
+    node, choice_index = payload["node"], payload["choice_index"]
+    run["store"]["selections"][node] = choice_index
+    if run["status"] == "awaiting_selection" and not set(run["awaiting"]) - {node}:
+        run["status"] = "running"
+    _notify(run["id"])
+    await emit(run["id"], "selection", {"node": node, "choice_index": choice_index, "ts": now_ms()})
+    await _checkpoint(run["id"])
+
+
+async def _retry(run: dict, payload: dict, history: list[dict] | None = None):
+    if run["status"] not in RETRYABLE_STATUSES:
+        raise HTTPException(409, f"run is {run['status']}; only {sorted(RETRYABLE_STATUSES)} runs can be retried")
+    _admit(1)
+    return await _relaunch(run, history, "retry")
+
+
+CONTROL_COMMANDS = {"pause": _pause, "resume": _resume, "stop": _stop, "select": _select, "retry": _retry}
+
+
+async def _control(run_id: str, kind: str, payload: dict):
+    """Apply a control request here if this worker runs the pipeline, else hand it to the worker that does."""
+    run = RUNS.get(run_id)
+    if run is not None:
+        await CONTROL_COMMANDS[kind](run, payload)
+        return {"ok": True}
+    if await BACKEND.forward(run_id, kind, payload):
+        return {"ok": True, "forwarded": True}
+    raise HTTPException(404, "run not found")
+
+
+async def _apply_forwarded(run_id: str, kind: str, payload: dict):
+    run = RUNS.get(run_id)
+    if run is not None and kind in CONTROL_COMMANDS:
+        try:
+            await CONTROL_COMMANDS[kind](run, payload)
+        except HTTPException:
+            pass  # nobody is waiting for the answer to a forwarded command
+
+
 @app.post("/pause/{run_id}")
 async def pause(run_id: str):
-    RUNS[run_id]["paused"] = True
-    RUNS[run_id]["status"] = "paused"
-    await emit(run_id, "paused", {"ts": now_ms()})
-    return {"ok": True}
+    return await _control(run_id, "pause", {})
 
 
 @app.post("/resume/{run_id}")
 async def resume(run_id: str):
-    RUNS[run_id]["paused"] = False
-    RUNS[run_id]["status"] = "running"
-    await emit(run_id, "resumed", {"ts": now_ms()})
-    return {"ok": True}
+    return await _control(run_id, "resume", {})
 
 
 @app.post("/stop/{run_id}")
 async def stop(run_id: str):
-    RUNS[run_id]["stop"] = True
-    RUNS[run_id]["status"] = "stopping"
-    await emit(run_id, "stopping", {"ts": now_ms()})
-    return {"ok": True}
+    return await _control(run_id, "stop", {})
 
 
 @app.post("/select")
 async def select(req: SelectionReq):
-    run = RUNS.get(req.run_id)
-    if not run:
-        raise HTTPException(404, "run not found")
-    run["store"]["selections"][req.node] = req.choice_index
-    if run["status"] == "awaiting_selection":
-        run["status"] = "running"
-    await emit(req.run_id, "selection", {"node": req.node, "choice_index": req.choice_index, "ts": now_ms()})
-    return {"ok": True}
+    return await _control(req.run_id, "select", {"node": req.node, "choice_index": req.choice_index})
+
+
+@app.post("/runs/{run_id}/retry")
+async def retry_run(run_id: str):
+    """Re-run a failed run from its checkpoint: completed stages are kept, only the failed node runs again."""
+    failed = RUNS[run_id]["store"].get("failed") if run_id in RUNS else None
+    try:
+        await _control(run_id, "retry", {})
+        return {"ok": True, "retrying": failed["node"] if failed else None}
+    except HTTPException as exc:
+        if exc.status_code != 404:
+            raise
+    history = None
+    run = await asyncio.to_thread(CHECKPOINTS.load, run_id)
+    if run is None:
+        found = await REGISTRY.lookup(run_id)
+        if not found:
+            raise HTTPException(404, "run not found")
+        run, history = found
+    failed = await _retry(run, {}, history)
+    return {"ok": True, "retrying": failed["node"] if failed else None}
 
 
 @app.post("/workflow")
@@ -213,54 +606,132 @@ async def update_workflow(req: WorkflowUpdateReq):
         raise HTTPException(400, "steps cannot be empty")
     global GLOBAL_WORKFLOW_OVERRIDE
     GLOBAL_WORKFLOW_OVERRIDE = steps
+    await BACKEND.set_config("workflow_override", steps)
     return {"workflow_plan": steps}
 
 
 @app.get("/workflow")
 async def get_workflow():
+    await _refresh_shared_config()
     return {"workflow_plan": GLOBAL_WORKFLOW_OVERRIDE or []}
 
 
 @app.get("/workflow_graph")
 async def get_workflow_graph():
+    await _refresh_shared_config()
     return GLOBAL_GRAPH_BLUEPRINT
 
 
 @app.post("/workflow_graph")
 async def set_workflow_graph(req: WorkflowGraphReq):
     global GLOBAL_GRAPH_BLUEPRINT
-    GLOBAL_GRAPH_BLUEPRINT = {
+    blueprint = {
         "nodes": [node.model_dump() for node in req.nodes],
         "edges": [edge.model_dump() for edge in req.edges],
     }
+    node_ids = [node["id"] for node in blueprint["nodes"]]
+    try:
+        topological_order(stage_dependencies(node_ids, blueprint))
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
+    GLOBAL_GRAPH_BLUEPRINT = blueprint
+    await BACKEND.set_config("graph_blueprint", blueprint)
     return GLOBAL_GRAPH_BLUEPRINT
 
 
 @app.get("/agent_settings")
 async def get_agent_settings_route():
-    return {"agents": get_agent_settings()}
+    snapshot = SETTINGS.snapshot
+    return {"agents": snapshot.to_dict(), "version": snapshot.version}
 
 
 @app.post("/agent_settings")
 async def set_agent_settings(req: AgentSettingsReq):
-    updated = update_agent_settings({agent: data.model_dump() for agent, data in req.agents.items()})
-    return {"agents": updated}
+    update_agent_settings({agent: data.model_dump() for agent, data in req.agents.items()})
+    snapshot = SETTINGS.snapshot
+    return {"agents": snapshot.to_dict(), "version": snapshot.version}
+
+
+@app.get("/agent_settings/stats")
+async def get_agent_settings_stats():
+    return SETTINGS.stats()
+
+
+@app.get("/fast_path")
+async def get_fast_path_stats():
+    return FAST_PATH.stats()
+
+
+@app.get("/semantic_cache")
+async def get_semantic_cache_stats():
+    return SEMANTIC_CACHE.stats()
+
+
+@app.get("/completion_cache")
+async def get_completion_cache_stats():
+    return COMPLETION_CACHE.stats()
+
+
+@app.get("/model_clients")
+async def get_model_clients_stats():
+    return CLIENT_REGISTRY.stats()
+
+
+@app.get("/speculation")
+async def get_speculation_stats():
+    return dict(SPECULATION_STATS)
+
+
+@app.get("/search_cache")
+async def get_search_cache_stats():
+    return search_stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/governors")
+async def get_governor_stats():
+    return governor_stats()
 
 
 @app.get("/traces")
-async def get_traces(limit: int = 5):
-    return {"traces": fetch_recent_traces(limit)}
+async def get_traces(
+    limit: int = Query(5, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    status: str | None = None,
+    name: str | None = None,
+):
+    """Recent LangSmith traces from the background syncer's cache; ``name`` matches substrings."""
+    TRACE_SYNCER.start()
+    return {**TRACE_SYNCER.query(status, name, limit, offset), "sync": TRACE_SYNCER.stats()}
 
 
 async def _record(run_id: str, node: str, inputs: dict, outputs: dict):
-    RUNS[run_id]["store"].setdefault("segments", {})[node] = {"input": inputs, "output": outputs}
+    store = RUNS[run_id]["store"]
+    store.setdefault("segments", {})[node] = {"input": inputs, "output": outputs}
+    store.get("outputs", {}).pop(node, None)
     await emit(run_id, "segment", {"node": node, "input": inputs, "output": outputs})
+    await _checkpoint(run_id)
+
+
+async def _stage_output(run_id: str, node: str, compute) -> dict:
+    """A stage's model output, checkpointed before it waits for a selection so a restart doesn't pay for it twice."""
+    outputs = RUNS[run_id]["store"].setdefault("outputs", {})
+    if node not in outputs:
+        outputs[node] = await compute()
+        await _checkpoint(run_id)
+    return outputs[node]
 
 
 async def _pause_with_error(run_id: str, node: str, message: str):
     run = RUNS[run_id]
     run["paused"] = True
     run["status"] = "paused_error"
+    run["store"]["failed"] = {"node": node, "message": message}
+    _notify(run_id)
     await emit(run_id, "agent_error", {"node": node, "message": message, "ts": now_ms()})
 
 
@@ -268,88 +739,281 @@ async def _await_selection(run_id: str, node: str, options: list[str], mode_labe
     run = RUNS[run_id]
     choice_idx = 0
     if mode_label == "engage_human" and options:
+        # Parallel branches may wait on several selections at once.
+        run["awaiting"].append(node)
         run["status"] = "awaiting_selection"
         await emit(run_id, "awaiting_selection", {"node": node})
-        while run["status"] == "awaiting_selection":
-            await asyncio.sleep(0.1)
-        choice_idx = run["store"]["selections"].get(node, 0)
-        run["status"] = "running"
+        started = time.perf_counter()
+        async with _parked(run_id):
+            await SIGNALS[run_id].wait_for(lambda: run["stop"] or node in run["store"]["selections"])
+        _waited(run, "selection", started)
+        if run["stop"]:
+            raise RuntimeError("Stopped by user")
+        choice_idx = run["store"]["selections"][node]
+        run["awaiting"].remove(node)
+        if not run["awaiting"]:
+            run["status"] = "running"
     return choice_idx
 
 
+def _upstream_nodes(node: str, deps: dict[str, list[str]], kind: str) -> list[str]:
+    order = list(deps)
+    return sorted((parent for parent in ancestors(node, deps) if node_kind(parent) == kind), key=order.index)
+
+
+def _analysis_candidates(selected: dict, node: str, deps: dict[str, list[str]], intake: dict) -> list[str] | None:
+    """Analysis input, or None while an upstream research pick is still unknown."""
+    parents = _upstream_nodes(node, deps, "ResearchAgent")
+    if any(parent not in selected for parent in parents):
+        return None
+    return [selected[parent] for parent in parents] or [intake["normalized_query"]]
+
+
+def _validation_draft(selected: dict, node: str, deps: dict[str, list[str]]) -> str | None:
+    parents = _upstream_nodes(node, deps, "AnalysisAgent")
+    if any(parent not in selected for parent in parents):
+        return None
+    return "\n\n".join(selected[parent] for parent in parents)
+
+
+def _speculate(run_id: str, pipeline: AgentPipeline, node: str, options: list[str], deps: dict[str, list[str]], intake: dict):
+    """While ``node`` waits for a human pick, start its direct children for the top-k options."""
+    speculator = SPECULATORS.get(run_id)
+    if speculator is None:
+        return
+    selected = RUNS[run_id]["store"]["selected"]
+    children = [child for child, parents in deps.items() if node in parents]
+    for option in options[: speculator.top_k]:
+        overlay = {**selected, node: option}
+        for child in children:
+            kind = node_kind(child)
+            if kind == "AnalysisAgent":
+                candidates = _analysis_candidates(overlay, child, deps, intake)
+                if candidates is not None:
+                    speculator.launch(child, {"candidates": candidates}, lambda c=candidates: pipeline.arun_analysis(c))
+            elif kind == "ValidationAgent":
+                draft = _validation_draft(overlay, child, deps)
+                if draft is not None:
+                    speculator.launch(child, {"draft": draft}, lambda d=draft: pipeline.arun_validation(d))
+
+
+async def _claim_speculation(run_id: str, node: str, inputs: dict) -> dict | None:
+    speculator = SPECULATORS.get(run_id)
+    if speculator is None:
+        return None
+    claimed = await speculator.claim(node, inputs)
+    if claimed is None:
+        return None
+    result, hidden_ms = claimed
+    await emit(run_id, "speculation", {"node": node, "hidden_ms": hidden_ms})
+    return result
+
+
+async def _run_stage(
+    run_id: str, pipeline: AgentPipeline, node: str, deps: dict[str, list[str]], intake: dict, mode_label: str
+):
+    run = RUNS[run_id]
+    segments = run["store"].setdefault("segments", {})
+    selected = run["store"]["selected"]
+    kind = node_kind(node)
+    if kind == "ResearchAgent":
+        research = await _stage_output(run_id, node, lambda: pipeline.arun_research(intake["normalized_query"]))
+        options = research["candidates"]
+        await emit(run_id, "options", {"node": node, "options": options})
+        _speculate(run_id, pipeline, node, options, deps, intake)
+        choice_idx = await _await_selection(run_id, node, options, mode_label)
+        selected[node] = options[choice_idx] if options else ""
+        await _record(run_id, node, {"query": intake["normalized_query"]}, research)
+    elif kind == "AnalysisAgent":
+        candidates = _analysis_candidates(selected, node, deps, intake)
+
+        async def analyse():
+            claimed = await _claim_speculation(run_id, node, {"candidates": candidates})
+            return claimed if claimed is not None else await pipeline.arun_analysis(candidates)
+
+        analysis = await _stage_output(run_id, node, analyse)
+        options = analysis["options"]
+        await emit(run_id, "options", {"node": node, "options": options})
+        _speculate(run_id, pipeline, node, options, deps, intake)
+        choice_idx = await _await_selection(run_id, node, options, mode_label)
+        selected[node] = options[choice_idx] if options else ""
+        await _record(run_id, node, {"selected_input": "\n\n".join(candidates)}, analysis)
+    elif kind == "ValidationAgent":
+        draft = _validation_draft(selected, node, deps)
+        validation = await _claim_speculation(run_id, node, {"draft": draft})
+        if validation is None:
+            validation = await pipeline.arun_validation(draft)
+        await _record(run_id, node, {"draft": draft}, validation)
+    elif kind == "OutputAgent":
+        draft = _validation_draft(selected, node, deps)
+        validation_nodes = _upstream_nodes(node, deps, "ValidationAgent")
+        validation = segments[validation_nodes[0]]["output"] if validation_nodes else {}
+        final = await pipeline.arun_output(draft, validation)
+        selected[node] = final["final_text"]
+        await _record(run_id, node, {"analysis_choice": draft, "validation": validation}, final)
+
+
+def _fast_path_done(run: dict, pipeline: AgentPipeline, stage: str, decision, duration_ms: int):
+    if decision is None:
+        FAST_PATH.ran(stage, duration_ms / 1000)
+    else:
+        intake = pipeline.timings.get("InputAgent", {})
+        FAST_PATH.skipped(stage, decision.reason, intake.get("model_ms", 0.0) / 1000 / max(1, intake.get("calls", 0)))
+        run["store"]["timing"].setdefault("fast_path", {})[stage] = decision.reason
+
+
+def _semantic_scope(run: dict, mode_label: str) -> str | None:
+    """Key of the answers this run may share, or None if it neither reuses nor contributes one.
+
+    Runs with a human choosing options are left out; their answer reflects
+    those choices. Answers are only shared between runs with the same
+    workflow override and graph.
+    """
+    if not SEMANTIC_CACHE.enabled or mode_label == "engage_human":
+        return None
+    if run.get("bypass_cache"):
+        SEMANTIC_CACHE.bypass()
+        return None
+    return scope_key(run["store"].get("workflow_override"), run["store"].get("graph_blueprint"))
+
+
+async def _complete(run_id: str, pipeline: AgentPipeline, final_text: str, trace_meta: dict, run_started: float):
+    run = RUNS[run_id]
+    timing = run["store"]["timing"]
+    timing["total_ms"] = int((time.perf_counter() - run_started) * 1000)
+    timing["model"] = {stage: {k: round(v, 1) for k, v in t.items()} for stage, t in pipeline.timings.items()}
+    run["status"] = "done"
+    _notify(run_id)
+    await emit(run_id, "done", {"final": final_text, "trace": trace_meta, "timing": timing})
+
+
 async def _run_pipeline(run_id: str):
-    pipeline = AgentPipeline()
+    async def on_delta(stage: str, text: str, partial: dict | None):
+        if SPECULATING.get():
+            return
+        node = CURRENT_NODE.get(stage)
+        deltas = DELTAS.get(run_id)
+        if deltas:
+            deltas.add(node, text)
+        if partial:
+            await emit(run_id, "partial", {"node": node, **partial})
+
+    settings = SETTINGS.snapshot  # the whole run uses this version, even if settings change meanwhile
+    pipeline = AgentPipeline(agent_settings=settings.agents, on_delta=on_delta)
     run = RUNS[run_id]
+    run["store"]["settings_version"] = settings.version
     mode_label = "engage_human" if run["mode"] == RunMode.HUMAN else "agents_only"
 
+    if run["status"] == "queued":
+        run["status"] = "running"
+    run_started = time.perf_counter()
+    queued_ms = max(0, now_ms() - run["created_ms"])
+    QUEUE_SECONDS.observe(queued_ms / 1000)
+    run["store"].setdefault("timing", {})["queued_ms"] = queued_ms
     trace_meta = pipeline.start_trace()
     run["store"]["trace"] = trace_meta
     await emit(run_id, "trace", trace_meta)
 
+    # stages already recorded (the run was restored from a checkpoint) are not run again
+    segments = run["store"].setdefault("segments", {})
+    DELTAS[run_id] = DeltaBuffer(lambda event, payload: _publish(run_id, event, payload))
     try:
         await _wait_ok(run_id)
-        await emit(run_id, "enter", {"node": "InputAgent"})
-        intake = pipeline.run_input(run["store"]["user_query"], mode_label, None)
-        await emit(run_id, "exit", {"node": "InputAgent", "output": intake})
-        await _record(run_id, "InputAgent", {"user_query": run["store"]["user_query"]}, intake)
+        run["store"]["time_to_first_stage_ms"] = now_ms() - run["created_ms"]
+        if "InputAgent" in segments:
+            intake = segments["InputAgent"]["output"]
+        else:
+            await emit(run_id, "enter", {"node": "InputAgent"})
+            started = time.perf_counter()
+            intake = await pipeline.arun_input(run["store"]["user_query"], mode_label, None)
+            duration_ms = _stage_done(run, "InputAgent", started)
+            await emit(run_id, "exit", {"node": "InputAgent", "output": intake, "duration_ms": duration_ms})
+            await _record(run_id, "InputAgent", {"user_query": run["store"]["user_query"]}, intake)
+
+        cache_scope = _semantic_scope(run, mode_label)
+        if cache_scope is not None and "TaskDecomposer" not in segments:
+            hit = SEMANTIC_CACHE.lookup(intake["normalized_query"], cache_scope)
+            if hit is not None:
+                cached = {"similarity": hit.similarity, "query": hit.query, "run_id": hit.run_id}
+                run["store"]["semantic_cache"] = cached
+                await emit(run_id, "semantic_cache", cached)
+                await _complete(run_id, pipeline, hit.final_text, trace_meta, run_started)
+                await _finish(run_id)
+                return
 
         await _wait_ok(run_id)
-        await emit(run_id, "enter", {"node": "TaskDecomposer"})
-        plan = pipeline.run_decomposer(intake["normalized_query"], intake["tools_needed"], intake["constraints"])
-        override_plan = run["store"].get("workflow_override")
-        if override_plan:
-            plan["workflow_plan"] = override_plan
-        await emit(run_id, "exit", {"node": "TaskDecomposer", "output": plan})
-        await _record(run_id, "TaskDecomposer", {"query": intake["normalized_query"]}, plan)
+        if "TaskDecomposer" in segments:
+            plan = segments["TaskDecomposer"]["output"]
+        else:
+            await emit(run_id, "enter", {"node": "TaskDecomposer"})
+            started = time.perf_counter()
+            override_plan = run["store"].get("workflow_override")
+            decision = FAST_PATH.plan(intake, override_plan, run["store"]["graph_blueprint"])
+            if decision is None:
+                plan = await pipeline.arun_decomposer(intake["normalized_query"], intake["tools_needed"], intake["constraints"])
+                if override_plan:
+                    plan["workflow_plan"] = override_plan
+            else:
+                plan = decision.output
+            duration_ms = _stage_done(run, "TaskDecomposer", started)
+            _fast_path_done(run, pipeline, "TaskDecomposer", decision, duration_ms)
+            await emit(run_id, "exit", {
+                "node": "TaskDecomposer", "output": plan, "duration_ms": duration_ms,
+                **({"fast_path": decision.reason} if decision else {}),
+            })
+            await _record(run_id, "TaskDecomposer", {"query": intake["normalized_query"]}, plan)
 
         await _wait_ok(run_id)
-        await emit(run_id, "enter", {"node": "WorkflowOrchestrator"})
-        workflow = pipeline.run_workflow(plan["workflow_plan"], intake["engagement_mode"])
         plan_steps = plan["workflow_plan"]
-        workflow["graph"] = run["store"]["graph_blueprint"]
-        run["store"]["workflow"] = workflow
-        await emit(run_id, "workflow", workflow)
-        await _record(run_id, "WorkflowOrchestrator", {"plan": plan["workflow_plan"]}, workflow)
-
-        selected_research = intake["normalized_query"]
-        selected_analysis = ""
-        validation = {}
-        final_text = ""
-
-        for node in plan_steps:
+        if "WorkflowOrchestrator" not in segments:
+            await emit(run_id, "enter", {"node": "WorkflowOrchestrator"})
+            started = time.perf_counter()
+            decision = FAST_PATH.workflow(plan["workflow_plan"], intake["engagement_mode"])
+            workflow = decision.output if decision else await pipeline.arun_workflow(plan["workflow_plan"], intake["engagement_mode"])
+            _fast_path_done(run, pipeline, "WorkflowOrchestrator", decision, _stage_done(run, "WorkflowOrchestrator", started))
+            workflow["graph"] = run["store"]["graph_blueprint"]
+            run["store"]["workflow"] = workflow
+            await emit(run_id, "workflow", workflow)
+            await _record(run_id, "WorkflowOrchestrator", {"plan": plan["workflow_plan"]}, workflow)
+
+        deps = stage_dependencies(plan_steps, run["store"]["graph_blueprint"])
+        run["store"].setdefault("selected", {})
+        if run["speculative"] and mode_label == "engage_human":
+            SPECULATORS[run_id] = Speculator()
+
+        async def run_node(node: str):
+            if node in segments:
+                return
+            CURRENT_NODE.set(node)
             await _wait_ok(run_id)
             await emit(run_id, "enter", {"node": node})
-
-            try:
-                if node == "ResearchAgent":
-                    research = pipeline.run_research(intake["normalized_query"])
-                    options = research["candidates"]
-                    await emit(run_id, "options", {"node": node, "options": options})
-                    choice_idx = await _await_selection(run_id, node, options, mode_label)
-                    selected_research = options[choice_idx] if options else ""
-                    await _record(run_id, node, {"query": intake["normalized_query"]}, research)
-                elif node == "AnalysisAgent":
-                    analysis = pipeline.run_analysis([selected_research])
-                    options = analysis["options"]
-                    await emit(run_id, "options", {"node": node, "options": options})
-                    choice_idx = await _await_selection(run_id, node, options, mode_label)
-                    selected_analysis = options[choice_idx] if options else ""
-                    await _record(run_id, node, {"selected_input": selected_research}, analysis)
-                elif node == "ValidationAgent":
-                    validation = pipeline.run_validation(selected_analysis)
-                    await _record(run_id, node, {"draft": selected_analysis}, validation)
-                elif node == "OutputAgent":
-                    final = pipeline.run_output(selected_analysis, validation)
-                    final_text = final["final_text"]
-                    await _record(run_id, node, {"analysis_choice": selected_analysis, "validation": validation}, final)
-            except Exception as exc:
-                await _pause_with_error(run_id, node, str(exc))
-                return
-
-            await emit(run_id, "exit", {"node": node})
-
-        run["status"] = "done"
-        await emit(run_id, "done", {"final": final_text, "trace": trace_meta})
+            started = time.perf_counter()
+            await _run_stage(run_id, pipeline, node, deps, intake, mode_label)
+            await emit(run_id, "exit", {"node": node, "duration_ms": _stage_done(run, node, started)})
+
+        try:
+            await run_graph(deps, run_node, run["max_parallel"])
+        except NodeFailed as exc:
+            if run["stop"]:
+                raise exc.error
+            # no early return: _finish below checkpoints the paused_error state for /retry
+            await _pause_with_error(run_id, exc.node, str(exc))
+        else:
+            final_text = "\n\n".join(
+                run["store"]["selected"][node] for node in deps if node_kind(node) == "OutputAgent"
+            )
+            if run_id in SPECULATORS:
+                run["store"]["speculation"] = SPECULATORS[run_id].stats()
+            if cache_scope is not None:
+                SEMANTIC_CACHE.put(intake["normalized_query"], final_text, cache_scope, run_id)
+            await _complete(run_id, pipeline, final_text, trace_meta, run_started)
     except Exception as exc:
         run["status"] = "error"
+        _notify(run_id)
         await emit(run_id, "error", {"message": str(exc)})
+    finally:
+        speculator = SPECULATORS.pop(run_id, None)
+        if speculator:
+            speculator.cancel()
+        DELTAS.pop(run_id).flush()
+    await _finish(run_id)
@@ -1,16 +1,23 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import os
-from copy import deepcopy
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Optional
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
 SETTINGS_PATH = Path(os.environ.get("AGENT_SETTINGS_PATH", "agent_settings.json"))
+# Updates within this many seconds of each other reach the file as one write.
+SETTINGS_WRITE_DELAY = float(os.environ.get("SETTINGS_WRITE_DELAY", "0.25"))
+# How often the file is checked for edits made outside the controller; 0 disables hot reload.
+SETTINGS_RELOAD_SECONDS = float(os.environ.get("SETTINGS_RELOAD_SECONDS", "2"))
 
 AGENT_ENV_PREFIXES = {
     "InputAgent": "INPUT_AGENT",
@@ -22,7 +29,8 @@ AGENT_ENV_PREFIXES = {
     "OutputAgent": "OUTPUT_AGENT",
 }
 
-AGENT_CONFIG_FIELDS = ("api_base", "api_key", "model", "prompt")
+# token_budget: tokens of inserted context (snippets, candidates, drafts) the stage may use; "" = built-in default, "0" = unlimited
+AGENT_CONFIG_FIELDS = ("api_base", "api_key", "model", "prompt", "token_budget")
 REQUIRED_FIELDS = ("api_base", "api_key")
 
 DEFAULT_PROMPTS = {
@@ -44,52 +52,228 @@ def _build_defaults() -> Dict[str, Dict[str, str]]:
             "api_key": os.environ.get(f"{prefix}_API_KEY", ""),
             "model": os.environ.get(f"{prefix}_MODEL", ""),
             "prompt": os.environ.get(f"{prefix}_PROMPT", DEFAULT_PROMPTS.get(agent, "")),
+            "token_budget": os.environ.get(f"{prefix}_TOKEN_BUDGET", ""),
         }
     return data
 
 
-def _load_from_disk() -> Dict[str, Dict[str, str]]:
-    if SETTINGS_PATH.exists():
+class SettingsSnapshot(NamedTuple):
+    """One immutable version of the agent settings; a run keeps the snapshot it started with."""
+
+    version: int
+    agents: Mapping[str, Mapping[str, str]]
+
+    def to_dict(self) -> Dict[str, Dict[str, str]]:
+        return {agent: dict(config) for agent, config in self.agents.items()}
+
+
+def _freeze(settings: Dict[str, Dict[str, str]]) -> Mapping[str, Mapping[str, str]]:
+    return MappingProxyType({agent: MappingProxyType(dict(config)) for agent, config in settings.items()})
+
+
+def _normalize(payload: Dict[str, Any]) -> Dict[str, Dict[str, str]]:
+    """Settings read from the file, over the env defaults so agents or fields missing there still resolve."""
+    settings = _build_defaults()
+    for agent, config in payload.items():
+        if isinstance(config, dict):
+            settings[agent] = {**settings.get(agent, {}), **config}
+    return settings
+
+
+class SettingsStore:
+    """Copy-on-write agent settings, persisted off the request path.
+
+    Reads return the current ``SettingsSnapshot`` without copying. An update
+    builds the next snapshot, swaps it in and wakes a background thread that
+    waits ``write_delay`` for more updates, then writes the latest snapshot
+    once, atomically (temp file + rename). The same thread polls the file and
+    loads edits made outside the controller as a new version. Listeners are
+    called with each new snapshot, on the event loop that started the store
+    (a hot reload hands them over from the background thread), so they may
+    touch loop-only state such as the caches.
+    """
+
+    def __init__(
+        self,
+        path: Path = SETTINGS_PATH,
+        write_delay: float = SETTINGS_WRITE_DELAY,
+        reload_seconds: float = SETTINGS_RELOAD_SECONDS,
+    ) -> None:
+        self.path = path
+        self.write_delay = write_delay
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._listeners: list[Callable[[SettingsSnapshot], None]] = []
+        self._dirty = False
+        self._thread: Optional[threading.Thread] = None
+        self._event_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+        self._disk_stamp = self._stat()
+        self._snapshot = SettingsSnapshot(1, _freeze(self._read() or _build_defaults()))
+        self.writes = 0
+        self.coalesced = 0
+        self.reloads = 0
+
+    def _stat(self) -> Optional[tuple[int, int]]:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read(self) -> Optional[Dict[str, Dict[str, str]]]:
         try:
-            with open(SETTINGS_PATH, "r", encoding="utf-8") as fh:
+            with open(self.path, "r", encoding="utf-8") as fh:
                 payload = json.load(fh)
-                if isinstance(payload, dict):
-                    return payload
-        except json.JSONDecodeError:
-            pass
-    return _build_defaults()
+        except (OSError, json.JSONDecodeError):
+            return None  # missing, or caught halfway through an editor's save
+        return _normalize(payload) if isinstance(payload, dict) else None
+
+    @property
+    def snapshot(self) -> SettingsSnapshot:
+        return self._snapshot
+
+    def subscribe(self, listener: Callable[[SettingsSnapshot], None]) -> None:
+        self._listeners.append(listener)
+
+    def _publish(self, snapshot: SettingsSnapshot) -> None:
+        for listener in self._listeners:
+            listener(snapshot)
+
+    def update(self, updates: Dict[str, Dict[str, Any]]) -> SettingsSnapshot:
+        self.start()
+        with self._lock:
+            current = self._snapshot
+            agents = dict(current.agents)
+            for agent, config in updates.items():
+                if agent not in AGENT_ENV_PREFIXES:
+                    continue
+                changed = dict(agents.get(agent, {}))
+                for field in AGENT_CONFIG_FIELDS:
+                    if field in config:
+                        value = config[field]
+                        if field == "token_budget" and isinstance(value, int) and not isinstance(value, bool):
+                            value = str(value)
+                        changed[field] = value if isinstance(value, str) else ""
+                agents[agent] = MappingProxyType(changed)
+            snapshot = self._snapshot = SettingsSnapshot(current.version + 1, MappingProxyType(agents))
+            self.coalesced += self._dirty
+            self._dirty = True
+            self._wake.notify()
+        self._publish(snapshot)
+        return snapshot
+
+    def start(self) -> None:
+        try:
+            self._event_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            pass  # started outside a loop (scripts): reload listeners run on the background thread
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._loop, name="settings-store", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread, writing any pending update first."""
+        with self._lock:
+            self._stopping = True
+            self._wake.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+            self._thread = None
+        self.flush()
+
+    def flush(self) -> None:
+        # only the background thread (or ``stop`` after joining it) writes, so no lock is held for the I/O
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            snapshot = self._snapshot
+        self._persist(snapshot)
 
+    def _persist(self, snapshot: SettingsSnapshot) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(snapshot.to_dict(), fh, ensure_ascii=False, indent=2)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self.path)
+        self._disk_stamp = self._stat()
+        self.writes += 1
 
-def _persist(settings: Dict[str, Dict[str, str]]) -> None:
-    SETTINGS_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with open(SETTINGS_PATH, "w", encoding="utf-8") as fh:
-        json.dump(settings, fh, ensure_ascii=False, indent=2)
+    def _loop(self) -> None:
+        while True:
+            with self._lock:
+                timeout = self.reload_seconds if self.reload_seconds > 0 else None
+                if not self._dirty and not self._stopping:
+                    self._wake.wait(timeout)
+                if self._stopping:
+                    return
+                dirty = self._dirty
+            if dirty:
+                time.sleep(self.write_delay)  # let a burst of updates settle into one write
+                self.flush()
+            elif self.reload_seconds > 0:
+                self._reload_if_changed()
+
+    def _reload_if_changed(self) -> None:
+        stamp = self._stat()
+        if stamp is None or stamp == self._disk_stamp:
+            return
+        settings = self._read()
+        if settings is None:
+            return  # retried on the next poll
+        with self._lock:
+            if self._dirty:
+                return  # our pending write wins; the edit is overwritten
+            self._disk_stamp = stamp
+            if settings == self._snapshot.to_dict():
+                return
+            snapshot = self._snapshot = SettingsSnapshot(self._snapshot.version + 1, _freeze(settings))
+            self.reloads += 1
+        loop = self._event_loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._publish, snapshot)
+                return
+            except RuntimeError:
+                pass  # the loop has closed; nothing runs on it any more
+        self._publish(snapshot)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self._snapshot.version,
+            "pending_write": self._dirty,
+            "writes": self.writes,
+            "coalesced": self.coalesced,
+            "reloads": self.reloads,
+        }
 
 
-_SETTINGS = _load_from_disk()
+SETTINGS = SettingsStore()
 
 
-def get_agent_settings() -> Dict[str, Dict[str, str]]:
-    return deepcopy(_SETTINGS)
+def get_agent_settings() -> Mapping[str, Mapping[str, str]]:
+    """The current settings, read-only; ``SETTINGS.snapshot`` also gives their version."""
+    return SETTINGS.snapshot.agents
 
 
-def update_agent_settings(updates: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, str]]:
-    for agent, config in updates.items():
-        if agent not in AGENT_ENV_PREFIXES:
-            continue
-        for field in AGENT_CONFIG_FIELDS:
-            if field in config:
-                value = config[field]
-                _SETTINGS[agent][field] = value if isinstance(value, str) else ""
-    _persist(_SETTINGS)
-    return get_agent_settings()
+def update_agent_settings(updates: Dict[str, Dict[str, Any]]) -> Mapping[str, Mapping[str, str]]:
+    return SETTINGS.update(updates).agents
 
 
 def find_missing_agent_settings(agent_ids: list[str] | None = None, required_fields = REQUIRED_FIELDS):
     missing: list[dict[str, Any]] = []
-    selected_agents = agent_ids or list(_SETTINGS.keys())
+    agents = SETTINGS.snapshot.agents
+    selected_agents = agent_ids or list(agents.keys())
     for agent in selected_agents:
-        config = _SETTINGS.get(agent, {})
+        config = agents.get(agent, {})
         missing_fields = [
             field for field in required_fields
             if not str(config.get(field, "")).strip()
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import json
+import os
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict
+
+SPECULATION_TOP_K = int(os.environ.get("SPECULATION_TOP_K", "2"))
+SPECULATION_MAX_CALLS_PER_RUN = int(os.environ.get("SPECULATION_MAX_CALLS_PER_RUN", "4"))
+SPECULATION_MAX_INFLIGHT = int(os.environ.get("SPECULATION_MAX_INFLIGHT", "8"))
+
+# Set inside speculative tasks so their model calls don't stream into the node's SSE events.
+SPECULATING: contextvars.ContextVar[bool] = contextvars.ContextVar("speculating", default=False)
+
+SPECULATION_STATS: Counter[str] = Counter()
+_inflight = 0
+
+
+def _release(task: asyncio.Task) -> None:
+    global _inflight
+    _inflight -= 1
+
+
+def _key(node: str, inputs: Dict[str, Any]) -> tuple[str, str]:
+    return node, json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class Speculator:
+    """Runs a downstream stage for the likely choices while a human selection is pending.
+
+    Results are keyed by the exact stage inputs, so a claim only ever returns
+    work that matches what the stage would have computed itself.
+    """
+
+    def __init__(self, top_k: int = SPECULATION_TOP_K, max_calls: int = SPECULATION_MAX_CALLS_PER_RUN) -> None:
+        self.top_k = top_k
+        self.max_calls = max_calls
+        self.calls = 0
+        self.hidden_ms = 0
+        self.wasted_ms = 0  # model time spent on guesses that were never used
+        self._tasks: Dict[tuple[str, str], asyncio.Task] = {}
+        self._started: Dict[tuple[str, str], float] = {}
+        self._finished: Dict[tuple[str, str], float] = {}
+
+    def launch(self, node: str, inputs: Dict[str, Any], factory: Callable[[], Awaitable[Dict[str, Any]]]) -> bool:
+        global _inflight
+        key = _key(node, inputs)
+        if key in self._tasks or self.calls >= self.max_calls or _inflight >= SPECULATION_MAX_INFLIGHT:
+            return False
+
+        async def speculate() -> Dict[str, Any]:
+            SPECULATING.set(True)
+            try:
+                return await factory()
+            finally:
+                self._finished[key] = time.perf_counter()
+
+        _inflight += 1
+        self.calls += 1
+        self._started[key] = time.perf_counter()
+        task = self._tasks[key] = asyncio.create_task(speculate())
+        # not in speculate()'s finally: a task cancelled before it first runs never enters its body
+        task.add_done_callback(_release)
+        SPECULATION_STATS["launched"] += 1
+        return True
+
+    async def claim(self, node: str, inputs: Dict[str, Any]) -> tuple[Dict[str, Any], int] | None:
+        """Result for these inputs plus the milliseconds it saved, or None; other guesses for the node are cancelled."""
+        key = _key(node, inputs)
+        task = self._tasks.pop(key, None)
+        self.cancel(node)
+        if task is None:
+            return None
+        hidden = int((self._finished.get(key, time.perf_counter()) - self._started[key]) * 1000)
+        try:
+            result = await task
+        except Exception:
+            SPECULATION_STATS["failed"] += 1
+            self._waste(key)
+            return None
+        self.hidden_ms += hidden
+        SPECULATION_STATS["committed"] += 1
+        SPECULATION_STATS["hidden_ms"] += hidden
+        return result, hidden
+
+    def cancel(self, node: str | None = None) -> None:
+        """Drop the guesses for ``node`` (all of them by default); their model time is counted as wasted.
+
+        A finished guess cost a whole call. A cancelled one stops at its next
+        streamed chunk; a non-streamed call keeps running in the Bedrock
+        thread pool until the provider answers, so its real cost is higher
+        than the time counted here.
+        """
+        for key in [key for key in self._tasks if node is None or key[0] == node]:
+            task = self._tasks.pop(key)
+            if task.done():
+                SPECULATION_STATS["discarded"] += 1
+            else:
+                task.cancel()
+                SPECULATION_STATS["cancelled"] += 1
+            self._waste(key)
+
+    def _waste(self, key: tuple[str, str]) -> None:
+        wasted = int((self._finished.get(key, time.perf_counter()) - self._started[key]) * 1000)
+        self.wasted_ms += wasted
+        SPECULATION_STATS["wasted_ms"] += wasted
+
+    def stats(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "hidden_ms": self.hidden_ms, "wasted_ms": self.wasted_ms}
@@ -12,11 +12,13 @@ import type { Connection, Edge, EdgeChange, Node, NodeChange } from "reactflow";
 
 import "./App.css";
 
-import { API_BASE, ENVIRONMENT_NAME } from "./config";
+import { API_BASE, COMPACT_EVENTS, ENVIRONMENT_NAME } from "./config";
 import { AGENT_LIBRARY, AGENT_LOOKUP, DEFAULT_PIPELINE } from "./data/agents";
+import { CompactDecoder } from "./lib/compactEvents";
 import {
   fetchAgentSettings,
   fetchGraph,
+  fetchRun,
   fetchTraces,
   fetchWorkflowPlan,
   pauseRun,
@@ -38,6 +40,7 @@ import type {
   RunTraceMeta,
   NodeStatus,
   NodeStatusMap,
+  PartialPayload,
   RunMode,
   SegmentRecord,
   WorkflowSnapshot,
@@ -45,6 +48,12 @@ import type {
 
 type AgentNodeData = GraphNode & { status: NodeStatus };
 
+// text and completed list items of a stage that is still streaming, keyed by node
+interface LiveStage {
+  text: string;
+  partial: Record<string, unknown[]>;
+}
+
 interface EventLine {
   ts: number;
   event: string;
@@ -95,6 +104,7 @@ interface WorkflowCanvasProps {
 interface SegmentInspectorProps {
   nodeId: string | null;
   segments: Record<string, SegmentRecord>;
+  live: Record<string, LiveStage>;
 }
 
 interface EventLogProps {
@@ -147,6 +157,7 @@ function App() {
   const [graphSaving, setGraphSaving] = useState(false);
   const [graphLoaded, setGraphLoaded] = useState(false);
   const [segments, setSegments] = useState<Record<string, SegmentRecord>>({});
+  const [liveStages, setLiveStages] = useState<Record<string, LiveStage>>({});
   const [selectedNodeId, setSelectedNodeId] = useState<string | null>(null);
   const [eventLines, setEventLines] = useState<EventLine[]>([]);
   const [pendingOptions, setPendingOptions] = useState<Record<string, string[]>>({});
@@ -269,8 +280,13 @@ function App() {
       return;
     }
 
-    const streamUrl = new URL(`/events/${runId}`, API_BASE).toString();
-    const source = new EventSource(streamUrl);
+    const streamUrl = new URL(`/events/${runId}`, API_BASE);
+    if (COMPACT_EVENTS) {
+      streamUrl.searchParams.set("encoding", "compact");
+      streamUrl.searchParams.set("compress", "true");
+    }
+    const source = new EventSource(streamUrl.toString());
+    const decoder = COMPACT_EVENTS ? new CompactDecoder() : null;
 
     streamRef.current = source;
     setRunStatus("running");
@@ -283,11 +299,18 @@ function App() {
       }
     };
 
-    const register = (eventName: string, handler?: (payload: any) => void) => {
+    const register = (eventName: string, handler?: (payload: any) => void, log = true) => {
       source.addEventListener(eventName, (evt) => {
-        const payload = parsePayload((evt as MessageEvent).data);
-        appendEvent(eventName, payload);
-        handler?.(payload);
+        const raw = (evt as MessageEvent).data;
+        const deliver = (payload: any) => {
+          if (log) appendEvent(eventName, payload);
+          handler?.(payload);
+        };
+        if (decoder) {
+          decoder.decode(raw).then(deliver, () => deliver(raw));
+        } else {
+          deliver(parsePayload(raw));
+        }
       });
     };
 
@@ -313,14 +336,47 @@ function App() {
       }
     });
 
+    const clearLive = (node: string) =>
+      setLiveStages((prev) => {
+        if (!(node in prev)) return prev;
+        const clone = { ...prev };
+        delete clone[node];
+        return clone;
+      });
+
     register("segment", (payload: { node: string; input: any; output: any }) => {
       setSegments((prev) => ({
         ...prev,
         [payload.node]: { input: payload.input ?? {}, output: payload.output ?? {} },
       }));
       setNodeStatuses((prev) => ({ ...prev, [payload.node]: "completed" }));
+      clearLive(payload.node);
     });
 
+    // deltas arrive several times a second while a stage streams, so they stay out of the event log
+    register(
+      "delta",
+      (payload: { node: string; text: string }) => {
+        setLiveStages((prev) => {
+          const stage = prev[payload.node] ?? { text: "", partial: {} };
+          return { ...prev, [payload.node]: { ...stage, text: stage.text + payload.text } };
+        });
+      },
+      false,
+    );
+
+    register(
+      "partial",
+      (payload: PartialPayload) => {
+        setLiveStages((prev) => {
+          const stage = prev[payload.node] ?? { text: "", partial: {} };
+          const items = [...(stage.partial[payload.field] ?? []).slice(0, payload.start), ...payload.items];
+          return { ...prev, [payload.node]: { ...stage, partial: { ...stage.partial, [payload.field]: items } } };
+        });
+      },
+      false,
+    );
+
     register("options", (payload: { node: string; options: string[] }) => {
       setPendingOptions((prev) => ({ ...prev, [payload.node]: payload.options || [] }));
       setSelectionDrafts((prev) => ({ ...prev, [payload.node]: 0 }));
@@ -345,12 +401,42 @@ function App() {
 
     register("enter", (payload: { node: string }) => {
       setNodeStatuses((prev) => ({ ...prev, [payload.node]: "active" }));
+      clearLive(payload.node);
     });
 
     register("exit", (payload: { node: string }) => {
       setNodeStatuses((prev) => ({ ...prev, [payload.node]: "completed" }));
     });
 
+    register("semantic_cache");
+    register("queued", () => setRunStatus("queued"));
+    register("restored", (payload: { completed?: string[]; retrying?: string | null }) => {
+      setRunStatus("queued");
+      setAgentError(null);
+      setErrorDetails(null);
+      if (payload.retrying) {
+        clearLive(payload.retrying);
+        setNodeStatuses((prev) => ({ ...prev, [payload.retrying as string]: "ready" }));
+      }
+    });
+    // the server dropped events this tab had not read yet: rebuild the finished stages from the run itself,
+    // and drop streamed text that now has gaps; the stream carries on from the oldest retained event
+    register("lagged", () => {
+      setLiveStages({});
+      fetchRun(runId)
+        .then((run) => {
+          const stored = run.store.segments ?? {};
+          setSegments(stored);
+          setNodeStatuses((prev) => {
+            const next = { ...prev };
+            Object.keys(stored).forEach((node) => {
+              next[node] = "completed";
+            });
+            return next;
+          });
+        })
+        .catch((err) => appendEvent("resync_error", (err as Error).message));
+    });
     register("paused", () => setRunStatus("paused"));
     register("agent_error", (payload: AgentErrorPayload) => {
       setRunStatus("paused_error");
@@ -396,6 +482,7 @@ function App() {
 
   const resetRunContext = () => {
     setSegments({});
+    setLiveStages({});
     setPendingOptions({});
     setSelectionDrafts({});
     setNodeStatuses({});
@@ -607,7 +694,7 @@ function App() {
         </div>
 
         <div className="column">
-          <SegmentInspector nodeId={selectedNodeId} segments={nodeSegments} />
+          <SegmentInspector nodeId={selectedNodeId} segments={nodeSegments} live={liveStages} />
           <SelectionPanel
             pending={pendingOptions}
             drafts={selectionDrafts}
@@ -845,8 +932,11 @@ const WorkflowCanvas = ({
   </section>
 );
 
-const SegmentInspector = ({ nodeId, segments }: SegmentInspectorProps) => {
+const SegmentInspector = ({ nodeId: selectedId, segments, live }: SegmentInspectorProps) => {
+  // with nothing selected, follow the stage that is streaming
+  const nodeId = selectedId ?? Object.keys(live).at(-1) ?? null;
   const segment = nodeId ? segments[nodeId] : null;
+  const stage = nodeId && !segment ? live[nodeId] : null;
   return (
     <section className="panel">
       <header className="panel-header">
@@ -863,6 +953,17 @@ const SegmentInspector = ({ nodeId, segments }: SegmentInspectorProps) => {
           <strong>Outputs</strong>
           <pre>{JSON.stringify(segment.output, null, 2)}</pre>
         </>
+      ) : stage ? (
+        <>
+          {Object.entries(stage.partial).map(([field, items]) => (
+            <div key={field}>
+              <strong>{field} (so far)</strong>
+              <pre>{JSON.stringify(items, null, 2)}</pre>
+            </div>
+          ))}
+          <strong>Streaming…</strong>
+          <pre>{stage.text}</pre>
+        </>
       ) : (
         <p className="hint">Select a node to see its trace.</p>
       )}
@@ -972,6 +1073,7 @@ const SETTINGS_FIELDS: Array<{ key: keyof AgentConfig; label: string; type?: "te
   { key: "api_key", label: "API Key" },
   { key: "model", label: "Model" },
   { key: "prompt", label: "Prompt", type: "textarea" },
+  { key: "token_budget", label: "Context token budget (blank = default, 0 = unlimited)" },
 ];
 
 const SettingsPanel = ({
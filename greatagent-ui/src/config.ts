@@ -4,3 +4,6 @@ export const API_BASE =
   trim(import.meta.env.VITE_API_BASE) || "http://localhost:8077";
 
 export const ENVIRONMENT_NAME = trim(import.meta.env.VITE_ENV_NAME) || "greatagent";
+
+// Ask /events for the compact encoding (shared payloads sent once, large ones deflated).
+export const COMPACT_EVENTS = trim(import.meta.env.VITE_COMPACT_EVENTS) === "1";
@@ -1,5 +1,5 @@
 import { API_BASE } from "../config";
-import type { AgentSettingsMap, GraphBlueprint, RunMode, TraceSummary } from "../types";
+import type { AgentSettingsMap, GraphBlueprint, RunMode, RunRecord, TraceSummary } from "../types";
 
 const jsonHeaders = { "Content-Type": "application/json" };
 
@@ -23,6 +23,8 @@ export const startRun = (user_query: string, mode: RunMode, workflow_override?:
     body: JSON.stringify({ user_query, mode, workflow_override }),
   });
 
+export const fetchRun = (runId: string) => apiFetch<RunRecord>(`/runs/${runId}`);
+
 export const pauseRun = (runId: string) =>
   apiFetch(`/pause/${runId}`, { method: "POST" });
 
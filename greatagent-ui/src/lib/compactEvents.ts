@@ -0,0 +1,55 @@
+// Decoder for `/events/{run_id}?encoding=compact`: frames are `{defs?, d}`, where large values
+// in `d` (and in other defs) are `{"$ref": hash}` and each hash is defined once per stream.
+
+type Frame = { defs?: Record<string, unknown>; d: unknown };
+
+const inflate = async (b64: string): Promise<string> => {
+  const bytes = Uint8Array.from(atob(b64), (c) => c.charCodeAt(0));
+  const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("deflate"));
+  return new Response(stream).text();
+};
+
+const isRef = (value: unknown): value is { $ref: string } =>
+  typeof value === "object" && value !== null && !Array.isArray(value) && "$ref" in value;
+
+export class CompactDecoder {
+  private blobs = new Map<string, unknown>();
+  private resolved = new Map<string, unknown>();
+  private queue: Promise<unknown> = Promise.resolve();
+
+  /** Decode frames in arrival order, even though inflating is asynchronous. */
+  decode(raw: string): Promise<unknown> {
+    const next = this.queue.then(() => this.decodeFrame(raw));
+    this.queue = next.catch(() => null);
+    return next;
+  }
+
+  private async decodeFrame(raw: string) {
+    const frame = JSON.parse(raw) as Frame;
+    for (const [hash, value] of Object.entries(frame.defs ?? {})) {
+      const packed = value as { $z?: string };
+      this.blobs.set(hash, typeof packed?.$z === "string" ? JSON.parse(await inflate(packed.$z)) : value);
+    }
+    return this.resolve(frame.d);
+  }
+
+  private resolve(value: unknown): unknown {
+    if (isRef(value)) {
+      const hash = value.$ref;
+      if (!this.resolved.has(hash)) {
+        if (!this.blobs.has(hash)) {
+          throw new Error(`compact event references unknown blob ${hash}`);
+        }
+        this.resolved.set(hash, this.resolve(this.blobs.get(hash)));
+      }
+      return this.resolved.get(hash);
+    }
+    if (Array.isArray(value)) {
+      return value.map((item) => this.resolve(item));
+    }
+    if (typeof value === "object" && value !== null) {
+      return Object.fromEntries(Object.entries(value).map(([key, item]) => [key, this.resolve(item)]));
+    }
+    return value;
+  }
+}
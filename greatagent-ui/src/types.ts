@@ -55,11 +55,26 @@ export interface SegmentRecord {
   output: Record<string, unknown>;
 }
 
+export interface RunRecord {
+  id: string;
+  mode: string;
+  status: string;
+  store: { segments?: Record<string, SegmentRecord> } & Record<string, unknown>;
+}
+
+export interface PartialPayload {
+  node: string;
+  field: string;
+  start: number;
+  items: unknown[];
+}
+
 export interface AgentConfig {
   api_base: string;
   api_key: string;
   model: string;
   prompt: string;
+  token_budget?: string;
 }
 
 export type AgentSettingsMap = Record<string, AgentConfig>;